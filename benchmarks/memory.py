@@ -0,0 +1,118 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Memory benchmark of product models.
+
+Measures bytes retained per product after loading a catalog from its JSON
+representation, for the compact models and for the former dict-based
+dataclasses:
+
+.. code-block:: console
+
+   $ python benchmarks/memory.py --count 100000
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+
+from marshmallow import post_load
+
+from consumer.loaders import get_loader
+from consumer.schemas import ProductSchema
+
+
+@dataclass(frozen=True)
+class LegacyProduct:  # pylint: disable=too-many-instance-attributes
+    """Product model as it was defined before slots and interning."""
+
+    id: int  # pylint: disable=invalid-name
+    name: str
+    description: str
+    price: float
+    discount: float
+    rating: float
+    stock: int
+    brand_id: int
+    category_id: int
+    created_at: datetime
+    updated_at: datetime
+
+
+class LegacyProductSchema(ProductSchema):
+    """Schema loading products to the legacy model."""
+
+    @post_load
+    def make(self, data, **_kwargs):
+        """Deserialize the ``data`` to a LegacyProduct instance."""
+        return LegacyProduct(**data)
+
+
+def catalog(count: int) -> bytes:
+    """Create JSON representation of a catalog with the number of products.
+
+    Names, descriptions and time zones repeat the way they do in a real
+    catalog, where many products are variants of the same item.
+    """
+    products = []
+    for i in range(count):
+        products.append({
+            'id': i + 1,
+            'name': f'Product {i % 500}',
+            'description': f'Description of the product {i % 100}',
+            'brand_id': i % 50 + 1,
+            'category_id': i % 20 + 1,
+            'price': 10.0 + i % 1000,
+            'discount': 0.05 * (i % 5),
+            'rating': 1.0 + i % 5,
+            'stock': i % 300,
+            'created_at': f'2023-03-11T21:56:{i % 60:02}.123456+0{i % 3}:00',
+            'updated_at': f'2023-03-12T11:36:{i % 60:02}.654321+00:00',
+        })
+    return json.dumps(products).encode('utf-8')
+
+
+def measure(schema_cls, raw: bytes) -> float:
+    """Measure bytes retained per product loaded with the schema."""
+    load = get_loader(schema_cls, 'compiled')
+
+    gc.collect()
+    tracemalloc.start()
+
+    data = json.loads(raw)
+    products = [load(item) for item in data]
+    del data
+
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return size / len(products)
+
+
+def main():
+    """Run the benchmark and print results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=50000,
+                        help='number of products to load')
+    args = parser.parse_args()
+
+    raw = catalog(args.count)
+    before = measure(LegacyProductSchema, raw)
+    after = measure(ProductSchema, raw)
+
+    print(f'products:          {args.count}')
+    print(f'before (bytes):    {before:.1f}')
+    print(f'after (bytes):     {after:.1f}')
+    print(f'saved:             {1 - after / before:.1%}')
+
+
+if __name__ == '__main__':
+    main()
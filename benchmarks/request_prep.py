@@ -0,0 +1,82 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Microbenchmark of request preparation.
+
+Measures the time :class:`consumer.client.Client` spends per request before
+any I/O happens. The session is replaced by a stub returning a canned
+response, so only option handling, headers and serialization are timed:
+
+.. code-block:: console
+
+   $ python benchmarks/request_prep.py --number 20000
+"""
+
+import argparse
+import timeit
+
+from requests.models import Response
+
+from consumer.client import Client
+
+
+class StubSession:  # pylint: disable=too-few-public-methods
+    """Session stub returning the same response to every request."""
+
+    def __init__(self):
+        """A :class:`StubSession` object with a canned response."""
+        self.response = Response()
+        self.response.status_code = 200
+        self.response._content = b'{}'  # pylint: disable=protected-access
+
+    def request(self, *_args, **_kwargs):
+        """Return the canned response."""
+        return self.response
+
+    get = post = delete = request
+
+
+def create_client() -> Client:
+    """Create a client which never touches the network."""
+    client = Client(base_url='http://localhost', foo='bar')
+    client.session = StubSession()
+    client.headers['X-Request-Source'] = 'benchmark'
+    return client
+
+
+def cases(client: Client) -> dict:
+    """Get the request calls to measure."""
+    return {
+        'get': lambda: client.get('/v2/products/1'),
+        'get with query': lambda: client.get(
+            '/v2/products',
+            query={'q': 'foo', 'active': True},
+            cid=2,
+            page=3,
+            headers={'X-Trace': '1'},
+        ),
+        'post': lambda: client.post('/v2/products', {'name': 'Product'}),
+        'delete': lambda: client.delete('/v2/products/1'),
+    }
+
+
+def main():
+    """Run the benchmark and print results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=20000,
+                        help='number of requests per case')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of measurements per case')
+    args = parser.parse_args()
+
+    for name, call in cases(create_client()).items():
+        best = min(timeit.repeat(call, number=args.number, repeat=args.repeat))
+        print(f'{name:<16} {best / args.number * 1e6:8.2f} us/request')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""In-process stub of the Products provider used by benchmarks.
+
+The stub serves canned JSON responses from a background thread, so that
+benchmarks exercise the whole client stack without a broker or network:
+
+* ``GET /v2/products/{id}`` - a single product, or ``404`` for ``id`` 0
+* ``GET /v2/products?size={n}`` - a list of ``n`` products
+"""
+
+import json
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from memory import catalog
+
+NOT_FOUND = json.dumps({
+    'code': 404,
+    'status': 'Not Found',
+    'message': 'Product not found',
+}).encode('utf-8')
+
+
+@lru_cache(maxsize=None)
+def products(size: int) -> bytes:
+    """Get JSON representation of a list of products, created once."""
+    return catalog(size)
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Handler serving canned provider responses."""
+
+    protocol_version = 'HTTP/1.1'
+
+    # Headers and body are written separately, do not delay the latter
+    disable_nagle_algorithm = True
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Respond to the GET request."""
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+
+        if url.path == '/v2/products':
+            size = int(query.get('size', ['10'])[0])
+            self.respond(200, products(size))
+        elif url.path == '/v2/products/0':
+            self.respond(404, NOT_FOUND)
+        elif url.path.startswith('/v2/products/'):
+            self.respond(200, products(1)[1:-1])
+        else:
+            self.respond(404, NOT_FOUND)
+
+    def respond(self, status: int, body: bytes):
+        """Send the JSON body with the status code."""
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):  # pylint: disable=arguments-differ
+        """Do not log requests."""
+
+
+class StubServer:
+    """Stub provider running in a background thread.
+
+    Usage:
+
+    .. code-block:: python
+
+       with StubServer() as base_url:
+           client = Client(base_url=base_url)
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        """A :class:`StubServer` object listening on the host and port."""
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(
+            target=self.server.serve_forever,
+            daemon=True,
+        )
+
+    @property
+    def base_url(self) -> str:
+        """Get the base URL of the stub."""
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self) -> str:
+        self.thread.start()
+        return self.base_url
+
+    def __exit__(self, *_exc_info):
+        self.server.shutdown()
+        self.server.server_close()
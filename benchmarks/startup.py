@@ -0,0 +1,94 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Benchmark of the client start-up.
+
+Measures the time to import :mod:`consumer.client` in a fresh interpreter
+and the time to construct a :class:`consumer.client.Client`, which matter
+for command line tools and short-lived handlers. The exit status is
+non-zero if any of them is over its budget:
+
+.. code-block:: console
+
+   $ python benchmarks/startup.py --import-budget 200 --client-budget 50
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import timeit
+
+from consumer.client import Client
+
+IMPORT_SCRIPT = '''\
+import time
+started = time.perf_counter()
+import consumer.client
+print((time.perf_counter() - started) * 1e3)
+'''
+
+
+def import_time(repeat: int) -> float:
+    """Get the median time in milliseconds to import the client module.
+
+    Every import happens in a new interpreter, thus nothing is imported in
+    advance, apart from the modules imported by the interpreter itself.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', IMPORT_SCRIPT],
+            env=env,
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        timings.append(float(output))
+    return statistics.median(timings)
+
+
+def client_time(number: int, repeat: int) -> float:
+    """Get the time in microseconds to construct a client."""
+    best = min(timeit.repeat(Client, number=number, repeat=repeat))
+    return best / number * 1e6
+
+
+def main():
+    """Run the benchmark and check results against budgets."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of measurements')
+    parser.add_argument('--number', type=int, default=10000,
+                        help='number of clients per measurement')
+    parser.add_argument('--import-budget', type=float, default=200.0,
+                        help='allowed import time in milliseconds')
+    parser.add_argument('--client-budget', type=float, default=50.0,
+                        help='allowed client construction time in us')
+    args = parser.parse_args()
+
+    results = (
+        ('import', import_time(args.repeat), args.import_budget, 'ms'),
+        ('client', client_time(args.number, args.repeat),
+         args.client_budget, 'us'),
+    )
+
+    over_budget = False
+    for name, value, budget, unit in results:
+        print(f'{name:<8} {value:10.3f} {unit} (budget {budget:.0f} {unit})')
+        if value > budget:
+            print(f'OVER BUDGET {name}: {value:.3f} {unit}', file=sys.stderr)
+            over_budget = True
+
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
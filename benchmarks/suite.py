@@ -0,0 +1,231 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Benchmark suite of the client hot paths.
+
+Runs every benchmark against the in-process provider stub from
+:mod:`server`, writes results as JSON and compares them with the stored
+baseline. The exit status is non-zero if any benchmark is slower than the
+baseline by more than the tolerance:
+
+.. code-block:: console
+
+   $ python benchmarks/suite.py --output results.json
+   $ python benchmarks/suite.py --filter load. --tolerance 0.1
+
+Timings depend on the machine, so the baseline should be recorded on the
+machine it is compared on:
+
+.. code-block:: console
+
+   $ python benchmarks/suite.py --save-baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+from functools import lru_cache
+from typing import Callable
+
+from memory import catalog, measure
+from request_prep import create_client
+from requests.models import Response
+from server import StubServer
+from startup import client_time, import_time
+
+from consumer import exceptions
+from consumer.client import Client
+from consumer.loaders import get_loader
+from consumer.schemas import ProductSchema
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+LIST_SIZES = (10, 1000, 100000)
+
+# Number of list items to deserialize per measurement, unless a list is
+# larger than that
+ITEMS_PER_MEASUREMENT = 10000
+
+
+@lru_cache(maxsize=None)
+def decoded_catalog(size: int) -> list:
+    """Get decoded JSON representation of a catalog, created once."""
+    return json.loads(catalog(size))
+
+
+def timer(func: Callable, number: int, repeat: int) -> Callable:
+    """Create a benchmark of the function returning microseconds per call.
+
+    The best of ``repeat`` measurements is taken, as higher values are
+    caused by other processes rather than by the code measured.
+    """
+    def run():
+        best = min(timeit.repeat(func, number=number, repeat=repeat))
+        return best / number * 1e6
+    return run
+
+
+def expect_error(func: Callable, error: type) -> Callable:
+    """Create a function calling ``func`` which should raise the error."""
+    def call():
+        try:
+            func()
+        except error:
+            return
+        raise AssertionError(f'{error.__name__} is not raised')
+    return call
+
+
+def error_response(status_code: int) -> Response:
+    """Create a provider response with the status code and an error."""
+    response = Response()
+    response.status_code = status_code
+    response._content = json.dumps({  # pylint: disable=protected-access
+        'code': status_code,
+        'message': 'Error',
+    }).encode('utf-8')
+    return response
+
+
+def benchmarks(base_url: str, repeat: int) -> dict:
+    """Get benchmarks by name along with units of their results."""
+    stub = create_client()
+    client = Client(base_url=base_url)
+    raise_for_status = client._raise_for_status  # pylint: disable=W0212
+
+    suite = {
+        'startup.import': (lambda: import_time(repeat), 'ms'),
+        'startup.client': (lambda: client_time(10000, repeat), 'us'),
+        'prepare.get': (timer(
+            lambda: stub.get('/v2/products', cid=2, page=3),
+            number=10000, repeat=repeat), 'us'),
+        'prepare.post': (timer(
+            lambda: stub.post('/v2/products', {'name': 'Product'}),
+            number=10000, repeat=repeat), 'us'),
+        'get.product': (timer(
+            lambda: client.products.get(1),
+            number=500, repeat=repeat), 'us'),
+        'errors.raise_for_status': (timer(
+            expect_error(
+                lambda: raise_for_status(error_response(422)),
+                exceptions.UnprocessableEntity,
+            ),
+            number=10000, repeat=repeat), 'us'),
+        'errors.not_found': (timer(
+            expect_error(
+                lambda: client.products.get(0),
+                exceptions.NotFoundError,
+            ),
+            number=500, repeat=repeat), 'us'),
+    }
+
+    for size in LIST_SIZES:
+        number = max(1, ITEMS_PER_MEASUREMENT // size)
+
+        for deserializer in ('schema', 'compiled'):
+            load = get_loader(ProductSchema, deserializer, many=True)
+            suite[f'load.{deserializer}.{size}'] = (timer(
+                lambda load=load, size=size: load(decoded_catalog(size)),
+                number=number, repeat=repeat), 'us')
+
+        suite[f'products.all.{size}'] = (timer(
+            lambda size=size: client.products.all(size=size),
+            number=number, repeat=repeat), 'us')
+
+    suite['memory.product'] = (
+        lambda: measure(ProductSchema, catalog(50000)), 'bytes')
+
+    return suite
+
+
+def run(patterns: list, repeat: int) -> dict:
+    """Run benchmarks with names containing any of the patterns."""
+    results = {}
+    with StubServer() as base_url:
+        for name, (bench, unit) in benchmarks(base_url, repeat).items():
+            if patterns and not any(p in name for p in patterns):
+                continue
+            results[name] = {'value': round(bench(), 3), 'unit': unit}
+            print(f'{name:<28} {results[name]["value"]:>14.3f} {unit}',
+                  file=sys.stderr)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Compare results with the baseline and return regressed benchmarks.
+
+    Lower values are better for every benchmark, a result is regressed if
+    it exceeds the baseline by more than the tolerance.
+
+    >>> compare({'a': {'value': 1.3}, 'b': {'value': 1.0}},
+    ...         {'a': {'value': 1.0}, 'b': {'value': 2.0}}, tolerance=0.2)
+    [('a', 1.0, 1.3)]
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]['value']
+        if result['value'] > expected * (1 + tolerance):
+            regressions.append((name, expected, result['value']))
+    return regressions
+
+
+def main():
+    """Run the benchmark suite and compare results with the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filter', action='append', default=[],
+                        help='run benchmarks with names containing the text')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of measurements per benchmark')
+    parser.add_argument('--output', help='file to write results to')
+    parser.add_argument('--baseline', default=BASELINE,
+                        help='baseline results file')
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help='allowed slowdown relative to the baseline')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store results as the new baseline')
+    args = parser.parse_args()
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': run(args.filter, args.repeat),
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+            file.write('\n')
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+            file.write('\n')
+        return
+
+    if not os.path.exists(args.baseline):
+        print('No baseline to compare with', file=sys.stderr)
+        return
+
+    with open(args.baseline, encoding='utf-8') as file:
+        baseline = json.load(file)['results']
+
+    regressions = compare(report['results'], baseline, args.tolerance)
+    for name, expected, value in regressions:
+        print(f'REGRESSION {name}: {value:.3f} vs {expected:.3f} baseline',
+              file=sys.stderr)
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
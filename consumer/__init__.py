@@ -21,3 +21,6 @@ __author__ = 'Serghei Iakovlev'
 __author_email__ = 'egrep@protonmail.ch'
 __url__ = 'https://github.com/sergeyklay/consumer-pact-example'
 __description__ = 'Consumer API example'
+
+# Deserializers turning provider data into models, see consumer.loaders
+DESERIALIZERS = frozenset({'schema', 'compiled', 'lazy'})
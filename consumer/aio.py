@@ -0,0 +1,238 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Asyncio client module for Consumer API example.
+
+This module requires the optional ``httpx`` dependency which can be
+installed using the ``async`` extra:
+
+.. code-block:: console
+
+   $ pip install consumer[async]
+"""
+
+import asyncio
+import time
+from functools import cached_property
+from typing import TYPE_CHECKING
+
+import httpx
+from httpx._decoders import SUPPORTED_DECODERS
+from urllib3.exceptions import MaxRetryError
+from urllib3.response import HTTPResponse
+
+from . import exceptions
+from .breaker import CircuitBreaker
+from .client import BaseClient, CONNECTION_ERROR_MESSAGE
+from .compression import Compression
+from .session import create_retry, RetryBudget
+from .singleflight import AsyncSingleFlight, share
+
+if TYPE_CHECKING:
+    from .resources.products import AsyncProducts
+
+# Encodings httpx is able to decode, depending on the optional packages
+ENCODINGS = frozenset(SUPPORTED_DECODERS) - {'identity'}
+
+
+def factory(max_retries=3) -> httpx.AsyncClient:
+    """Create :class:`httpx.AsyncClient` object.
+
+    Creates a session object that can be used by multiple
+    :class:`AsyncClient` instances. Connection failures are retried by the
+    transport, whereas retryable status codes are handled by
+    :meth:`AsyncClient.request` following :func:`consumer.session.create_retry`
+    policy.
+    """
+    transport = httpx.AsyncHTTPTransport(retries=abs(int(max_retries)))
+    return httpx.AsyncClient(transport=transport)
+
+
+def _retry_response(response: httpx.Response) -> HTTPResponse:
+    """Adapt the response to :class:`urllib3.util.retry.Retry` policies.
+
+    >>> response = httpx.Response(429, headers={'Retry-After': '5'})
+    >>> _retry_response(response).headers['Retry-After']
+    '5'
+    """
+    return HTTPResponse(
+        headers=dict(response.headers),
+        status=response.status_code,
+        preload_content=False,
+    )
+
+
+def _sleep_time(retry, response: HTTPResponse) -> float:
+    """Get the time to sleep before the retry, up to the retry deadline."""
+    seconds = retry.get_sleep_time(response)
+    deadline = getattr(retry, 'deadline', None)
+    if deadline is not None:
+        seconds = min(seconds, max(0.0, deadline - time.monotonic()))
+    return seconds
+
+
+class AsyncClient(BaseClient):
+    """Asyncio API client class.
+
+    Mirrors :class:`consumer.client.Client` API, but every request method is
+    a coroutine, so that many requests can be in flight on one event loop.
+    """
+
+    encodings = ENCODINGS
+
+    def __init__(self, session: httpx.AsyncClient = None, *,
+                 circuit_breaker: CircuitBreaker = None,
+                 single_flight: AsyncSingleFlight = None,
+                 compression: Compression = None, **options):
+        """A :class:`AsyncClient` object for interacting with API."""
+        super().__init__(**options)
+        self.compression = compression
+        self.circuit_breaker = circuit_breaker
+        self.single_flight = single_flight
+        self.retry = create_retry(
+            max_retries=self.options['max_retries'],
+            budget=RetryBudget(),
+        )
+        self.session = session or factory(
+            max_retries=self.options['max_retries'],
+        )
+
+    @cached_property
+    def products(self) -> 'AsyncProducts':
+        """Products API resource facade, created on first use."""
+        # pylint: disable=import-outside-toplevel
+        from .resources.products import AsyncProducts
+        return AsyncProducts(self, api_version=self.options['version'])
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the underlying session and release its connections."""
+        await self.session.aclose()
+
+    async def request(self, method: str, path: str,
+                      **options) -> httpx.Response:
+        """Dispatches a request to the API."""
+        url, request_options = self._prepare_request(method, path, options)
+        return await self._dispatch(method, url, request_options)
+
+    async def _dispatch(self, method, url, request_options):
+        """Send the prepared request through the circuit breaker, if any."""
+        if self.circuit_breaker is None:
+            return await self._send(method, url, request_options)
+
+        with self.circuit_breaker.guard(url):
+            return await self._send(method, url, request_options)
+
+    async def _send(self, method, url, request_options):
+        """Send the prepared request and map errors to API exceptions."""
+        method = method.upper()
+        retry = self.retry
+        if retry.budget is not None:
+            retry.budget.deposit()
+
+        try:
+            while True:
+                response = await self.session.request(
+                    method,
+                    url,
+                    **request_options
+                )
+
+                if not retry.is_retry(method, response.status_code):
+                    break
+
+                # Raises MaxRetryError when the retries are exhausted, or the
+                # Retry-After delay exceeds the retry time
+                retried = _retry_response(response)
+                retry = retry.increment(method, url, response=retried)
+                await asyncio.sleep(_sleep_time(retry, retried))
+
+            if self.compression is not None:
+                self.compression.observe_response(response)
+            self._raise_for_status(response)
+
+            return response
+        except MaxRetryError as retry_exc:
+            raise exceptions.RetryApiError(
+                code=response.status_code,
+                status='Exceeded API Rate Limit',
+                response=response,
+            ) from retry_exc
+        except (httpx.ConnectError, httpx.ConnectTimeout) as conn_exc:
+            raise exceptions.InternalServerError(
+                message=CONNECTION_ERROR_MESSAGE,
+            ) from conn_exc
+        except httpx.HTTPError as req_exc:
+            raise exceptions.InternalServerError() from req_exc
+
+    async def get(self, path, query=None, **options) -> httpx.Response:
+        """Parses GET request options and dispatches a request."""
+        url, request_options = self._prepare_request(
+            'get', path, options, query=query)
+        if self.single_flight is None:
+            return await self._dispatch('get', url, request_options)
+
+        return await self.single_flight.do(
+            self._flight_key(url, request_options),
+            self._dispatch_shared,
+            url,
+            request_options,
+        )
+
+    async def _dispatch_shared(self, url, request_options):
+        """Send the prepared GET request sharing its response."""
+        return share(await self._dispatch('get', url, request_options))
+
+    async def post(self, path, data, **options) -> httpx.Response:
+        """Parses POST request options and dispatches a request."""
+        return await self._create('post', path, data, **options)
+
+    async def _create(self, method, path, data, **options):
+        """Internal helper to send POST/PUT/PATCH requests."""
+        url, request_options = self._prepare_request(
+            method, path, options, data=data)
+        return await self._dispatch(method, url, request_options)
+
+    async def delete(self, path, **options) -> httpx.Response:
+        """Dispatches a DELETE request."""
+        return await self.request('delete', path, **options)
+
+    def _prepare_request(self, method, path, options, query=None,
+                         data=None):
+        """Build the request URL and the options to dispatch a request with.
+
+        Translates the options prepared by the base implementation to the
+        :meth:`httpx.AsyncClient.request` signature. The ``stream`` and
+        ``verify`` options are configured on the session in ``httpx``, thus
+        they are ignored per request.
+
+        Usage:
+
+        >>> client = AsyncClient()
+        >>> client._prepare_request('put', '/', {'data': {'foo': 'bar'}})[1]
+        {'timeout': 5.0, 'content': '{"foo": "bar"}', 'headers': {}}
+        >>> client._prepare_request('delete', '/', {'stream': True})[1]
+        {'timeout': 5.0, 'headers': {}}
+        """
+        url, request_options = super()._prepare_request(
+            method, path, options, query=query, data=data)
+
+        request_options.pop('stream', None)
+        request_options.pop('verify', None)
+
+        if 'data' in request_options:
+            request_options['content'] = request_options.pop('data')
+
+        # Preserve the order of the keys for readability
+        request_options['headers'] = request_options.pop('headers')
+
+        return url, request_options
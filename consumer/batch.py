@@ -0,0 +1,240 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Module providing columnar representation of products.
+
+A :class:`ProductBatch` stores products column by column in typed
+contiguous arrays instead of one :class:`consumer.models.Product` object per
+row, which is much more compact and faster to aggregate.
+"""
+
+import heapq
+from array import array
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache, partial
+from typing import Any, Callable, Iterable, Iterator, Union
+
+from .loaders import get_loader
+from .models import Product
+from .schemas import ProductRowSchema
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# UTC offset stored for naive timestamps
+NAIVE = -(2 ** 31)
+
+
+class ProductBatch:
+    """Columnar batch of products.
+
+    Numeric fields are stored in :mod:`array` columns, timestamps as
+    microseconds since the Epoch along with the UTC offset in seconds.
+    Indexing or iterating the batch creates :class:`Product` views lazily.
+    """
+
+    NUMERIC_COLUMNS = {
+        'id': 'q',
+        'price': 'd',
+        'discount': 'd',
+        'rating': 'd',
+        'stock': 'q',
+        'brand_id': 'q',
+        'category_id': 'q',
+    }
+
+    TIMESTAMP_COLUMNS = ('created_at', 'updated_at')
+
+    TEXT_COLUMNS = ('name', 'description')
+
+    def __init__(self):
+        """A :class:`ProductBatch` object with empty columns."""
+        self.columns = {
+            name: array(typecode)
+            for name, typecode in self.NUMERIC_COLUMNS.items()
+        }
+
+        for name in self.TIMESTAMP_COLUMNS:
+            self.columns[name] = array('q')
+            self.columns[f'{name}_offset'] = array('i')
+
+        for name in self.TEXT_COLUMNS:
+            self.columns[name] = []
+
+    @classmethod
+    def from_products(cls, products: Iterable[Product]) -> 'ProductBatch':
+        """Create a batch consuming the products one by one."""
+        batch = cls()
+        for product in products:
+            batch.append(product)
+        return batch
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict]) -> 'ProductBatch':
+        """Create a batch consuming deserialized product fields one by one.
+
+        >>> ProductBatch.from_rows([])
+        <ProductBatch: size=0>
+        """
+        batch = cls()
+        for row in rows:
+            batch.append_row(row)
+        return batch
+
+    def append(self, product: Product):
+        """Append the product to the end of the batch."""
+        self._append(partial(getattr, product))
+
+    def append_row(self, row: dict):
+        """Append the deserialized product fields to the end of the batch.
+
+        Timestamps may be ISO 8601 strings kept as is by the ``'lazy'``
+        deserializer.
+        """
+        self._append(row.get)
+
+    def _append(self, get: Callable[[str], Any]):
+        """Append the product with the field values got by their names."""
+        for name in self.NUMERIC_COLUMNS:
+            self.columns[name].append(get(name))
+
+        for name in self.TIMESTAMP_COLUMNS:
+            value = get(name)
+            if value.__class__ is str:
+                value = datetime.fromisoformat(value)
+            micros, offset = _to_micros(value)
+            self.columns[name].append(micros)
+            self.columns[f'{name}_offset'].append(offset)
+
+        for name in self.TEXT_COLUMNS:
+            self.columns[name].append(get(name))
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    def __getitem__(self, index: int) -> Product:
+        """Create a :class:`Product` view of the row at the index."""
+        columns = self.columns
+        data = {name: columns[name][index] for name in self.NUMERIC_COLUMNS}
+
+        for name in self.TIMESTAMP_COLUMNS:
+            data[name] = _from_micros(
+                columns[name][index],
+                columns[f'{name}_offset'][index],
+            )
+
+        for name in self.TEXT_COLUMNS:
+            data[name] = columns[name][index]
+
+        return Product(**data)
+
+    def __iter__(self) -> Iterator[Product]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __repr__(self):
+        """Provide an easy-to-read description of the current instance."""
+        return f'<{self.__class__.__name__}: size={len(self)}>'
+
+    def copy(self) -> 'ProductBatch':
+        """Create a new batch with copies of the columns."""
+        batch = ProductBatch()
+        batch.columns = {
+            name: column[:] for name, column in self.columns.items()
+        }
+        return batch
+
+    def column(self, name: str) -> Union[array, list]:
+        """Get the column by the field name."""
+        return self.columns[name]
+
+    def as_numpy(self, name: str):
+        """Get the numeric column as a NumPy array sharing its memory.
+
+        Requires the optional ``numpy`` package.
+        """
+        # pylint: disable=import-outside-toplevel,import-error
+        import numpy
+
+        column = self.columns[name]
+        return numpy.frombuffer(column, dtype=column.typecode)
+
+    def effective_prices(self) -> array:
+        """Calculate prices with the discount applied for all products."""
+        return array('d', map(
+            lambda price, discount: price * (1 - discount),
+            self.columns['price'],
+            self.columns['discount'],
+        ))
+
+    def take(self, indices: Iterable[int]) -> 'ProductBatch':
+        """Create a new batch from the rows at the indices."""
+        indices = list(indices)
+        batch = ProductBatch()
+        for name, column in self.columns.items():
+            values = [column[index] for index in indices]
+            if isinstance(column, array):
+                batch.columns[name] = array(column.typecode, values)
+            else:
+                batch.columns[name] = values
+        return batch
+
+    def filter(self, mask: Iterable[bool]) -> 'ProductBatch':
+        """Create a new batch from the rows the mask is true for.
+
+        >>> batch = ProductBatch()
+        >>> batch.filter(p > 10.0 for p in batch.column('price'))
+        <ProductBatch: size=0>
+        """
+        return self.take(index for index, keep in enumerate(mask) if keep)
+
+    def top_rated(self, n: int) -> 'ProductBatch':
+        """Create a new batch of the ``n`` products with the top rating."""
+        rating = self.columns['rating']
+        return self.take(
+            heapq.nlargest(n, range(len(self)), key=rating.__getitem__)
+        )
+
+
+@lru_cache(maxsize=None)
+def batch_loader(deserializer: str = 'schema') -> Callable[[Any], Any]:
+    """Get the loader deserializing a list of products into a batch.
+
+    Products are validated by the ``deserializer`` one by one and stored in
+    the columns at once, without creating a :class:`Product` per row. The
+    loader is created once per deserializer, so that results it loads from
+    cached or shared responses are reused.
+    """
+    load = get_loader(ProductRowSchema, deserializer)
+    load_many = get_loader(ProductRowSchema, deserializer, many=True)
+
+    def load_batch(data):
+        if data.__class__ is not list:
+            # Let the schema reject the data
+            return ProductBatch.from_rows(load_many(data))
+        return ProductBatch.from_rows(map(load, data))
+
+    return load_batch
+
+
+def _to_micros(value: datetime) -> tuple[int, int]:
+    """Convert the datetime to microseconds since the Epoch and UTC offset."""
+    offset = value.utcoffset()
+    if offset is None:
+        value = value.replace(tzinfo=timezone.utc)
+        offset = NAIVE
+    else:
+        offset = int(offset.total_seconds())
+
+    return (value - EPOCH) // timedelta(microseconds=1), offset
+
+
+def _from_micros(micros: int, offset: int) -> datetime:
+    """Convert microseconds since the Epoch and UTC offset to datetime."""
+    value = EPOCH + timedelta(microseconds=micros)
+    if offset == NAIVE:
+        return value.replace(tzinfo=None)
+    return value.astimezone(timezone(timedelta(seconds=offset)))
@@ -0,0 +1,224 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Circuit breaker module for Consumer API example.
+
+This module provides a circuit breaker failing requests fast while the
+provider is unavailable. Every endpoint template has a circuit with the
+following states:
+
+* ``closed`` - requests are sent, and their outcomes are tracked in a
+  sliding window; the circuit opens once the failure rate reaches the
+  threshold
+* ``open`` - requests are rejected with
+  :class:`consumer.exceptions.CircuitOpenError` without being sent, until
+  the reset timeout expires
+* ``half-open`` - a limited number of probe requests are sent; the circuit
+  closes if a probe succeeds, or opens again otherwise
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterable, Type
+from urllib.parse import urlsplit
+
+from .exceptions import (
+    ApiError,
+    CircuitOpenError,
+    InternalServerError,
+    RetryApiError,
+)
+from .metrics import endpoint_template
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class Circuit:  # pylint: disable=too-many-instance-attributes
+    """Thread-safe circuit of a single endpoint."""
+
+    def __init__(self, endpoint: str, breaker: 'CircuitBreaker'):
+        """A :class:`Circuit` object in the closed state."""
+        self.endpoint = endpoint
+        self.breaker = breaker
+        self.state = CLOSED
+        self.outcomes = deque(maxlen=breaker.window)
+        self.opened_at = 0.0
+        self.probes = 0
+        self.rejected = 0
+
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """Admit a request, or raise if the circuit is open.
+
+        Returns whether the request is a probe of the half-open circuit.
+        """
+        with self._lock:
+            if self.state == OPEN:
+                remaining = (
+                    self.opened_at + self.breaker.reset_timeout -
+                    time.monotonic()
+                )
+                if remaining > 0.0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.endpoint, remaining)
+                self.state = HALF_OPEN
+
+            if self.state == HALF_OPEN:
+                if self.probes >= self.breaker.half_open_probes:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.endpoint, 0.0)
+                self.probes += 1
+                return True
+
+            return False
+
+    def record(self, probe: bool, failed: bool):
+        """Account the outcome of an admitted request."""
+        with self._lock:
+            if probe:
+                self.probes -= 1
+                if self.state == HALF_OPEN:
+                    if failed:
+                        self._open()
+                    else:
+                        self._close()
+                return
+
+            # Requests admitted before the circuit opened do not count
+            if self.state != CLOSED:
+                return
+
+            self.outcomes.append(failed)
+            if (len(self.outcomes) >= self.breaker.min_calls and
+                    sum(self.outcomes) / len(self.outcomes) >=
+                    self.breaker.failure_threshold):
+                self._open()
+
+    def release(self, probe: bool):
+        """Release the admitted request without accounting its outcome."""
+        if probe:
+            with self._lock:
+                self.probes -= 1
+
+    def stats(self) -> dict:
+        """Return the circuit state and counters."""
+        with self._lock:
+            return {
+                'state': self.state,
+                'calls': len(self.outcomes),
+                'failures': sum(self.outcomes),
+                'rejected': self.rejected,
+            }
+
+    def _open(self):
+        """Open the circuit, the lock should be held."""
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+
+    def _close(self):
+        """Close the circuit forgetting past outcomes, the lock is held."""
+        self.state = CLOSED
+        self.outcomes.clear()
+
+
+class CircuitBreaker:  # pylint: disable=too-many-instance-attributes
+    """Circuit breaker keeping a circuit per endpoint template.
+
+    A circuit opens once at least ``failure_threshold`` of the last
+    ``window`` requests failed, provided there were ``min_calls`` requests
+    at least. It stays open for ``reset_timeout`` seconds, then lets
+    ``half_open_probes`` requests through at once to detect recovery.
+    Requests fail if they raise any of ``failures`` exceptions, i.e. on
+    server errors, connection errors and exhausted retries by default.
+
+    >>> breaker = CircuitBreaker(min_calls=1)
+    >>> with breaker.guard('http://localhost/v2/products/1'):
+    ...     pass
+    >>> breaker.state('http://localhost/v2/products/2')
+    'closed'
+
+    The breaker is thread safe and can be shared by many clients.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, failure_threshold: float = 0.5, window: int = 20,
+                 min_calls: int = 10, reset_timeout: float = 30.0,
+                 half_open_probes: int = 1, *,
+                 failures: Iterable[Type[Exception]] = (
+                     InternalServerError, RetryApiError)):
+        """A :class:`CircuitBreaker` object with all circuits closed."""
+        if not 0.0 < failure_threshold <= 1.0:
+            raise ValueError('Failure threshold should be between 0 and 1')
+
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.min_calls = min(min_calls, window)
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.failures = tuple(failures)
+
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def circuit(self, url: str) -> Circuit:
+        """Get the circuit of the endpoint the URL belongs to."""
+        endpoint = endpoint_template(urlsplit(url).path)
+        circuit = self._circuits.get(endpoint)
+        if circuit is not None:
+            return circuit
+
+        with self._lock:
+            if endpoint not in self._circuits:
+                self._circuits[endpoint] = Circuit(endpoint, self)
+            return self._circuits[endpoint]
+
+    @contextmanager
+    def guard(self, url: str):
+        """Guard sending a request to the URL with the circuit.
+
+        Raises :class:`consumer.exceptions.CircuitOpenError` without running
+        the block if the circuit is open, and records the block outcome
+        otherwise. Errors raised before the request is sent, e.g. by the
+        rate limiter, release the circuit without recording an outcome.
+        """
+        circuit = self.circuit(url)
+        probe = circuit.acquire()
+        failed = None
+        try:
+            yield circuit
+            failed = False
+        except self.failures:
+            failed = True
+            raise
+        except ApiError as exc:
+            # The provider responded, e.g. with a client error
+            if exc.response is not None:
+                failed = False
+            raise
+        finally:
+            if failed is None:
+                circuit.release(probe)
+            else:
+                circuit.record(probe, failed)
+
+    def state(self, url: str) -> str:
+        """Get the state of the circuit the URL belongs to."""
+        return self.circuit(url).stats()['state']
+
+    def stats(self) -> dict:
+        """Return states and counters of circuits by endpoint templates."""
+        with self._lock:
+            circuits = dict(self._circuits)
+        return {
+            endpoint: circuit.stats()
+            for endpoint, circuit in sorted(circuits.items())
+        }
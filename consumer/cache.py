@@ -0,0 +1,598 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""HTTP cache module for Consumer API example.
+
+This module provides a conditional request cache. Responses carrying
+``ETag`` or ``Last-Modified`` validators are stored along with the data
+deserialized from them, so that a ``304 Not Modified`` provider response
+is served without downloading and deserializing the body again.
+
+Responses validated within ``max_age`` seconds are served without
+revalidation. Responses validated within ``stale_while_revalidate`` seconds
+more are served at once, while they are revalidated in the background.
+
+Responses can be persisted in a SQLite database by :class:`PersistentCache`,
+so that they survive restarts of the process.
+"""
+
+import copy
+import io
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from requests.models import PreparedRequest, Response
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    """Define a cached response along with its validators."""
+
+    response: Response
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    values: dict = field(default_factory=dict)
+    validated: Optional[float] = None
+
+    def age(self) -> float:
+        """Get seconds since the response was validated by the provider.
+
+        Responses not validated by the current process are of infinite age.
+        """
+        if self.validated is None:
+            return float('inf')
+        return time.monotonic() - self.validated
+
+    def validators(self) -> dict:
+        """Return conditional request headers for the cached response."""
+        headers = {}
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def serve(self, response: Optional[Response] = None) -> Response:
+        """Copy the cached response to be handed out to a single call.
+
+        Every call gets a copy of its own, so that attributes attached to it,
+        e.g. request metrics, are not shared by the calls. The copy served
+        along with the provider ``response`` takes its timing, otherwise it
+        is marked as a cache hit served without sending a request.
+        """
+        served = copy.copy(self.response)
+        served.cache_entry = self
+        served.cache_hit = response is None
+        if response is not None:
+            served.elapsed = response.elapsed
+            served.request = response.request
+            served.raw = response.raw
+        return served
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of conditional GET responses.
+
+    The cache can be shared by multiple :class:`consumer.client.Client`
+    instances:
+
+    >>> cache = ResponseCache(maxsize=2)
+    >>> cache.stats()  # doctest: +NORMALIZE_WHITESPACE
+    {'size': 0, 'maxsize': 2, 'hits': 0, 'misses': 0, 'revalidations': 0,
+     'fresh': 0, 'stale': 0, 'refresh_errors': 0}
+
+    Stale responses are revalidated using at most ``refresh_workers``
+    background threads, a single revalidation per response at once.
+    Failed revalidations are logged and counted, whereas the stale response
+    is served until it is revalidated or expires. The threads are stopped
+    by :meth:`close`.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, maxsize: int = 128, max_age: float = 0.0,
+                 stale_while_revalidate: float = 0.0,
+                 refresh_workers: int = 2):
+        """A :class:`ResponseCache` object holding up to ``maxsize`` items."""
+        if maxsize < 1:
+            raise ValueError('Cache size should be a positive integer')
+
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self.stale_while_revalidate = stale_while_revalidate
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.fresh = 0
+        self.stale = 0
+        self.refresh_errors = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._executor = None
+        if stale_while_revalidate > 0.0:
+            self._executor = ThreadPoolExecutor(
+                max_workers=refresh_workers,
+                thread_name_prefix='consumer-refresh',
+            )
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(url: str, params: Optional[dict] = None) -> str:
+        """Build a cache key from the request URL and query string.
+
+        >>> ResponseCache.key('http://localhost/v2/products', {'cid': 2})
+        'http://localhost/v2/products?cid=2'
+        """
+        request = PreparedRequest()
+        request.prepare_url(url, params)
+        return request.url
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Get the cache entry and mark it as the most recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        """Store the cache entry evicting the least recently used one."""
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def lookup(self, key: str,
+               refresh: Callable[[], Any]) -> Optional[Response]:
+        """Get the cached response, if it can be served without revalidation.
+
+        Stale response is served as well, and the ``refresh`` function
+        revalidating it is called in the background, unless revalidation of
+        the response is already in progress.
+        """
+        entry = self.get(key)
+        if entry is None:
+            return None
+
+        age = entry.age()
+        if age <= self.max_age:
+            with self._lock:
+                self.fresh += 1
+            return entry.serve()
+
+        if age > self.max_age + self.stale_while_revalidate:
+            return None
+
+        with self._lock:
+            # Checked along with submitting, since the cache may be closed
+            if self._executor is None:
+                return None
+            self.stale += 1
+            if key in self._refreshing:
+                return entry.serve()
+            self._refreshing.add(key)
+            future = self._executor.submit(refresh)
+
+        future.add_done_callback(lambda done: self._refreshed(key, done))
+        return entry.serve()
+
+    def _refreshed(self, key: str, future: Future):
+        """Mark revalidation of the response completed, counting failures."""
+        error = None if future.cancelled() else future.exception()
+        if error is not None:
+            # Standard library loggers format messages with % operator
+            # pylint: disable=logging-too-many-args
+            logger.warning('Revalidation of %s failed', key, exc_info=error)
+
+        with self._lock:
+            self._refreshing.discard(key)
+            if error is not None:
+                self.refresh_errors += 1
+
+    def revalidate(self, key: str) -> Optional[CacheEntry]:
+        """Get the cache entry to send a conditional request for, if any.
+
+        The entry should be passed to :meth:`update` along with the provider
+        response, so that ``304 Not Modified`` is served from it even if the
+        entry is evicted meanwhile.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            with self._lock:
+                self.revalidations += 1
+        return entry
+
+    def update(self, key: str, response: Response,
+               entry: Optional[CacheEntry] = None) -> Response:
+        """Update the cache from the provider response.
+
+        Returns a copy of the revalidated ``entry`` response in case of
+        ``304 Not Modified`` provider response, a copy of the cached provider
+        response, or the provided response if it is not cached.
+        """
+        if response.status_code == 304 and entry is not None:
+            with self._lock:
+                self.hits += 1
+            entry.validated = time.monotonic()
+            return entry.serve(response)
+
+        with self._lock:
+            self.misses += 1
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if response.status_code == 200 and (etag or last_modified):
+            entry = CacheEntry(
+                response,
+                etag,
+                last_modified,
+                validated=time.monotonic(),
+            )
+            self.set(key, entry)
+            return entry.serve(response)
+
+        return response
+
+    def invalidate(self, url: str):
+        """Remove responses of the URL, whatever their query strings are.
+
+        >>> cache = ResponseCache()
+        >>> url = 'http://localhost/v2/products'
+        >>> cache.set(cache.key(url, {'cid': 2}), CacheEntry(Response()))
+        >>> cache.invalidate(url)
+        >>> len(cache)
+        0
+        """
+        key = self.key(url)
+        with self._lock:
+            for cached in [k for k in self._entries if _matches(k, key)]:
+                del self._entries[cached]
+
+    def load(self, response: Response, loader: Callable[[Any], Any]) -> Any:
+        """Deserialize the response body reusing the cached result.
+
+        Every ``loader`` is called with the decoded JSON body only once per
+        cached response, even if it is evicted from the cache meanwhile.
+        """
+        # Responses served from the cache refer to their entries, thus the
+        # cache itself is not looked up
+        entry = getattr(response, 'cache_entry', None)
+        if entry is None:
+            return loader(response.json())
+
+        if loader not in entry.values:
+            entry.values[loader] = loader(response.json())
+        return entry.values[loader]
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def close(self):
+        """Stop background revalidation threads.
+
+        Revalidation in progress is completed, pending ones are cancelled.
+        Stale responses are revalidated before they are served afterwards.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    def stats(self) -> dict:
+        """Return cache usage statistics."""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidations': self.revalidations,
+                'fresh': self.fresh,
+                'stale': self.stale,
+                'refresh_errors': self.refresh_errors,
+            }
+
+
+def _matches(cached: str, key: str) -> bool:
+    """Check whether the cached key is the key, or the key with a query.
+
+    >>> _matches('http://localhost/v2/products?cid=2',
+    ...          'http://localhost/v2/products')
+    True
+    >>> _matches('http://localhost/v2/products/1',
+    ...          'http://localhost/v2/products')
+    False
+    """
+    return cached == key or cached.startswith(key + '?')
+
+
+# Headers describing the encoded body on the wire, not the stored one
+TRANSFER_HEADERS = frozenset({
+    'content-encoding',
+    'content-length',
+    'transfer-encoding',
+    'connection',
+    'keep-alive',
+})
+
+SCHEMA = """
+BEGIN IMMEDIATE;
+
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+
+-- Total size of stored responses, maintained along with them
+CREATE TABLE IF NOT EXISTS usage (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    size INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO usage (id, size)
+SELECT 0, COALESCE(SUM(size), 0) FROM responses;
+
+CREATE TRIGGER IF NOT EXISTS responses_inserted AFTER INSERT ON responses
+BEGIN
+    UPDATE usage SET size = size + NEW.size WHERE id = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS responses_updated AFTER UPDATE OF size
+ON responses
+BEGIN
+    UPDATE usage SET size = size - OLD.size + NEW.size WHERE id = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS responses_deleted AFTER DELETE ON responses
+BEGIN
+    UPDATE usage SET size = size - OLD.size WHERE id = 0;
+END;
+
+COMMIT;
+"""
+
+
+class PersistentCache(ResponseCache):
+    """Conditional GET response cache persisted in a SQLite database.
+
+    Recently used entries are kept in memory as :class:`ResponseCache` does,
+    whereas all of them are stored in the database at ``path``. Entries of
+    the database are revalidated by the provider once they are used after
+    the restart, so that unchanged responses are not downloaded again.
+
+    The database is shared by processes using the same ``path``: readers
+    do not block each other, nor the writer. Once its size exceeds
+    ``max_bytes``, the least recently used entries are evicted. The access
+    time of an entry is written at most once per ``touch_interval``
+    seconds, so that reading the cache seldom writes to the database.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(self, path: str, maxsize: int = 128,
+                 max_bytes: int = 64 * 1024 * 1024, timeout: float = 5.0,
+                 touch_interval: float = 60.0, **options):
+        """A :class:`PersistentCache` object stored in the database.
+
+        Other ``options`` are the :class:`ResponseCache` ones.
+        """
+        super().__init__(maxsize=maxsize, **options)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.touch_interval = touch_interval
+        self.loaded = 0
+        self.evicted = 0
+
+        self._local = threading.local()
+        self._connections = []
+        self._connect().executescript(SCHEMA)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Get the cache entry, loading it from the database if needed."""
+        entry = super().get(key)
+        if entry is not None:
+            return entry
+
+        entry = self._read(key)
+        if entry is not None:
+            ResponseCache.set(self, key, entry)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        """Store the cache entry in memory and in the database."""
+        super().set(key, entry)
+        self._write(key, entry)
+
+    def clear(self):
+        """Remove all entries from the cache and the database."""
+        super().clear()
+        with self._connect() as connection:
+            connection.execute('DELETE FROM responses')
+
+    def close(self):
+        """Stop background revalidation and close database connections.
+
+        Connections of all threads are closed, the database is connected
+        again if the cache is used afterwards.
+        """
+        super().close()
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+
+        pid = os.getpid()
+        for owner, connection in connections:
+            # Connections inherited from the parent process are its own
+            if owner == pid:
+                connection.close()
+
+    def invalidate(self, url: str):
+        """Remove responses of the URL from memory and the database."""
+        super().invalidate(url)
+
+        key = self.key(url)
+        with self._connect() as connection:
+            connection.execute(
+                'DELETE FROM responses '
+                'WHERE key = ? OR substr(key, 1, ?) = ?',
+                (key, len(key) + 1, key + '?'),
+            )
+
+    def stats(self) -> dict:
+        """Return cache usage statistics."""
+        stats = super().stats()
+        row = self._connect().execute(
+            'SELECT (SELECT COUNT(*) FROM responses), size FROM usage '
+            'WHERE id = 0'
+        ).fetchone()
+
+        with self._lock:
+            stats.update(
+                stored=row[0],
+                stored_bytes=row[1],
+                loaded=self.loaded,
+                evicted=self.evicted,
+            )
+        return stats
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get the database connection of the current thread and process."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+
+        # Used by the current thread only, but closed by any thread
+        connection = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            check_same_thread=False,
+        )
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+
+        with self._lock:
+            self._connections.append((os.getpid(), connection))
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _read(self, key: str) -> Optional[CacheEntry]:
+        """Load the cache entry from the database."""
+        connection = self._connect()
+        row = connection.execute(
+            'SELECT headers, body, etag, last_modified, accessed '
+            'FROM responses WHERE key = ?',
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        headers, body, etag, last_modified, accessed = row
+        now = time.time()
+        if now - accessed >= self.touch_interval:
+            with connection:
+                connection.execute(
+                    'UPDATE responses SET accessed = ? WHERE key = ?',
+                    (now, key),
+                )
+
+        with self._lock:
+            self.loaded += 1
+
+        response = stored_response(key, json.loads(headers), body)
+        return CacheEntry(response, etag, last_modified)
+
+    def _write(self, key: str, entry: CacheEntry):
+        """Store the cache entry in the database evicting old entries."""
+        response = entry.response
+        headers = {
+            name: value for name, value in response.headers.items()
+            if name.lower() not in TRANSFER_HEADERS
+        }
+        body = response.content
+
+        with self._connect() as connection:
+            # Upsert, since replaced rows do not fire delete triggers
+            connection.execute(
+                'INSERT INTO responses '
+                '(key, headers, body, etag, last_modified, size, accessed) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET '
+                'headers = excluded.headers, body = excluded.body, '
+                'etag = excluded.etag, '
+                'last_modified = excluded.last_modified, '
+                'size = excluded.size, accessed = excluded.accessed',
+                (key, json.dumps(headers), body, entry.etag,
+                 entry.last_modified, len(body), time.time()),
+            )
+            self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection):
+        """Delete least recently used entries exceeding the size limit."""
+        total = connection.execute(
+            'SELECT size FROM usage WHERE id = 0'
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = []
+        rows = connection.execute(
+            'SELECT key, size FROM responses ORDER BY accessed'
+        )
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+
+        connection.executemany('DELETE FROM responses WHERE key = ?', evicted)
+        with self._lock:
+            self.evicted += len(evicted)
+
+
+def stored_response(url: str, headers: dict, body: bytes) -> Response:
+    """Build ``200 OK`` response out of the stored headers and body.
+
+    >>> response = stored_response('http://localhost/v2/products', {}, b'[]')
+    >>> response.json()
+    []
+    """
+    response = Response()
+    response.status_code = 200
+    response.reason = 'OK'
+    response.url = url
+    response.headers = CaseInsensitiveDict(headers)
+    response.raw = io.BytesIO(body)
+
+    # Read the body at once, so that the response can be shared by threads
+    _ = response.content
+    return response
@@ -8,8 +8,16 @@
 """Client module for Consumer API example."""
 
 import json
+import threading
+import time
+from functools import cached_property
+from itertools import chain
+from types import MappingProxyType
+from typing import Optional, TYPE_CHECKING
+from urllib.parse import urlsplit
 
 from asdicts.dict import intersect_keys, merge
+from requests import Session
 from requests.exceptions import (
     ConnectionError,
     RequestException,
@@ -19,9 +27,22 @@ from requests.models import Response
 from requests.structures import CaseInsensitiveDict
 from urllib3.exceptions import MaxRetryError
 
-from . import __url__, __version__
-from . import exceptions, session
-from .resources.products import Products
+from . import __url__, __version__, DESERIALIZERS
+from . import exceptions
+from .metrics import endpoint_template, RequestRecord
+from .session import connect_time, factory as create_session
+from .session import observe_retries, pool_stats, retries_made
+from .singleflight import request_key, share
+
+if TYPE_CHECKING:
+    from .breaker import CircuitBreaker
+    from .cache import ResponseCache
+    from .compression import Compression
+    from .dataloader import Batching
+    from .metrics import Metrics
+    from .ratelimit import RateLimiter
+    from .resources.products import Products
+    from .singleflight import SingleFlight
 
 
 def default_user_agent() -> str:
@@ -29,6 +50,13 @@ def default_user_agent() -> str:
     return f'consumer-example/{__version__} ({__url__})'
 
 
+CONNECTION_ERROR_MESSAGE = (
+    'A connection attempt failed because the connected party did not '
+    'properly respond after a period of time, or established connection '
+    'failed because connected host has failed to respond.'
+)
+
+
 def default_headers() -> CaseInsensitiveDict:
     """Return a dictionary representing the default request headers."""
     return CaseInsensitiveDict({
@@ -47,8 +75,30 @@ def default_headers() -> CaseInsensitiveDict:
     })
 
 
-class Client:
-    """API client class."""
+# Default headers of POST/PUT/PATCH requests, built once and shared by all
+# requests.
+CREATE_HEADERS = MappingProxyType(dict(default_headers()))
+
+# `Content-Type` HTTP header should be set only for PUT and POST
+GET_HEADERS = MappingProxyType({
+    name: value
+    for name, value in CREATE_HEADERS.items()
+    if name != 'Content-Type'
+})
+
+# Methods changing the state of resources, their responses are not cached
+UNSAFE_METHODS = frozenset({'delete', 'patch', 'post', 'put'})
+
+# Headers turning a GET request into a conditional one, in lower case
+CONDITIONAL_HEADERS = frozenset({'if-none-match', 'if-modified-since'})
+
+
+class BaseClient:  # pylint: disable=too-few-public-methods
+    """Base API client class.
+
+    Holds options handling and status code mapping shared by the blocking
+    :class:`Client` and the asyncio based :class:`consumer.aio.AsyncClient`.
+    """
 
     DEFAULT_OPTIONS = {
         # API endpoint base URL to connect to.
@@ -92,35 +142,359 @@ class Client:
 
     ALL_OPTIONS = CLIENT_OPTIONS | QUERY_OPTIONS | REQUEST_OPTIONS
 
-    def __init__(self, **options):
-        """A :class:`Client` object for interacting with API."""
+    # Conditional request cache, disabled unless provided by the client.
+    cache = None
+
+    # Request metrics registry, disabled unless provided by the client.
+    metrics = None
+
+    # Client-side rate limiter, disabled unless provided by the client.
+    rate_limiter = None
+
+    # Circuit breaker, disabled unless provided by the client.
+    circuit_breaker = None
+
+    # Group collapsing identical GET requests, disabled unless provided.
+    single_flight = None
+
+    # Batching of single product lookups, disabled unless provided.
+    batching = None
+
+    # Compression of request and response bodies, disabled unless provided.
+    compression = None
+
+    # Encodings the transport decodes, the urllib3 ones unless overridden.
+    encodings = None
+
+    # Status codes of provider responses mapped to API errors.
+    statuses = exceptions.STATUSES
+
+    def __init__(self, deserializer: str = 'schema', **options):
+        """A :class:`BaseClient` object holding the client options.
+
+        The ``deserializer`` selects how provider data is turned into models,
+        see :mod:`consumer.loaders` for details.
+        """
+        if deserializer not in DESERIALIZERS:
+            raise ValueError(f'Unknown deserializer: {deserializer!r}')
+
+        self.deserializer = deserializer
         self.options = merge(self.DEFAULT_OPTIONS, options)
         self.headers = options.pop('headers', {})
-        self.session = session.factory(
-            max_retries=self.options['max_retries'],
+
+        # Lookup table of option kinds, see _classify_options()
+        self._option_kinds = {
+            key: kind
+            for kind, keys in enumerate((
+                self.CLIENT_OPTIONS,
+                self.QUERY_OPTIONS,
+                self.REQUEST_OPTIONS,
+            ))
+            for key in keys
+        }
+
+    def _raise_for_status(self, response):
+        """Raise an API error matching the status code of the response."""
+        if response.status_code in self.statuses:
+            raise self.statuses[response.status_code](response=response)
+
+        # Any unhandled 5xx is a server error
+        if 500 <= response.status_code < 600:
+            raise exceptions.InternalServerError(response=response)
+
+    @staticmethod
+    def _resolve_url(path, options):
+        """Build an absolute request URL from the base URL and the path."""
+        return options['base_url'].rstrip('/') + '/' + path.lstrip('/')
+
+    def _classify_options(self, options):
+        """Merge options with the client's ones and group them by their kind.
+
+        Options are classified in a single pass, values in the provided
+        ``options`` take precedence. Returns client, query string, request and
+        unknown options, in that order.
+
+        Usage:
+
+        >>> client = Client(foo='bar')
+        >>> client._classify_options({'bid': 42, 'timeout': 1.0})[1:]
+        ({'bid': 42}, {'timeout': 1.0}, {'foo': 'bar'})
+        >>> client._classify_options({})[0]
+        {'base_url': 'http://localhost', 'max_retries': 3, 'version': 'v2'}
+        """
+        groups = ({}, {}, {}, {})
+        kinds = self._option_kinds
+        for key, value in chain(self.options.items(), options.items()):
+            groups[kinds.get(key, 3)][key] = value
+        return groups
+
+    def _prepare_request(self, method, path, options, query=None, data=None):
+        """Build the request URL and the options to dispatch a request with.
+
+        Query string and unknown options are passed as query parameters of
+        GET requests, or merged into the ``data`` of POST/PUT/PATCH requests,
+        values in the ``query`` and ``data`` take precedence. Other requests
+        take request options only.
+
+        Usage:
+
+        >>> client = Client()
+        >>> url, request_options = client._prepare_request(
+        ...     'get', '/v2/products', {'cid': 2, 'foo': None})
+        >>> url
+        'http://localhost/v2/products'
+        >>> request_options['params']
+        {'cid': 2, 'foo': 'null'}
+        >>> request_options = client._prepare_request(
+        ...     'post', '/v2/products', {'foo': True}, data={'bar': 1})[1]
+        >>> request_options['data']
+        '{"foo": true, "bar": 1}'
+        >>> client._prepare_request('delete', '/v2/products/1', {})[1]
+        {'timeout': 5.0, 'headers': {}}
+        """
+        client_options, query_options, request_options, parameters = (
+            self._classify_options(options)
         )
 
-        self._init_statuses()
+        if method == 'get':
+            request_options['params'] = {**query_options, **parameters,
+                                         **(query or {})}
+            template = GET_HEADERS
+        elif data is not None:
+            request_options['data'] = {**parameters, **data}
+            template = CREATE_HEADERS
+        else:
+            template = {}
 
-        # Initialize each resource facade and injecting client object into it
-        self.products = Products(self, api_version=self.options['version'])
+        # If 'params' is in request_options, format the params values to be
+        # JSON serializable
+        if 'params' in request_options:
+            request_options['params'] = {
+                # json.dumps(None) -> 'null'
+                # json.dumps(True) -> 'true'
+                key: json.dumps(value)
+                if isinstance(value, bool) or value is None else value
+                for key, value in request_options['params'].items()
+            }
+
+        # If 'data' is in request_options, serialize it to JSON, since
+        # requests library doesn't do it automatically
+        if 'data' in request_options:
+            request_options['data'] = json.dumps(request_options['data'])
+
+        # Values in the ``options['headers']`` takes precedence
+        request_options['headers'] = {
+            **self.headers,
+            **template,
+            **self.options.get('headers', {}),
+            **options.get('headers', {}),
+        }
+
+        if self.compression is not None:
+            self._compress_request(request_options)
+
+        return self._resolve_url(path, client_options), request_options
+
+    def _compress_request(self, request_options):
+        """Negotiate compressed response and compress the request body.
+
+        >>> from consumer.compression import Compression
+        >>> compression = Compression(encoding='gzip', threshold=10)
+        >>> client = Client(compression=compression)
+        >>> request_options = {'data': '[' + '1, ' * 10 + '1]', 'headers': {}}
+        >>> client._compress_request(request_options)
+        >>> request_options['headers']  # doctest: +ELLIPSIS
+        {'Accept-Encoding': '...gzip, deflate', 'Content-Encoding': 'gzip'}
+        """
+        headers = request_options['headers']
+        if not any(name.lower() == 'accept-encoding' for name in headers):
+            headers['Accept-Encoding'] = self.compression.accept_encoding(
+                self.encodings,
+            )
+
+        if 'data' not in request_options:
+            return
+
+        body, encoding = self.compression.compress(
+            request_options['data'].encode('utf-8'),
+        )
+        if encoding is not None:
+            request_options['data'] = body
+            headers['Content-Encoding'] = encoding
+
+    @staticmethod
+    def _flight_key(url, request_options) -> tuple:
+        """Build a key collapsing identical concurrent GET requests."""
+        return request_key(
+            'get',
+            url,
+            request_options.get('params'),
+            request_options['headers'],
+        )
+
+
+class Client(BaseClient):  # pylint: disable=too-many-instance-attributes
+    """API client class."""
+
+    SESSION_OPTIONS = {
+        'pool_connections',  # Number of per-host connection pools to keep
+        'pool_maxsize',      # Number of connections to keep per host
+        'pool_block',        # Wait for a free connection instead of opening
+    }
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, session: Session = None,
+                 cache: 'ResponseCache' = None, *,
+                 metrics: 'Metrics' = None,
+                 rate_limiter: 'RateLimiter' = None,
+                 circuit_breaker: 'CircuitBreaker' = None,
+                 single_flight: 'SingleFlight' = None,
+                 batching: 'Batching' = None,
+                 compression: 'Compression' = None, **options):
+        """A :class:`Client` object for interacting with API.
+
+        A ``session`` created by :func:`consumer.session.factory` can be
+        shared by many clients, so that they use the same connection pools.
+        Otherwise, the client creates its own session configured by
+        :attr:`SESSION_OPTIONS` once it is used.
+
+        Conditional GET requests are enabled by passing a
+        :class:`consumer.cache.ResponseCache` instance as ``cache``.
+
+        Requests are measured if a :class:`consumer.metrics.Metrics` registry
+        is passed as ``metrics``, and paced by the ``rate_limiter``, which can
+        be shared by many clients.
+
+        A :class:`consumer.breaker.CircuitBreaker` passed as
+        ``circuit_breaker`` rejects requests to failing endpoints with
+        :class:`consumer.exceptions.CircuitOpenError` without sending them.
+
+        Identical concurrent GET requests share a single request and its
+        deserialized data, if a :class:`consumer.singleflight.SingleFlight`
+        group is passed as ``single_flight``.
+
+        Concurrent lookups of single products are combined into list
+        requests as configured by ``batching``, see
+        :class:`consumer.dataloader.Batching` for details.
+
+        Compressed responses are negotiated and large request bodies are
+        compressed as configured by ``compression``, see
+        :class:`consumer.compression.Compression` for details.
+        """
+        session_options = intersect_keys(options, self.SESSION_OPTIONS)
+        super().__init__(
+            **intersect_keys(options, self.SESSION_OPTIONS, invert=True)
+        )
+
+        self.cache = cache
+        self.metrics = metrics
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.single_flight = single_flight
+        self.batching = batching
+        self.compression = compression
+
+        self._session = session
+        self._session_options = dict(
+            session_options,
+            max_retries=self.options['max_retries'],
+        )
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self) -> Session:
+        """Get the session, creating it on first use unless provided."""
+        session = self._session
+        if session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = create_session(**self._session_options)
+                session = self._session
+        return session
+
+    @session.setter
+    def session(self, session: Session):
+        self._session = session
+
+    @cached_property
+    def products(self) -> 'Products':
+        """Products API resource facade, created on first use."""
+        # pylint: disable=import-outside-toplevel
+        from .resources.products import Products
+        return Products(self, api_version=self.options['version'])
 
     def request(self, method: str, path: str, **options) -> Response:
         """Dispatches a request to the airSlate API."""
-        options = self._merge_options(options)
-        url = options['base_url'].rstrip('/') + '/' + path.lstrip('/')
+        url, request_options = self._prepare_request(method, path, options)
+        return self._dispatch(method, url, request_options)
+
+    def _dispatch(self, method, url, request_options):
+        """Send the prepared request through the circuit breaker, if any."""
+        if self.circuit_breaker is None:
+            return self._measure(method, url, request_options)
 
-        # Select and formats options to be passed to the request
-        request_options = self._parse_request_options(options)
+        with self.circuit_breaker.guard(url):
+            return self._measure(method, url, request_options)
 
+    def _measure(self, method, url, request_options):
+        """Send the prepared request measuring it, if metrics are enabled."""
+        if self.metrics is None:
+            return self._send(method, url, request_options)
+
+        record = RequestRecord(
+            method.upper(),
+            endpoint_template(urlsplit(url).path),
+        )
+
+        response = None
+        connected = connect_time()
+        started = time.perf_counter()
         try:
-            response = getattr(self.session, method)(url, **request_options)
-            if response.status_code in self.statuses:
-                raise self.statuses[response.status_code](response=response)
+            response = self._send(method, url, request_options)
+            response.metrics = record
+            return response
+        except exceptions.ApiError as exc:
+            response = exc.response
+            record.error = exc.__class__.__name__
+            record.retries = retries_made(exc) or 0
+            raise
+        finally:
+            record.complete(
+                response,
+                time.perf_counter() - started,
+                connect_time() - connected,
+            )
+            self.metrics.observe(record)
+
+    def _send(self, method, url, request_options):
+        """Send the prepared request and map errors to API exceptions."""
+        # Streamed bodies are consumed by the caller and cannot be cached
+        cache_key = None
+        if (self.cache is not None and method == 'get' and
+                not request_options.get('stream')):
+            cache_key = self.cache.key(url, request_options.get('params'))
+
+            # Error responses fail the background revalidation as well
+            cached = self.cache.lookup(
+                cache_key,
+                lambda: self._raise_for_status(
+                    self._fetch_cached(cache_key, url, request_options),
+                ),
+            )
+            if cached is not None:
+                return cached
+
+        try:
+            if cache_key is None:
+                response = self._fetch(method, url, request_options)
+            else:
+                response = self._fetch_cached(cache_key, url, request_options)
 
-            # Any unhandled 5xx is a server error
-            if 500 <= response.status_code < 600:
-                raise exceptions.InternalServerError(response=response)
+            self._raise_for_status(response)
+
+            if (self.cache is not None and method in UNSAFE_METHODS and
+                    200 <= response.status_code < 300):
+                self._invalidate(url)
 
             return response
         except (MaxRetryError, RetryError) as retry_exc:
@@ -137,47 +511,98 @@ class Client:
                 response=response,
             )
         except ConnectionError as conn_exc:
-            message = ('A connection attempt failed because the ' +
-                       'connected party did not properly respond ' +
-                       'after a period of time, or established connection ' +
-                       'failed because connected host has failed to respond.')
             raise exceptions.InternalServerError(
-                message=message,
+                message=CONNECTION_ERROR_MESSAGE,
                 response=conn_exc.response,
             )
         except RequestException as req_exc:
             raise exceptions.InternalServerError(response=req_exc.response)
 
-    def _init_statuses(self):
-        """Create a mapping of status codes to classes."""
-        self.statuses = {}
-        for cls in exceptions.__dict__.values():
-            if isinstance(cls, type) and issubclass(cls, exceptions.ApiError):
-                self.statuses[cls().code] = cls
+    def _invalidate(self, url):
+        """Remove cached responses changed by the unsafe request.
+
+        Both the target resource and its collection are removed, since the
+        collection lists the changed resource.
+        """
+        self.cache.invalidate(url)
+        self.cache.invalidate(url.rstrip('/').rsplit('/', 1)[0])
+
+    def _fetch(self, method, url, request_options):
+        """Send the request accounting compression of the response."""
+        response = self._session_request(method, url, request_options)
+        if (self.compression is not None and
+                not request_options.get('stream')):
+            self.compression.observe_response(response)
+        return response
+
+    def _fetch_cached(self, cache_key, url, request_options):
+        """Send the conditional GET request and update the cache from it.
+
+        The cached response is served on ``304 Not Modified`` only if the
+        request is conditional on its validators. The provider response to
+        other conditional headers provided by the caller is passed through.
+        """
+        headers = request_options['headers']
+        provided = {
+            name.lower(): value for name, value in headers.items()
+            if name.lower() in CONDITIONAL_HEADERS
+        }
+
+        entry = self.cache.revalidate(cache_key)
+        if entry is not None:
+            validators = entry.validators()
+            if not provided:
+                headers.update(validators)
+            elif provided != {k.lower(): v for k, v in validators.items()}:
+                entry = None
+
+        response = self._fetch('get', url, request_options)
+        return self.cache.update(cache_key, response, entry)
+
+    def _session_request(self, method, url, request_options):
+        """Send the request with the session, paced by the rate limiter."""
+        if self.rate_limiter is None:
+            return getattr(self.session, method)(url, **request_options)
+
+        def learn(retried):
+            self.rate_limiter.update(method, url, retried)
+
+        self.rate_limiter.acquire(method, url)
+        with observe_retries(learn):
+            response = getattr(self.session, method)(url, **request_options)
+        self.rate_limiter.update(method, url, response)
+
+        return response
 
     def get(self, path, query=None, **options) -> Response:
         """Parses GET request options and dispatches a request."""
-        # Select query string options.
-        query_options = self._parse_query_options(options)
+        url, request_options = self._prepare_request(
+            'get', path, options, query=query)
 
-        # Select all unknown options.
-        parameter_options = self._parse_parameter_options(options)
+        # Streamed bodies are consumed by the caller and cannot be shared
+        if self.single_flight is None or request_options.get('stream'):
+            return self._dispatch('get', url, request_options)
 
-        # Values in the ``query`` takes precedence.
-        _query = {} if query is None else query
-        query = merge(query_options, parameter_options, _query)
-
-        # Values in the ``options['headers']`` takes precedence.
-        headers = merge(
-            default_headers(),
-            options.pop('headers', {})
+        return self.single_flight.do(
+            self._flight_key(url, request_options),
+            lambda: share(self._dispatch('get', url, request_options)),
         )
 
-        # `Content-Type` HTTP header should be set only for PUT and POST
-        del headers['Content-Type']
+    def cached_etag(self, path: str) -> Optional[str]:
+        """Get the ETag of the cached response of the path, if any."""
+        if self.cache is None:
+            return None
+
+        url = self._resolve_url(path, self.options)
+        entry = self.cache.get(self.cache.key(url))
+        return entry.etag if entry is not None else None
 
-        return self.request('get', path, params=query, headers=headers,
-                            **options)
+    def pool_stats(self) -> dict:
+        """Return connection pool statistics of the client session.
+
+        Statistics are shared by all clients using the same session.
+        """
+        return pool_stats(self.session)
 
     def post(self, path, data, **options) -> Response:
         """Parses POST request options and dispatches a request."""
@@ -185,136 +610,10 @@ class Client:
 
     def _create(self, method, path, data, **options):
         """Internal helper to send POST/PUT/PATCH requests."""
-        # Select all unknown options.
-        parameter_options = self._parse_parameter_options(options)
-
-        # Values in the ``data`` takes precedence.
-        body = merge(parameter_options, data)
-
-        # Values in the ``options['headers']`` takes precedence.
-        headers = merge(
-            default_headers(),
-            options.pop('headers', {})
-        )
-
-        return self.request(method, path, data=body, headers=headers,
-                            **options)
+        url, request_options = self._prepare_request(
+            method, path, options, data=data)
+        return self._dispatch(method, url, request_options)
 
     def delete(self, path, **options) -> Response:
         """Dispatches a DELETE request."""
         return self.request('delete', path, **options)
-
-    def _parse_parameter_options(self, options):
-        """Select all unknown options.
-
-        This function takes a dictionary of options as input and returns a new
-        dictionary containing only the unknown options. Unknown options are
-        those that are not part of the client, query, or request options.
-
-        :param options: A dictionary of options.
-        :type options: dict
-        :return: Returns a dictionary containing only the unknown options.
-        :rtype: dict
-
-        Usage:
-
-        >>> client = Client()
-        >>> client._parse_parameter_options({})
-        {}
-        >>> client._parse_parameter_options({'foo': 'bar'})
-        {'foo': 'bar'}
-        >>> client._parse_parameter_options({'timeout': 1.0})
-        {}
-        """
-        options = self._merge_options(options)
-        return intersect_keys(options, self.ALL_OPTIONS, invert=True)
-
-    def _parse_query_options(self, options):
-        """Select query string options out of the provided options object.
-
-        This function selects query string options from the provided `options`
-        object based on the pre-defined :attr:`QUERY_OPTIONS` dictionary.
-         It returns a new dictionary containing only the key-value pairs that
-         match the keys in :attr:`QUERY_OPTIONS`.
-
-        :param options: Dictionary of query string options.
-        :type options: dict
-        :return: Returns a dictionary of query string options filtered by the
-            pre-defined :attr:`QUERY_OPTIONS`.
-        :rtype: dict
-
-        Usage:
-
-        >>> client = Client()
-        >>> client._parse_query_options({})
-        {}
-        >>> client._parse_query_options({'foo': 'bar'})
-        {}
-        >>> client._parse_query_options({'bid': 42})
-        {'bid': 42}
-        """
-        options = self._merge_options(options)
-        return intersect_keys(options, self.QUERY_OPTIONS)
-
-    def _parse_request_options(self, options):
-        """Select request options out of the provided options object.
-
-        This function takes a dictionary options as a parameter and returns a
-        dictionary containing selected and formatted request options, which
-        will be passed to the `requests library for performing an HTTP request.
-
-        :param options: A dictionary of options to be passed to the 'requests'
-            library's request methods.
-        :type options: dict
-        :return: Returns a dictionary of selected and formatted request options
-        :rtype: dict
-
-        Usage:
-
-        >>> client = Client()
-        >>> client._parse_request_options({})
-        {'timeout': 5.0, 'headers': {}}
-        >>> client._parse_request_options({'timeout': 10.0})
-        {'timeout': 10.0, 'headers': {}}
-        >>> client._parse_request_options({'params': {'foo': True}})
-        {'timeout': 5.0, 'params': {'foo': 'true'}, 'headers': {}}
-        >>> client._parse_request_options({'data': {'foo': 'bar'}})
-        {'timeout': 5.0, 'data': '{"foo": "bar"}', 'headers': {}}
-        >>> client._parse_request_options({'headers': {'x-header': 'value'}})
-        {'timeout': 5.0, 'headers': {'x-header': 'value'}}
-        """
-        # Merge options with default options
-        options = self._merge_options(options)
-
-        # Select request options keys from the provided options object
-        request_options = intersect_keys(options, self.REQUEST_OPTIONS)
-
-        # If 'params' is in request_options, format the params values to be
-        # JSON serializable
-        if 'params' in request_options:
-            params = request_options['params']
-            for key in params:
-                # json.dumps(None) -> 'null'
-                # json.dumps(True) -> 'true'
-                if isinstance(params[key], bool) or params[key] is None:
-                    params[key] = json.dumps(params[key])
-
-        # If 'data' is in request_options, serialize it to JSON, since
-        # requests library doesn't do it automatically
-        if 'data' in request_options:
-            request_options['data'] = json.dumps(request_options['data'])
-
-        # Update headers with request options and return the updated dictionary
-        headers = self.headers.copy()
-        headers.update(request_options.get('headers', {}))
-        request_options['headers'] = headers
-
-        return request_options
-
-    def _merge_options(self, *objects):
-        """Merge option objects with the client's object.
-
-        Merges one or more options objects with client's options and returns a
-        new options object.
-        """
-        return merge(self.options, *objects)
@@ -0,0 +1,202 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Compression module for Consumer API example.
+
+This module provides negotiation of compressed responses and compression
+of request bodies. Responses are decompressed by the HTTP transport as the
+body is read, including streamed responses, thus only the encodings the
+transport of the client can decode are offered to the provider. The ``br``
+and ``zstd`` encodings are available if the optional dependencies are
+installed using the ``compression`` extra:
+
+.. code-block:: console
+
+   $ pip install consumer[compression]
+"""
+
+import gzip
+import threading
+import time
+import zlib
+from typing import Iterable, Optional
+
+from urllib3.util.request import ACCEPT_ENCODING
+
+# Encodings in the order of preference
+PREFERRED_ENCODINGS = ('zstd', 'br', 'gzip', 'deflate')
+
+# Encodings urllib3, the transport of the blocking client, is able to decode
+AVAILABLE_ENCODINGS = frozenset(ACCEPT_ENCODING.split(','))
+
+
+def _compressors() -> dict:
+    """Get request body compressors by encodings."""
+    compressors = {
+        'gzip': lambda body: gzip.compress(body, mtime=0),
+        'deflate': zlib.compress,
+    }
+
+    # pylint: disable=import-outside-toplevel
+    try:
+        import brotli
+        compressors['br'] = brotli.compress
+    except ImportError:
+        pass
+
+    try:
+        import zstandard
+        compressors['zstd'] = zstandard.compress
+    except (ImportError, AttributeError):
+        pass
+
+    return compressors
+
+
+COMPRESSORS = _compressors()
+
+
+def accept_encoding(
+        encodings: Iterable[str] = PREFERRED_ENCODINGS,
+        available: Iterable[str] = AVAILABLE_ENCODINGS,
+) -> str:
+    """Build the ``Accept-Encoding`` header value of available encodings.
+
+    >>> accept_encoding(['unknown', 'gzip', 'deflate'])
+    'gzip, deflate'
+    >>> accept_encoding(available={'deflate'})
+    'deflate'
+    """
+    return ', '.join(
+        encoding for encoding in encodings
+        if encoding in available
+    )
+
+
+class Compression:  # pylint: disable=too-many-instance-attributes
+    """Thread-safe compression settings and statistics of the client.
+
+    Responses are requested in one of the ``accept`` encodings the transport
+    of the client is able to decode. Request bodies are sent as is, unless
+    the ``encoding`` is set. Since not every provider decodes compressed
+    requests, it should be set only for providers which do. Then bodies of
+    at least ``threshold`` bytes are compressed:
+
+    >>> Compression().compress(b'{"name": "' + b'x' * 2000 + b'"}')[1] is None
+    True
+    >>> compression = Compression(encoding='gzip', threshold=10)
+    >>> compression.compress(b'{"name": "' + b'x' * 100 + b'"}')[1]
+    'gzip'
+    >>> compression.compress(b'{}')
+    (b'{}', None)
+
+    The statistics include the compression ratio of request and response
+    bodies, and the time spent compressing request bodies.
+    """
+
+    def __init__(self, accept: Iterable[str] = PREFERRED_ENCODINGS,
+                 encoding: Optional[str] = None, threshold: int = 1024):
+        """A :class:`Compression` object with empty statistics."""
+        if encoding is not None and encoding not in COMPRESSORS:
+            raise ValueError(f'Unsupported encoding: {encoding!r}')
+
+        self.accept = tuple(accept)
+        self.encoding = encoding
+        self.threshold = threshold
+
+        self.requests = {'count': 0, 'original': 0, 'compressed': 0}
+        self.responses = {'count': 0, 'original': 0, 'compressed': 0}
+        self.compress_time = 0.0
+
+        self._compress = COMPRESSORS.get(encoding)
+        self._accept_encodings = {}
+        self._lock = threading.Lock()
+
+    def accept_encoding(self, available: Optional[frozenset] = None) -> str:
+        """Get the ``Accept-Encoding`` header value for the transport.
+
+        Only the ``available`` encodings decoded by the transport are
+        offered, the urllib3 ones unless provided. Values are built once per
+        transport:
+
+        >>> Compression().accept_encoding(frozenset({'gzip', 'identity'}))
+        'gzip'
+        """
+        if available is None:
+            available = AVAILABLE_ENCODINGS
+
+        value = self._accept_encodings.get(available)
+        if value is None:
+            value = accept_encoding(self.accept, available)
+            self._accept_encodings[available] = value
+        return value
+
+    def compress(self, body: bytes) -> tuple:
+        """Compress the request body, if it is large enough.
+
+        Returns the body and its encoding, which is ``None`` for the body
+        left intact.
+        """
+        if self._compress is None or len(body) < self.threshold:
+            return body, None
+
+        started = time.perf_counter()
+        compressed = self._compress(body)
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.requests['count'] += 1
+            self.requests['original'] += len(body)
+            self.requests['compressed'] += len(compressed)
+            self.compress_time += elapsed
+
+        return compressed, self.encoding
+
+    def observe_response(self, response):
+        """Account the response body decompressed by the transport.
+
+        Responses without the ``Content-Length`` of the compressed body are
+        not accounted.
+        """
+        headers = response.headers
+        if 'Content-Encoding' not in headers:
+            return
+
+        compressed = headers.get('Content-Length')
+        if compressed is None:
+            return
+
+        with self._lock:
+            self.responses['count'] += 1
+            self.responses['original'] += len(response.content)
+            self.responses['compressed'] += int(compressed)
+
+    def stats(self) -> dict:
+        """Return compression statistics."""
+        with self._lock:
+            return {
+                'requests': dict(
+                    self.requests,
+                    ratio=_ratio(self.requests),
+                    time=self.compress_time,
+                ),
+                'responses': dict(
+                    self.responses,
+                    ratio=_ratio(self.responses),
+                ),
+            }
+
+
+def _ratio(counters: dict) -> float:
+    """Get the ratio of original to compressed bytes.
+
+    >>> _ratio({'original': 300, 'compressed': 100})
+    3.0
+    """
+    if not counters['compressed']:
+        return 1.0
+    return counters['original'] / counters['compressed']
@@ -0,0 +1,137 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Micro-batching module for Consumer API example.
+
+This module provides a loader combining individual lookups made within a
+short window into batches, so that many items are requested from the
+provider by a single list request. Calls are not changed: every caller
+still blocks for its own item.
+"""
+
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Iterable
+
+
+def encode_ids(ids: Iterable) -> str:
+    """Encode identifiers as the query filter of the list request.
+
+    >>> encode_ids([1, 2, 3])
+    'id:1,2,3'
+    """
+    return 'id:' + ','.join(map(str, ids))
+
+
+@dataclass(frozen=True)
+class Batching:
+    """Define how single item lookups are combined into list requests.
+
+    Lookups made within ``window`` seconds of the first one, but no more
+    than ``max_size`` of them, are sent as one list request with the
+    ``option`` query option set to the identifiers encoded by ``encode``.
+    The ``max_size`` should not exceed the page size of the provider.
+    """
+
+    window: float = 0.002
+    max_size: int = 50
+    option: str = 'q'
+    encode: Callable[[Iterable], str] = encode_ids
+
+
+class Batch:  # pylint: disable=too-few-public-methods
+    """Define a batch of keys collected by :class:`DataLoader`."""
+
+    def __init__(self):
+        """A :class:`Batch` object collecting keys."""
+        self.keys = {}
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results = {}
+        self.error = None
+
+
+class DataLoader:
+    """Thread-safe loader combining concurrent lookups into batches.
+
+    The ``batch_fn`` is called with a list of unique keys and returns a
+    mapping of keys to values. Values which are exceptions are raised to
+    the callers of their keys:
+
+    >>> loader = DataLoader(lambda keys: {key: key * 2 for key in keys})
+    >>> loader.load(21)
+    42
+
+    The first caller of a batch waits for ``window`` seconds, or until the
+    batch has ``max_size`` keys, and loads the batch on behalf of all
+    callers, so that no background threads are involved.
+    """
+
+    def __init__(self, batch_fn: Callable[[list], dict],
+                 window: float = 0.002, max_size: int = 50):
+        """A :class:`DataLoader` object without pending batches."""
+        if max_size < 1:
+            raise ValueError('Batch size should be a positive integer')
+
+        self.batch_fn = batch_fn
+        self.window = window
+        self.max_size = max_size
+
+        self.loads = 0
+        self.batches = 0
+
+        self._pending = None
+        self._lock = threading.Lock()
+
+    def load(self, key: Hashable) -> Any:
+        """Get the value of the key loading it along with concurrent ones."""
+        with self._lock:
+            self.loads += 1
+            batch = self._pending
+            leader = batch is None
+            if leader:
+                batch = self._pending = Batch()
+
+            batch.keys[key] = None
+            if len(batch.keys) >= self.max_size:
+                self._pending = None
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._pending is batch:
+                    self._pending = None
+                self.batches += 1
+            self._dispatch(batch)
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+
+        value = batch.results[key]
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def stats(self) -> dict:
+        """Return batching statistics."""
+        with self._lock:
+            return {'loads': self.loads, 'batches': self.batches}
+
+    def _dispatch(self, batch: Batch):
+        """Load values of the batch keys and wake up waiting callers."""
+        completed = False
+        try:
+            batch.results = self.batch_fn(list(batch.keys))
+            completed = True
+        finally:
+            if not completed:
+                batch.error = sys.exc_info()[1]
+            batch.done.set()
@@ -7,6 +7,8 @@
 
 """Standard exception hierarchy for Consumer API example."""
 
+from types import MappingProxyType
+
 
 class BaseError(Exception):
     """Base class for all errors in Consumer API example."""
@@ -134,3 +136,49 @@ class InternalServerError(ApiError):
             message=message,
             response=response,
         )
+
+
+class RateLimitExceeded(BaseError):
+    """Raised when a request would wait too long for the rate limiter."""
+
+    def __init__(self, wait=None):
+        self.wait = wait
+        super().__init__(
+            'Client-side rate limit exceeded, '
+            f'the request would wait for {wait:.3f} seconds'
+            if wait is not None else 'Client-side rate limit exceeded'
+        )
+
+
+class CircuitOpenError(ApiError):
+    """Raised when a request is rejected by the open circuit breaker.
+
+    The request is not sent, thus the error has neither a response nor a
+    status code.
+    """
+
+    def __init__(self, endpoint=None, retry_after=None):
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+        super().__init__(
+            status='Circuit Open',
+            message=(
+                f'Circuit of {endpoint} endpoint is open'
+                if endpoint is not None else 'Circuit is open'
+            ),
+        )
+
+
+def _statuses() -> dict:
+    """Create a mapping of status codes to API error classes."""
+    statuses = {}
+    for cls in globals().values():
+        if isinstance(cls, type) and issubclass(cls, ApiError):
+            code = cls().code
+            if code is not None:
+                statuses[code] = cls
+    return statuses
+
+
+# Status codes of provider responses mapped to API errors, built once
+STATUSES = MappingProxyType(_statuses())
@@ -0,0 +1,258 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Loaders module for Consumer API example.
+
+This module provides functions deserializing provider data to models. The
+following deserializers are available:
+
+* ``'schema'`` - the reference implementation, which uses marshmallow
+  schemas declared in :mod:`consumer.schemas`
+* ``'compiled'`` - a fast path generated once from the declared fields of a
+  schema, which produces identical models
+* ``'lazy'`` - the compiled fast path keeping validated timestamp strings
+  in models, so that they are parsed on first access only
+
+The compiled loader only handles valid input on its own. As soon as the
+data does not pass its checks, the loading is delegated to the schema, so
+that errors raised are exactly the same as for the reference
+implementation.
+"""
+
+import math
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Type
+
+from marshmallow import EXCLUDE, fields, missing, RAISE, Schema
+from marshmallow import ValidationError
+
+from consumer import DESERIALIZERS
+
+# The datetime format used by the provider, which can be parsed by
+# datetime.fromisoformat() much faster than by datetime.strptime()
+ISO_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f%z'
+
+# The subset of ISO_DATETIME_FORMAT strings fromisoformat() parses exactly
+# the same way as strptime() does. Digits are ASCII ones only, as other
+# Unicode digits are rejected by fromisoformat().
+ISO_DATETIME = re.compile(
+    r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{1,6}'
+    r'(?:Z|[+-]\d{2}:?[0-5]\d)',
+    re.ASCII,
+)
+
+# The subset of ISO_DATETIME strings which are valid timestamps for sure,
+# thus can be kept as is and parsed on first access. Days after the 28th
+# are not matched as they may be out of range for the month, nor is the
+# year 0 out of the datetime range.
+VALID_ISO_DATETIME = re.compile(
+    r'(?!0000)\d{4}-(?:0[1-9]|1[0-2])-(?:0[1-9]|1\d|2[0-8])'
+    r'T(?:[01]\d|2[0-3]):[0-5]\d:[0-5]\d\.\d{1,6}'
+    r'(?:Z|[+-](?:[01]\d|2[0-3]):?[0-5]\d)',
+    re.ASCII,
+)
+
+Loader = Callable[[Any], Any]
+
+
+def compile_loader(schema: Schema, lazy_timestamps: bool = False) -> Loader:
+    """Generate a loader function from the declared fields of the schema.
+
+    Integer, Float, String and DateTime fields are converted inline, other
+    fields are deserialized by the field itself. Model is created by the
+    ``make`` post-load hook of the schema, if any.
+
+    If ``lazy_timestamps`` is set, timestamp strings matching the provider
+    format are only validated, and passed to the model as is.
+
+    >>> from consumer.schemas import BrandSchema
+    >>> load = compile_loader(BrandSchema())
+    >>> load({'id': 42, 'name': 'Brand'})
+    <Brand: id=42>
+    """
+    if schema.unknown not in {RAISE, EXCLUDE}:
+        raise ValueError(f'Unsupported unknown option: {schema.unknown!r}')
+
+    namespace = {
+        'ValidationError': ValidationError,
+        'fallback': schema.load,
+        'fields': schema.load_fields,
+        'fromisoformat': datetime.fromisoformat,
+        'isfinite': math.isfinite,
+        'iso_datetime': ISO_DATETIME.fullmatch,
+        'valid_iso_datetime': VALID_ISO_DATETIME.fullmatch,
+        'keys': frozenset(
+            field.data_key or name
+            for name, field in schema.load_fields.items()
+        ),
+        'make': getattr(schema, 'make', dict),
+    }
+
+    lines = [
+        'def load(data):',
+        '    if data.__class__ is not dict:',
+        '        return fallback(data)',
+    ]
+
+    if schema.unknown == RAISE:
+        lines += [
+            '    if not data.keys() <= keys:',
+            '        return fallback(data)',
+        ]
+
+    lines += [
+        '    result = {}',
+        '    try:',
+    ]
+
+    for name, field in schema.load_fields.items():
+        lines += [
+            f'        {line}'
+            for line in _compile_field(name, field, lazy_timestamps)
+        ]
+
+    lines += [
+        '    except (TypeError, ValueError, OverflowError, ValidationError):',
+        '        return fallback(data)',
+        '    return make(result)',
+    ]
+
+    exec('\n'.join(lines), namespace)  # pylint: disable=exec-used
+    return namespace['load']
+
+
+def _compile_field(name: str, field: fields.Field,
+                   lazy_timestamps: bool) -> list[str]:
+    """Generate code loading a single field into the ``result`` dict."""
+    key = field.data_key or name
+    attribute = field.attribute or name
+
+    lines = [
+        f'if {key!r} in data:',
+        f'    value = data[{key!r}]',
+        '    if value is None:',
+    ]
+
+    if field.allow_none:
+        lines += [f'        result[{attribute!r}] = None']
+    else:
+        lines += ['        raise ValueError']
+
+    lines += ['    else:']
+    lines += [
+        f'        {line}'
+        for line in _compile_conversion(name, key, field, lazy_timestamps)
+    ]
+    lines += [f'        result[{attribute!r}] = value']
+
+    if field.required:
+        lines += ['else:', '    raise ValueError']
+    elif field.load_default is not missing:
+        lines += ['else:']
+        if callable(field.load_default):
+            lines += [f'    result[{attribute!r}] = '
+                      f'fields[{name!r}].load_default()']
+        else:
+            lines += [f'    result[{attribute!r}] = '
+                      f'fields[{name!r}].load_default']
+
+    return lines
+
+
+def _compile_conversion(name: str, key: str, field: fields.Field,
+                        lazy_timestamps: bool) -> list[str]:
+    """Generate code converting the ``value`` of the field in place."""
+    field_type = type(field)
+
+    if field.validators:
+        field_type = None
+
+    if field_type is fields.Integer:
+        if field.strict:
+            return ['if value.__class__ is not int:', '    raise ValueError']
+        return [
+            'if value is True or value is False:',
+            '    raise ValueError',
+            'value = int(value)',
+        ]
+
+    if field_type is fields.Float:
+        lines = [
+            'if value is True or value is False:',
+            '    raise ValueError',
+            'value = float(value)',
+        ]
+        if field.allow_nan is False:
+            lines += ['if not isfinite(value):', '    raise ValueError']
+        return lines
+
+    if field_type is fields.String:
+        return ['if value.__class__ is not str:', '    raise ValueError']
+
+    if field_type is fields.DateTime and field.format == ISO_DATETIME_FORMAT:
+        return _compile_iso_datetime(lazy_timestamps)
+
+    return [f'value = fields[{name!r}].deserialize(value, {key!r}, data)']
+
+
+def _compile_iso_datetime(lazy_timestamps: bool) -> list[str]:
+    """Generate code converting the ``value`` in the provider format."""
+    if lazy_timestamps:
+        return [
+            'if value.__class__ is not str:',
+            '    raise ValueError',
+            'if not valid_iso_datetime(value):',
+            '    if not iso_datetime(value):',
+            '        raise ValueError',
+            '    value = fromisoformat(value)',
+        ]
+
+    return [
+        'if value.__class__ is not str or not iso_datetime(value):',
+        '    raise ValueError',
+        'value = fromisoformat(value)',
+    ]
+
+
+@lru_cache(maxsize=None)
+def get_loader(
+        schema_cls: Type[Schema],
+        deserializer: str = 'schema',
+        many: bool = False,
+) -> Loader:
+    """Get the loader deserializing data with the schema.
+
+    Loaders are created once per schema and deserializer, and shared
+    thereafter. When ``many`` is set, the loader expects a list of objects.
+    """
+    if deserializer not in DESERIALIZERS:
+        raise ValueError(f'Unknown deserializer: {deserializer!r}')
+
+    schema = schema_cls(many=many)
+    if deserializer == 'schema':
+        return schema.load
+
+    load = compile_loader(
+        schema_cls(),
+        lazy_timestamps=deserializer == 'lazy',
+    )
+
+    if not many:
+        return load
+
+    def load_many(data):
+        if data.__class__ is not list:
+            return schema.load(data)
+        try:
+            return [load(item) for item in data]
+        except ValidationError:
+            # Let the schema report errors for all the items
+            return schema.load(data)
+
+    return load_many
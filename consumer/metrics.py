@@ -0,0 +1,265 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Metrics module for Consumer API example.
+
+This module provides per-request instrumentation of the client. Every
+request is described by a :class:`RequestRecord` with the time spent in
+each phase:
+
+* ``total`` - the whole request, from sending to the response body
+  download
+* ``connect`` - establishing new connections
+* ``wait`` - sending the request and waiting for the response headers,
+  including retries made by the session
+* ``transfer`` - downloading the response body
+* ``decode`` - decoding the JSON body
+* ``load`` - deserializing the decoded data to models
+
+Responses served from the cache without sending a request are counted as
+cache hits, with the time to serve them recorded as the ``cache`` phase
+instead of the request phases.
+
+Records are aggregated by the endpoint template into histograms, which can
+be exported in the Prometheus text format.
+"""
+
+import re
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Optional
+
+from requests.models import Response
+
+# Histogram buckets in seconds
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Path segments holding resource identifiers
+IDENTIFIER = re.compile(r'(?<=/)(?:\d+|[0-9a-fA-F-]{16,})(?=/|$)')
+
+
+def endpoint_template(path: str) -> str:
+    """Replace resource identifiers in the path with a placeholder.
+
+    >>> endpoint_template('/v2/products/42')
+    '/v2/products/{id}'
+    >>> endpoint_template('/v2/products')
+    '/v2/products'
+    """
+    return IDENTIFIER.sub('{id}', path)
+
+
+@dataclass
+class RequestRecord:  # pylint: disable=too-many-instance-attributes
+    """Define measurements of a single request."""
+
+    method: str
+    endpoint: str
+    status: Optional[int] = None
+    retries: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    error: Optional[str] = None
+    cache_hit: bool = False
+    timings: dict = field(default_factory=dict)
+
+    def complete(self, response: Optional[Response], duration: float,
+                 connect: float):
+        """Fill in the measurements from the response of the request."""
+        if response is not None and getattr(response, 'cache_hit', False):
+            self.cache_hit = True
+            self.status = response.status_code
+            self.timings['cache'] = duration
+            return
+
+        self.timings['total'] = duration
+        self.timings['connect'] = connect
+        if response is None:
+            self.timings['wait'] = max(duration - connect, 0.0)
+            return
+
+        elapsed = response.elapsed.total_seconds()
+        self.status = response.status_code
+        self.timings['wait'] = max(elapsed - connect, 0.0)
+        self.timings['transfer'] = max(duration - elapsed, 0.0)
+
+        retries = getattr(response.raw, 'retries', None)
+        if retries is not None:
+            self.retries = len(retries.history)
+
+        body = response.request.body if response.request else None
+        self.bytes_sent = len(body) if body else 0
+        self.bytes_received = int(response.headers.get('Content-Length', 0))
+
+
+class Histogram:
+    """Cumulative histogram of observed values."""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        """A :class:`Histogram` object with the upper bounds of buckets."""
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Count the value in the bucket it falls into."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list:
+        """Get pairs of bucket bounds and counts of values not above them.
+
+        >>> histogram = Histogram([0.1, 1.0])
+        >>> histogram.observe(0.5)
+        >>> histogram.cumulative()
+        [('0.1', 0), ('1.0', 1), ('+Inf', 1)]
+        """
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (None,), self.counts):
+            total += count
+            result.append(('+Inf' if bound is None else repr(bound), total))
+        return result
+
+
+class Metrics:
+    """Thread-safe registry aggregating request records.
+
+    The registry can be shared by multiple :class:`consumer.client.Client`
+    instances. The ``hooks`` are called with every :class:`RequestRecord`
+    once its response is received; the ``decode`` and ``load`` timings are
+    added to the record when the response body is deserialized.
+
+    >>> metrics = Metrics()
+    >>> metrics.observe(RequestRecord('GET', '/v2/products/{id}', status=200))
+    >>> print(metrics.export().splitlines()[2])  # doctest: +ELLIPSIS
+    consumer_requests_total{...,status="200"} 1
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS,
+                 hooks: Iterable[Callable[[RequestRecord], None]] = ()):
+        """A :class:`Metrics` object with empty aggregates."""
+        self.buckets = tuple(buckets)
+        self.hooks = list(hooks)
+
+        self._requests = {}
+        self._cache_hits = {}
+        self._retries = {}
+        self._bytes = {}
+        self._durations = {}
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook: Callable[[RequestRecord], None]):
+        """Register the function to be called with every request record."""
+        self.hooks.append(hook)
+
+    def observe(self, record: RequestRecord):
+        """Aggregate the request record and pass it to the hooks."""
+        labels = (('endpoint', record.endpoint), ('method', record.method))
+
+        with self._lock:
+            if record.cache_hit:
+                self._cache_hits[labels] = self._cache_hits.get(labels, 0) + 1
+                self._observe_timings(labels, record.timings)
+            else:
+                self._observe_request(labels, record)
+
+        for hook in self.hooks:
+            hook(record)
+
+    def _observe_request(self, labels: tuple, record: RequestRecord):
+        """Aggregate the record of a sent request, the lock should be held."""
+        status = record.status if record.status is not None else 'error'
+        key = labels + (('status', str(status)),)
+        self._requests[key] = self._requests.get(key, 0) + 1
+        self._retries[labels] = self._retries.get(labels, 0) + record.retries
+        for direction in ('sent', 'received'):
+            key = labels + (('direction', direction),)
+            self._bytes[key] = (
+                self._bytes.get(key, 0) +
+                getattr(record, f'bytes_{direction}')
+            )
+        self._observe_timings(labels, record.timings)
+
+    def observe_load(self, record: RequestRecord, decode: float,
+                     load: float):
+        """Aggregate the time spent deserializing the response body."""
+        timings = {'decode': decode, 'load': load}
+        record.timings.update(timings)
+
+        labels = (('endpoint', record.endpoint), ('method', record.method))
+        with self._lock:
+            self._observe_timings(labels, timings)
+
+    def _observe_timings(self, labels: tuple, timings: dict):
+        """Count phase timings into histograms, the lock should be held."""
+        for phase, seconds in timings.items():
+            key = labels + (('phase', phase),)
+            histogram = self._durations.get(key)
+            if histogram is None:
+                histogram = self._durations[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def export(self) -> str:
+        """Export aggregates in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            counters = (
+                ('consumer_requests_total', 'Requests sent to the API.',
+                 self._requests),
+                ('consumer_cache_hits_total',
+                 'Requests served from the cache without sending them.',
+                 self._cache_hits),
+                ('consumer_request_retries_total',
+                 'Requests retried by the session.', self._retries),
+                ('consumer_request_bytes_total',
+                 'Bytes of request and response bodies.', self._bytes),
+            )
+            for name, description, values in counters:
+                lines += [f'# HELP {name} {description}',
+                          f'# TYPE {name} counter']
+                lines += [
+                    f'{name}{_format_labels(key)} {value}'
+                    for key, value in sorted(values.items())
+                ]
+
+            name = 'consumer_request_duration_seconds'
+            lines += [f'# HELP {name} Time spent in request phases.',
+                      f'# TYPE {name} histogram']
+            for key, histogram in sorted(self._durations.items()):
+                for bound, count in histogram.cumulative():
+                    labels = _format_labels(key + (('le', bound),))
+                    lines.append(f'{name}_bucket{labels} {count}')
+                labels = _format_labels(key)
+                lines.append(f'{name}_sum{labels} {histogram.sum!r}')
+                lines.append(f'{name}_count{labels} {histogram.count}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels: tuple) -> str:
+    """Format label pairs escaping their values.
+
+    >>> print(_format_labels((('path', 'a"b'),)))
+    {path="a\\"b"}
+    """
+    pairs = ','.join(
+        f'{name}="{_escape(str(value))}"' for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+def _escape(value: str) -> str:
+    """Escape the label value."""
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
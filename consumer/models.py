@@ -5,37 +5,133 @@
 # For the full copyright and license information, please view
 # the LICENSE file that was distributed with this source code.
 
-"""Module providing the functionality of data models."""
+"""Module providing the functionality of data models.
 
+Models are slotted frozen dataclasses, so that no instance carries its own
+``__dict__``. Short strings are interned and time zones of timestamps are
+shared between instances, since mirrored catalogs repeat them a lot.
+
+Timestamps may be provided as ISO 8601 strings already validated by the
+loader, in which case they are parsed on first access.
+"""
+
+import sys
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+
+# Strings up to this length are interned by the models
+INTERN_MAX_LENGTH = 64
+
+# Time zones shared by timestamps of all the models, keyed by UTC offset
+_TIMEZONES = {timedelta(0): timezone.utc}
+
+
+def intern(value):
+    """Intern the string if it is short enough.
+
+    >>> intern('Brand') is intern(''.join(['Bra', 'nd']))
+    True
+    """
+    if value.__class__ is str and len(value) <= INTERN_MAX_LENGTH:
+        return sys.intern(value)
+    return value
+
+
+def share_timezone(value):
+    """Replace time zone of the timestamp with the shared instance.
+
+    >>> tz = timezone(timedelta(hours=2))
+    >>> value = datetime(2023, 3, 11, tzinfo=tz)
+    >>> share_timezone(value) == value
+    True
+    >>> share_timezone(value).tzinfo is share_timezone(value).tzinfo
+    True
+    """
+    if value.__class__ is not datetime:
+        return value
+
+    tzinfo = value.tzinfo
+    if tzinfo is None or tzinfo is timezone.utc:
+        return value
+
+    offset = tzinfo.utcoffset(value)
+    if tzinfo.__class__ is not timezone or offset is None:
+        return value
+
+    shared = _TIMEZONES.setdefault(offset, tzinfo)
+    if shared is tzinfo:
+        return value
+    return value.replace(tzinfo=shared)
 
 
-@dataclass(frozen=True)
+class LazyTimestamp:
+    """Descriptor parsing ISO 8601 timestamp strings on first access.
+
+    Wraps the slot descriptor of a dataclass field. The parsed value
+    replaces the string in the slot, so it is parsed only once.
+    """
+
+    def __init__(self, slot):
+        """A :class:`LazyTimestamp` object wrapping the slot descriptor."""
+        self.slot = slot
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+
+        value = self.slot.__get__(instance, owner)
+        if value.__class__ is str:
+            value = share_timezone(datetime.fromisoformat(value))
+            self.slot.__set__(instance, value)
+        return value
+
+    def __set__(self, instance, value):
+        self.slot.__set__(instance, share_timezone(value))
+
+
+def lazy_timestamps(*names):
+    """Class decorator making timestamp fields of a dataclass lazy."""
+    def decorate(cls):
+        for name in names:
+            setattr(cls, name, LazyTimestamp(cls.__dict__[name]))
+        return cls
+    return decorate
+
+
+@dataclass(frozen=True, slots=True)
 class Category:
     """Define the Category model we expect to receive from the provider."""
 
     id: int  # pylint: disable=invalid-name
     name: str
 
+    def __post_init__(self):
+        """Intern the name shared by many instances."""
+        object.__setattr__(self, 'name', intern(self.name))
+
     def __repr__(self):
         """Provide an easy-to-read description of the current instance."""
         return f'<{self.__class__.__name__}: id={self.id}>'
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Brand:
     """Define the Brand model data we expect to receive from the provider."""
 
     id: int  # pylint: disable=invalid-name
     name: str
 
+    def __post_init__(self):
+        """Intern the name shared by many instances."""
+        object.__setattr__(self, 'name', intern(self.name))
+
     def __repr__(self):
         """Provide an easy-to-read description of the current instance."""
         return f'<{self.__class__.__name__}: id={self.id}>'
 
 
-@dataclass(frozen=True)
+@lazy_timestamps('created_at', 'updated_at')
+@dataclass(frozen=True, slots=True)
 class Product:  # pylint: disable=too-many-instance-attributes
     """Define the Product model data we expect to receive from the provider."""
 
@@ -51,6 +147,11 @@ class Product:  # pylint: disable=too-many-instance-attributes
     created_at: datetime
     updated_at: datetime
 
+    def __post_init__(self):
+        """Intern short strings shared by many instances."""
+        object.__setattr__(self, 'name', intern(self.name))
+        object.__setattr__(self, 'description', intern(self.description))
+
     def __repr__(self):
         """Provide an easy-to-read description of the current instance."""
         return f'<{self.__class__.__name__}: id={self.id}>'
@@ -0,0 +1,284 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Rate limiting module for Consumer API example.
+
+This module provides a client-side rate limiter, so that requests wait
+locally for their turn instead of being rejected by the provider with
+``429 Too Many Requests``. Limits can be configured per endpoint group, or
+learned from the rate limit headers of provider responses.
+"""
+
+import math
+import threading
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+from requests.models import Response
+
+from .exceptions import RateLimitExceeded
+from .metrics import endpoint_template
+
+# Values of reset headers greater than that are timestamps, not delays
+EPOCH_THRESHOLD = 1e9
+
+
+def _header(headers, *names) -> Optional[float]:
+    """Get the first numeric header value out of the names.
+
+    Malformed values are skipped:
+
+    >>> _header({'RateLimit-Reset': 'soon', 'X-RateLimit-Reset': '5'},
+    ...         'RateLimit-Reset', 'X-RateLimit-Reset')
+    5.0
+    """
+    for name in names:
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            number = float(value)
+        except ValueError:
+            continue
+        if math.isfinite(number):
+            return number
+    return None
+
+
+def _retry_after(headers) -> Optional[float]:
+    """Get seconds to retry after, given as a delay or an HTTP-date.
+
+    >>> _retry_after({'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'})
+    0.0
+    """
+    seconds = _header(headers, 'Retry-After')
+    value = headers.get('Retry-After')
+    if seconds is not None or value is None:
+        return seconds
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    # Dates without a time zone are in UTC, see RFC 5322
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+def parse_rate_limit(response: Response) -> tuple:
+    """Get remaining requests, seconds to reset and to retry after.
+
+    Supports both ``RateLimit-*`` and ``X-RateLimit-*`` headers. Values
+    not provided by the response are ``None``.
+    """
+    headers = response.headers
+    remaining = _header(
+        headers, 'RateLimit-Remaining', 'X-RateLimit-Remaining')
+    reset = _header(headers, 'RateLimit-Reset', 'X-RateLimit-Reset')
+    if reset is not None and reset > EPOCH_THRESHOLD:
+        reset = max(reset - time.time(), 0.0)
+
+    # Responses retried by the transport carry the status code as ``status``
+    status_code = getattr(response, 'status_code', None) or response.status
+
+    retry_after = None
+    if status_code in {429, 503}:
+        retry_after = _retry_after(headers)
+
+    return remaining, reset, retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    Admits ``rate`` requests per second with bursts of up to ``burst``
+    requests. A bucket without ``rate`` admits every request, unless a
+    limit is learned from the provider.
+
+    >>> bucket = TokenBucket(rate=10.0, burst=1.0)
+    >>> bucket.reserve()
+    0.0
+    >>> 0.09 < bucket.reserve() <= 0.1
+    True
+    """
+
+    def __init__(self, rate: Optional[float] = None,
+                 burst: Optional[float] = None):
+        """A :class:`TokenBucket` object filled up to the burst."""
+        self.configured_rate = rate
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate or 1.0, 1.0)
+        self.tokens = self.burst
+        self.blocked_until = 0.0
+
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return seconds to wait until it is available.
+
+        Tokens are taken in advance, so that waiting requests are admitted
+        in the order of reservation.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            wait = max(self.blocked_until - now, 0.0)
+            if self.rate is None:
+                return wait
+
+            self.tokens -= 1.0
+            if self.tokens < 0.0:
+                wait = max(wait, -self.tokens / self.rate)
+            return wait
+
+    def refund(self):
+        """Return the reserved token which was not used."""
+        with self._lock:
+            if self.rate is not None:
+                self.tokens = min(self.tokens + 1.0, self.burst)
+
+    def learn(self, remaining: Optional[float] = None,
+              reset: Optional[float] = None,
+              retry_after: Optional[float] = None):
+        """Adjust the bucket to the limit reported by the provider.
+
+        The provider allows ``remaining`` requests in ``reset`` seconds,
+        which are spread evenly over that time, unless the configured rate is
+        lower. No requests are admitted for ``retry_after`` seconds.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+
+            if remaining is None or reset is None:
+                return
+
+            if remaining < 1.0:
+                self.blocked_until = max(self.blocked_until, now + reset)
+                return
+
+            rate = remaining / reset if reset > 0.0 else None
+            if self.configured_rate is not None:
+                rate = min(rate or self.configured_rate, self.configured_rate)
+
+            self.rate = rate
+            self.tokens = min(self.tokens, remaining)
+
+    def _refill(self, now: float):
+        """Add tokens accrued since the last update, the lock is held."""
+        if self.rate is not None:
+            self.tokens = min(
+                self.burst,
+                self.tokens + (now - self._updated) * self.rate,
+            )
+        self._updated = now
+
+
+def by_endpoint(_method: str, endpoint: str) -> str:
+    """Group requests by the endpoint template."""
+    return endpoint
+
+
+class RateLimiter:  # pylint: disable=too-many-instance-attributes
+    """Client-side rate limiter with a token bucket per endpoint group.
+
+    The ``rate`` and ``burst`` apply to every group, unless overridden by
+    ``limits`` mapping group names to ``(rate, burst)`` pairs. Requests are
+    grouped by ``group`` function called with the method and the endpoint
+    template, e.g. ``/v2/products/{id}``, so that a single group can be
+    used for a provider limiting all requests at once:
+
+    >>> limiter = RateLimiter(rate=5.0, group=lambda method, endpoint: 'api')
+    >>> limiter.acquire('GET', 'http://localhost/v2/products/1')
+    0.0
+
+    A request waiting longer than ``max_wait`` seconds raises
+    :class:`consumer.exceptions.RateLimitExceeded`. The limiter is thread
+    safe and can be shared by many clients.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, rate: Optional[float] = None,
+                 burst: Optional[float] = None,
+                 limits: Optional[dict] = None,
+                 group: Callable[[str, str], str] = by_endpoint,
+                 max_wait: Optional[float] = None):
+        """A :class:`RateLimiter` object without buckets."""
+        self.rate = rate
+        self.burst = burst
+        self.limits = limits or {}
+        self.group = group
+        self.max_wait = max_wait
+
+        self.waits = 0
+        self.wait_time = 0.0
+        self.rejected = 0
+
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, method: str, url: str) -> TokenBucket:
+        """Get the token bucket of the request group."""
+        endpoint = endpoint_template(urlsplit(url).path)
+        name = self.group(method.upper(), endpoint)
+        bucket = self._buckets.get(name)
+        if bucket is not None:
+            return bucket
+
+        with self._lock:
+            if name not in self._buckets:
+                rate, burst = self.limits.get(name, (self.rate, self.burst))
+                self._buckets[name] = TokenBucket(rate, burst)
+            return self._buckets[name]
+
+    def acquire(self, method: str, url: str) -> float:
+        """Wait for the request turn and return seconds waited."""
+        bucket = self.bucket(method, url)
+        wait = bucket.reserve()
+        if wait <= 0.0:
+            return 0.0
+
+        if self.max_wait is not None and wait > self.max_wait:
+            bucket.refund()
+            with self._lock:
+                self.rejected += 1
+            raise RateLimitExceeded(wait)
+
+        with self._lock:
+            self.waits += 1
+            self.wait_time += wait
+
+        time.sleep(wait)
+        return wait
+
+    def update(self, method: str, url: str, response: Response):
+        """Learn the limit of the request group from the response."""
+        remaining, reset, retry_after = parse_rate_limit(response)
+        if remaining is None and retry_after is None:
+            return
+
+        self.bucket(method, url).learn(remaining, reset, retry_after)
+
+    def stats(self) -> dict:
+        """Return rate limiter usage statistics."""
+        with self._lock:
+            return {
+                'groups': len(self._buckets),
+                'waits': self.waits,
+                'wait_time': self.wait_time,
+                'rejected': self.rejected,
+            }
@@ -11,8 +11,13 @@ This module provides base resource class used by various resource
 classes within Consumer API example.
 """
 
+import time
 from abc import ABCMeta
-from typing import TYPE_CHECKING
+from typing import Any, Callable, Type, TYPE_CHECKING
+
+from marshmallow import Schema
+
+from consumer import loaders
 
 if TYPE_CHECKING:
     from consumer.client import Client
@@ -43,3 +48,56 @@ class BaseResource(metaclass=ABCMeta):
         '/v1/products'
         """
         return f"/{self.api_version.strip('/')}/{path.lstrip('/')}"
+
+    def loader(self, schema_cls: Type[Schema],
+               many: bool = False) -> loaders.Loader:
+        """Get the loader deserializing data with the schema.
+
+        The loader is selected by the ``deserializer`` of the client.
+        """
+        return loaders.get_loader(schema_cls, self.client.deserializer, many)
+
+    def load(self, response, loader: Callable[[Any], Any]) -> Any:
+        """Deserialize the response body using the ``loader``.
+
+        Reuses the data already deserialized from the cached response, if the
+        client has a conditional request cache, or from the response shared
+        by coalesced requests. Time spent is recorded, if the client has
+        request metrics.
+        """
+        shared = getattr(response, 'shared', None)
+        if shared is not None:
+            return shared.load(loader, self._measured_load, response, loader)
+        return self._measured_load(response, loader)
+
+    def _measured_load(self, response, loader: Callable[[Any], Any]) -> Any:
+        """Deserialize the response body recording time spent."""
+        record = getattr(response, 'metrics', None)
+        if record is None or self.client.metrics is None:
+            return self._load(response, loader)
+
+        timings = {'load': 0.0}
+
+        def measured(data):
+            started = time.perf_counter()
+            try:
+                return loader(data)
+            finally:
+                timings['load'] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        result = self._load(response, measured)
+        total = time.perf_counter() - started
+
+        self.client.metrics.observe_load(
+            record,
+            decode=total - timings['load'],
+            load=timings['load'],
+        )
+        return result
+
+    def _load(self, response, loader: Callable[[Any], Any]) -> Any:
+        """Deserialize the response body reusing the cached result."""
+        if self.client.cache is None:
+            return loader(response.json())
+        return self.client.cache.load(response, loader)
@@ -7,21 +7,148 @@
 
 """Products API resource module."""
 
+import json
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, Iterator, TYPE_CHECKING, Union
+
+from consumer.batch import batch_loader, ProductBatch
+from consumer.dataloader import DataLoader
+from consumer.exceptions import (
+    ApiError,
+    NotFoundError,
+    PreconditionFailed,
+    PreconditionRequired,
+)
 from consumer.models import Product
 from consumer.schemas import ProductSchema
+from consumer.streaming import iter_array, iter_text
 from . import BaseResource
 
+if TYPE_CHECKING:
+    from consumer.client import Client
+
 
 class Products(BaseResource):
     """Represent Products API resource."""
 
+    ERROR_POLICIES = frozenset({'raise', 'skip', 'return'})
+
+    # Outcomes of conditional deletes
+    DELETED = 'deleted'
+    PRECONDITION_FAILED = 'precondition_failed'
+    NOT_FOUND = 'not_found'
+
+    def __init__(self, client: 'Client', api_version=None):
+        """A :class:`Products` object batching lookups, if enabled."""
+        super().__init__(client, api_version=api_version)
+
+        self.batcher = None
+        batching = client.batching
+        if batching is not None:
+            self.batcher = DataLoader(
+                self._get_batch,
+                window=batching.window,
+                max_size=batching.max_size,
+            )
+
     def get(self, product_id: int) -> Product:
-        """Get the requested product."""
+        """Get the requested product.
+
+        Concurrent lookups are combined into a single list request, if the
+        client has batching enabled.
+        """
+        if self.batcher is not None:
+            return self.batcher.load(int(product_id))
+        return self._get(product_id)
+
+    def _get(self, product_id: int) -> Product:
+        """Get the requested product with a request of its own."""
         url = self.resolve_endpoint(f'products/{product_id}')
         response = self.client.get(url)
 
-        schema = ProductSchema()
-        return schema.load(response.json())
+        return self.load(response, self.loader(ProductSchema))
+
+    def get_many(
+            self,
+            product_ids: Iterable[int],
+            max_workers: int = 10,
+            errors: str = 'raise',
+    ) -> list[Union[Product, ApiError]]:
+        """Get the requested products concurrently.
+
+        Requests are fanned out over the shared client session using at most
+        ``max_workers`` threads. The default matches the default size of the
+        connection pool. Results are returned in the order of
+        ``product_ids``.
+
+        The ``errors`` policy defines how an :class:`ApiError` raised for a
+        single product is handled:
+
+        * ``'raise'`` - cancel pending lookups and re-raise the error
+        * ``'skip'`` - omit the product from the result
+        * ``'return'`` - put the error in place of the product
+        """
+        if errors not in self.ERROR_POLICIES:
+            raise ValueError(f'Unknown errors policy: {errors!r}')
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self.get, i) for i in product_ids]
+            try:
+                return list(self._iter_results(futures, errors))
+            except ApiError:
+                executor.shutdown(cancel_futures=True)
+                raise
+
+    @staticmethod
+    def _iter_results(futures: Iterable[Future], errors: str) -> Iterator:
+        """Iterate over results of the futures applying the errors policy."""
+        for future in futures:
+            try:
+                yield future.result()
+            except ApiError as exc:
+                if errors == 'raise':
+                    raise
+                if errors == 'return':
+                    yield exc
+
+    def _get_batch(self, product_ids: list) -> dict:
+        """Get the requested products with a single list request.
+
+        Products not returned by the provider, e.g. if they do not fit in a
+        page or the provider ignores the filter, are requested one by one,
+        so that only the provider decides whether they are not found.
+        """
+        if len(product_ids) == 1:
+            return {product_ids[0]: self._get_or_error(product_ids[0])}
+
+        batching = self.client.batching
+        url = self.resolve_endpoint('products')
+        response = self.client.get(url, **{
+            batching.option: batching.encode(sorted(product_ids)),
+        })
+
+        products = self.load(response, self.loader(ProductSchema, many=True))
+        found = {product.id: product for product in products}
+
+        # At most as many workers as connections pooled per host by default
+        missing = [i for i in product_ids if i not in found]
+        if missing:
+            workers = min(len(missing), 10)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                found.update(zip(
+                    missing,
+                    executor.map(self._get_or_error, missing),
+                ))
+
+        return {product_id: found[product_id] for product_id in product_ids}
+
+    def _get_or_error(self, product_id: int) -> Union[Product, ApiError]:
+        """Get the requested product, or the error raised for it."""
+        try:
+            return self._get(product_id)
+        except ApiError as exc:
+            return exc
 
     def delete(self, product_id: int, **options) -> bool:
         """Get the requested product."""
@@ -30,18 +157,241 @@ class Products(BaseResource):
 
         return response.status_code == 204
 
+    def delete_many(self, product_ids: Iterable[int],
+                    concurrency: int = 10) -> dict[int, Union[str, ApiError]]:
+        """Delete the products concurrently if they are not modified.
+
+        Every product is deleted with ``If-Match`` precondition on its
+        ``ETag``. ETags already known to the client cache are reused, others
+        are fetched along with the product. Returns outcomes by product IDs
+        in the order of ``product_ids``:
+
+        * :attr:`DELETED` - the product is deleted
+        * :attr:`PRECONDITION_FAILED` - the product was modified since its
+          ``ETag`` was fetched, or the provider did not report it
+        * :attr:`NOT_FOUND` - the product does not exist
+
+        Any other :class:`ApiError` raised for a product is put in place of
+        its outcome, so that the outcomes of all products are reported even
+        if some of them fail.
+        """
+        product_ids = list(product_ids)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = executor.map(self._delete_one, product_ids)
+            return dict(zip(product_ids, outcomes))
+
+    def _delete_one(self, product_id: int) -> Union[str, ApiError]:
+        """Delete the product with ``If-Match`` precondition."""
+        url = self.resolve_endpoint(f'products/{product_id}')
+        try:
+            etag = self.client.cached_etag(url)
+            if etag is None:
+                etag = self.client.get(url).headers.get('ETag')
+
+            headers = {'If-Match': etag} if etag is not None else {}
+            self.delete(product_id, headers=headers)
+        except NotFoundError:
+            return self.NOT_FOUND
+        except (PreconditionFailed, PreconditionRequired):
+            return self.PRECONDITION_FAILED
+        except ApiError as exc:
+            return exc
+
+        return self.DELETED
+
     def create(self, **data) -> Product:
         """Create a product."""
         url = self.resolve_endpoint('products')
         response = self.client.post(url, data=data)
 
-        schema = ProductSchema()
-        return schema.load(response.json())
+        load = self.loader(ProductSchema)
+        return load(response.json())
 
-    def all(self, **options) -> list[Product]:
-        """Get list of products."""
+    def create_many(
+            self,
+            products: Iterable[dict],
+            chunk_size: int = 100,
+            concurrency: int = 10,
+            errors: str = 'raise',
+    ) -> Iterator[Union[Product, ApiError]]:
+        """Create the products concurrently yielding them as they are created.
+
+        Products are read lazily from any iterable of product data, so that
+        at most ``chunk_size`` of them are read ahead of the results, and
+        created using at most ``concurrency`` threads. Created products are
+        yielded in the order of ``products``.
+
+        The ``errors`` policy is the same as the :meth:`get_many` one. With
+        the ``'return'`` policy, the :class:`ApiError` is yielded in place of
+        the product, e.g. :class:`consumer.exceptions.UnprocessableEntity`
+        with validation details in its ``errors``.
+        """
+        if errors not in self.ERROR_POLICIES:
+            raise ValueError(f'Unknown errors policy: {errors!r}')
+        if chunk_size < 1:
+            raise ValueError('Chunk size should be a positive integer')
+
+        return self._create_many(products, chunk_size, concurrency, errors)
+
+    def _create_many(self, products: Iterable[dict], chunk_size: int,
+                     concurrency: int, errors: str) -> Iterator:
+        """Create the products keeping a window of requests in flight."""
+        def submit_all() -> Iterator[Future]:
+            pending = deque()
+            for data in products:
+                pending.append(executor.submit(self._create_one, data))
+                if len(pending) >= chunk_size:
+                    yield pending.popleft()
+            yield from pending
+
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            yield from self._iter_results(submit_all(), errors)
+        finally:
+            # Also stops pending requests of abandoned iteration
+            executor.shutdown(cancel_futures=True)
+
+    def _create_one(self, data: dict) -> Product:
+        """Create a product out of its data."""
+        return self.create(**data)
+
+    def all(self, batch: bool = False,
+            **options) -> Union[list[Product], ProductBatch]:
+        """Get list of products.
+
+        If ``batch`` is set, products are returned as a columnar
+        :class:`ProductBatch` without creating a :class:`Product` per row.
+        """
         url = self.resolve_endpoint('products')
         response = self.client.get(url, **options)
 
-        schema = ProductSchema()
-        return [schema.load(p) for p in response.json()]
+        if batch:
+            load = batch_loader(self.client.deserializer)
+            return self.load(response, load).copy()
+
+        products = self.load(response, self.loader(ProductSchema, many=True))
+
+        # Cached list is shared, thus hand out a copy of it
+        return list(products)
+
+    def stream_all(self, chunk_size: int = 65536,
+                   **options) -> Iterator[Product]:
+        """Get list of products decoding the response body incrementally.
+
+        The request is sent with ``stream=True`` and the top-level JSON array
+        is parsed as the body arrives, so every product is validated and
+        yielded as soon as it is received instead of holding the raw body,
+        the decoded list and the list of products in memory at once.
+        """
+        url = self.resolve_endpoint('products')
+        response = self.client.get(url, stream=True, **options)
+
+        load = self.loader(ProductSchema)
+        with response:
+            for data in iter_array(iter_text(response, chunk_size)):
+                yield load(data)
+
+    def iter_all(self, prefetch: bool = False, **options) -> Iterator[Product]:
+        """Iterate over all products walking the pages lazily.
+
+        Pages are requested one at a time starting from the ``page`` option
+        (or the first page) until an empty or the last page reported by the
+        ``X-Pagination`` header is reached. Products are yielded one by one,
+        so only a single page is held in memory.
+
+        If ``prefetch`` is set, the next page is requested on a background
+        thread while the caller consumes the current one.
+        """
+        for products in self._iter_pages(prefetch, options):
+            yield from products
+
+    def iter_batches(self, prefetch: bool = False,
+                     **options) -> Iterator[ProductBatch]:
+        """Iterate over all products yielding a columnar batch per page.
+
+        Pages are walked the same way as :meth:`iter_all` does.
+        """
+        for products in self._iter_pages(prefetch, options):
+            yield ProductBatch.from_products(products)
+
+    def _iter_pages(self, prefetch: bool, options: dict) -> Iterator[list]:
+        """Iterate over pages of products until the last one."""
+        page = int(options.pop('page', 1))
+
+        if not prefetch:
+            while True:
+                products, is_last = self._fetch_page(page, options)
+                yield products
+
+                if is_last:
+                    return
+                page += 1
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(self._fetch_page, page, options)
+            while True:
+                products, is_last = future.result()
+                if not is_last:
+                    future = executor.submit(
+                        self._fetch_page,
+                        page + 1,
+                        options,
+                    )
+
+                yield products
+
+                if is_last:
+                    return
+                page += 1
+
+    def _fetch_page(self, page: int, options: dict) -> tuple[list, bool]:
+        """Get the page of products and tell whether it is the last one."""
+        url = self.resolve_endpoint('products')
+        response = self.client.get(url, **dict(options, page=page))
+
+        products = self.load(response, self.loader(ProductSchema, many=True))
+
+        pagination = json.loads(response.headers.get('X-Pagination', '{}'))
+        total_pages = pagination.get('total_pages')
+
+        is_last = not products or (
+            total_pages is not None and page >= total_pages
+        )
+
+        return list(products), is_last
+
+
+class AsyncProducts(BaseResource):
+    """Represent Products API resource for the asyncio client."""
+
+    async def get(self, product_id: int) -> Product:
+        """Get the requested product."""
+        url = self.resolve_endpoint(f'products/{product_id}')
+        response = await self.client.get(url)
+
+        return self.load(response, self.loader(ProductSchema))
+
+    async def delete(self, product_id: int, **options) -> bool:
+        """Delete the requested product."""
+        url = self.resolve_endpoint(f'products/{product_id}')
+        response = await self.client.delete(url, **options)
+
+        return response.status_code == 204
+
+    async def create(self, **data) -> Product:
+        """Create a product."""
+        url = self.resolve_endpoint('products')
+        response = await self.client.post(url, data=data)
+
+        load = self.loader(ProductSchema)
+        return load(response.json())
+
+    async def all(self, **options) -> list[Product]:
+        """Get list of products."""
+        url = self.resolve_endpoint('products')
+        response = await self.client.get(url, **options)
+
+        products = self.load(response, self.loader(ProductSchema, many=True))
+
+        # Loaded list is shared by coalesced requests, thus hand out a copy
+        return list(products)
@@ -71,3 +71,11 @@ class ProductSchema(Schema):
     def make(self, data, **_kwargs):
         """Deserialize the ``data`` to a Product instance."""
         return Product(**data)
+
+
+class ProductRowSchema(ProductSchema):
+    """Schema for products kept as dicts of their fields, e.g. in batches."""
+
+    def make(self, data, **_kwargs):
+        """Keep the deserialized ``data`` as is."""
+        return data
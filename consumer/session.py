@@ -7,13 +7,223 @@
 
 """Session module for Consumer API example."""
 
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
 from requests import Session
 from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import MaxRetryError, ResponseError
 from urllib3.util.retry import Retry
 
+# Time spent establishing connections per thread
+_connect_time = threading.local()
+
+# Observer of responses retried by the current thread
+_retry_observer = threading.local()
+
+
+class RetryBudget:
+    """Thread-safe budget of retries shared by requests of a session.
+
+    Every request deposits ``ratio`` of a retry and every retry withdraws a
+    whole one, so that retries add no more than ``ratio`` of load when the
+    API fails. Additionally, ``min_per_second`` retries are allowed, so that
+    clients sending few requests still retry. Unused retries are saved up
+    to the ``capacity``.
+
+    >>> budget = RetryBudget(ratio=0.5, min_per_second=0.0, capacity=1.0)
+    >>> budget.withdraw(), budget.withdraw()
+    (True, False)
+    >>> budget.deposit()
+    >>> budget.deposit()
+    >>> budget.withdraw()
+    True
+    """
+
+    def __init__(self, ratio=0.2, min_per_second=10.0, capacity=100.0):
+        """A :class:`RetryBudget` object filled up to the capacity."""
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.exhausted = 0
+
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        """Account a request sent."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Take a retry out of the budget, if there is any left."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+
+            self.exhausted += 1
+            return False
+
+    def _refill(self):
+        """Add retries allowed per second, the lock should be held."""
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity,
+            self.tokens + (now - self._updated) * self.min_per_second,
+        )
+        self._updated = now
+
+
+class JitteredRetry(Retry):
+    """Retry policy with decorrelated jitter, time cap and retry budget.
+
+    The backoff is drawn from ``backoff_factor`` to three times the previous
+    backoff, capped by ``backoff_max``, so that clients failed at once do not
+    retry in lockstep. A ``Retry-After`` delay is always waited out, with
+    the backoff added on top of it.
+
+    Retries are given up if the next one would start later than
+    ``max_retry_time`` seconds after the first failure, or the ``budget``
+    has no retries left.
+    """
+
+    def __init__(self, *args, max_retry_time=None, budget=None,
+                 deadline=None, backoff=0.0, **kwargs):
+        """A :class:`JitteredRetry` object, see :class:`Retry` for details."""
+        super().__init__(*args, **kwargs)
+        self.max_retry_time = max_retry_time
+        self.budget = budget
+        self.deadline = deadline
+        self.backoff = backoff
+
+    def new(self, **kw):
+        params = {
+            'max_retry_time': self.max_retry_time,
+            'budget': self.budget,
+            'deadline': self.deadline,
+            'backoff': self.backoff,
+        }
+        params.update(kw)
+        return super().new(**params)
+
+    # pylint: disable=too-many-arguments
+    def increment(self, method=None, url=None, response=None, error=None,
+                  _pool=None, _stacktrace=None):
+        """Return a new retry object with incremented retry counters.
+
+        Raises :class:`MaxRetryError` if retries are exhausted, the time cap
+        is reached or the retry budget is spent. The error carries the retry
+        object as ``retries``, so that the retries made are known.
+        """
+        observer = getattr(_retry_observer, 'value', None)
+        if observer is not None and response is not None:
+            observer(response)
+
+        try:
+            retry = super().increment(
+                method, url, response, error, _pool, _stacktrace)
+        except MaxRetryError as exc:
+            exc.retries = self
+            raise
+
+        retry.backoff = min(self.backoff_max, random.uniform(
+            self.backoff_factor,
+            max(self.backoff, self.backoff_factor) * 3,
+        ))
+
+        now = time.monotonic()
+        if retry.deadline is None and self.max_retry_time is not None:
+            retry.deadline = now + self.max_retry_time
+
+        reason = None
+        if (retry.deadline is not None and
+                now + retry.get_sleep_time(response) > retry.deadline):
+            reason = 'retry time exceeded'
+        elif self.budget is not None and not self.budget.withdraw():
+            reason = 'retry budget exhausted'
+
+        if reason is not None:
+            exc = MaxRetryError(_pool, url, error or ResponseError(reason))
+            exc.retries = self
+            raise exc from error
+
+        return retry
+
+    def get_backoff_time(self) -> float:
+        """Get the jittered backoff before the next retry."""
+        return self.backoff
+
+    def get_sleep_time(self, response=None) -> float:
+        """Get the time to sleep before the next retry.
+
+        >>> JitteredRetry(backoff=0.5).get_sleep_time()
+        0.5
+        """
+        retry_after = None
+        if self.respect_retry_after_header and response is not None:
+            retry_after = self.get_retry_after(response)
+        return (retry_after or 0.0) + self.get_backoff_time()
+
+    def sleep(self, response=None):
+        """Sleep between retry attempts."""
+        seconds = self.get_sleep_time(response)
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+@contextmanager
+def observe_retries(observer: Callable):
+    """Call the observer with every response retried by the current thread.
+
+    Responses retried by the transport never reach the caller, thus their
+    headers are only available to the observer, including the last one of
+    exhausted retries.
+    """
+    previous = getattr(_retry_observer, 'value', None)
+    _retry_observer.value = observer
+    try:
+        yield
+    finally:
+        _retry_observer.value = previous
+
+
+def retries_made(error: BaseException) -> Optional[int]:
+    """Get the number of retries made before the request failed.
+
+    The :class:`MaxRetryError` raised by :class:`JitteredRetry` is looked up
+    among the error, its causes and the errors wrapped by ``requests``.
+    Returns ``None`` if there is no such error.
+
+    >>> retries_made(ValueError()) is None
+    True
+    """
+    while error is not None:
+        if isinstance(error, MaxRetryError):
+            retries = getattr(error, 'retries', None)
+            return len(retries.history) if retries is not None else None
+
+        if error.args and isinstance(error.args[0], BaseException):
+            error = error.args[0]
+        else:
+            error = error.__cause__ or error.__context__
+    return None
+
 
-def create_retry(max_retries=3, backoff_factor=1.0) -> Retry:
-    """Create default HTTP adapter based on retry policy."""
+def create_retry(max_retries=3, backoff_factor=1.0, backoff_max=30.0,
+                 max_retry_time=60.0, budget=None) -> Retry:
+    """Create default HTTP adapter based on retry policy.
+
+    Creates a :class:`JitteredRetry` policy, see its description for the
+    meaning of arguments.
+    """
     status_forcelist = frozenset({
         408,  # Request Timeout
         429,  # Too Many Requests
@@ -36,25 +246,222 @@ def create_retry(max_retries=3, backoff_factor=1.0) -> Retry:
         'read': max_retries,
         'connect': max_retries,
         'backoff_factor': backoff_factor,
+        'backoff_max': max(backoff_max, backoff_factor),
         'status_forcelist': status_forcelist,
-        'allowed_methods': method_whitelist
+        'allowed_methods': method_whitelist,
+        'max_retry_time': max_retry_time,
+        'budget': budget,
     }
 
-    return Retry(**retry_kwargs)
+    return JitteredRetry(**retry_kwargs)
+
+
+def connect_time() -> float:
+    """Return seconds the current thread spent establishing connections.
+
+    The value only grows, so that the time spent by a request is the
+    difference of values taken before and after it.
+    """
+    return getattr(_connect_time, 'value', 0.0)
+
+
+def _timed(connect):
+    """Wrap the connection method to account the time spent by it."""
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return connect(*args, **kwargs)
+        finally:
+            _connect_time.value = (
+                connect_time() + time.perf_counter() - started
+            )
+    return wrapper
+
+
+class PoolStats:  # pylint: disable=too-few-public-methods
+    """Thread-safe connection usage counters of an adapter."""
+
+    def __init__(self):
+        """A :class:`PoolStats` object with zeroed counters."""
+        self.created = 0
+        self.reused = 0
+        self.in_use = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.discarded = 0
+
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value=1):
+        """Increment the counter by the value."""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+
+
+class InstrumentedPoolMixin:  # pylint: disable=too-few-public-methods
+    """Connection pool mixin counting connection usage into ``stats``."""
+
+    stats: PoolStats
+
+    def _new_conn(self):
+        self.stats.increment('created')
+        conn = super()._new_conn()
+        conn.connect = _timed(conn.connect)
+        return conn
+
+    def _get_conn(self, timeout=None):
+        waits = self.block and self.pool is not None and self.pool.empty()
+        started = time.perf_counter()
+
+        conn = super()._get_conn(timeout=timeout)
+
+        if waits:
+            self.stats.increment('waits')
+            self.stats.increment('wait_time', time.perf_counter() - started)
+
+        # A fresh connection is not connected yet
+        if getattr(conn, 'sock', None) is not None:
+            self.stats.increment('reused')
+
+        self.stats.increment('in_use')
+        return conn
 
+    def _put_conn(self, conn):
+        self.stats.increment('in_use', -1)
+        if self.pool is not None and self.pool.full():
+            self.stats.increment('discarded')
 
-def factory(max_retries=3, backoff_factor=1.0) -> Session:
+        super()._put_conn(conn)
+
+    def idle_connections(self) -> int:
+        """Count connected connections waiting in the pool."""
+        if self.pool is None:
+            return 0
+
+        return sum(
+            1 for conn in list(self.pool.queue)
+            if getattr(conn, 'sock', None) is not None
+        )
+
+
+class PoolingAdapter(HTTPAdapter):
+    """HTTP adapter which collects connection pool statistics."""
+
+    def __init__(self, *args, **kwargs):
+        """A :class:`PoolingAdapter` object with its own statistics."""
+        self.pool_stats = PoolStats()
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, *args, **kwargs):
+        """Sends the request accounting it in the retry budget, if any."""
+        budget = getattr(self.max_retries, 'budget', None)
+        if budget is not None:
+            budget.deposit()
+        return super().send(request, *args, **kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False,
+                         **pool_kwargs):
+        """Initializes a urllib3 PoolManager with instrumented pools."""
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+
+        namespace = {'stats': self.pool_stats}
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': type(
+                'InstrumentedHTTPConnectionPool',
+                (InstrumentedPoolMixin, HTTPConnectionPool),
+                namespace,
+            ),
+            'https': type(
+                'InstrumentedHTTPSConnectionPool',
+                (InstrumentedPoolMixin, HTTPSConnectionPool),
+                namespace,
+            ),
+        }
+
+    def stats(self) -> dict:
+        """Return connection usage statistics of the adapter."""
+        pools = self.poolmanager.pools
+        idle = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if isinstance(pool, InstrumentedPoolMixin):
+                idle += pool.idle_connections()
+
+        stats = self.pool_stats
+        return {
+            'pools': len(pools),
+            'open': idle + stats.in_use,
+            'idle': idle,
+            'in_use': stats.in_use,
+            'created': stats.created,
+            'reused': stats.reused,
+            'waits': stats.waits,
+            'wait_time': stats.wait_time,
+            'discarded': stats.discarded,
+        }
+
+
+def factory(  # pylint: disable=too-many-arguments
+        max_retries=3,
+        backoff_factor=1.0,
+        pool_connections=10,
+        pool_maxsize=10,
+        pool_block=False,
+        *,
+        retry_budget: RetryBudget = None,
+) -> Session:
     """Create :class:`requests.Session` object.
 
     Creates a session object that can be used by multiple
     :class:`consumer.client.Client` instances.
+
+    Connections are pooled per host. The ``pool_connections`` is the number
+    of host pools to keep, the ``pool_maxsize`` is the number of connections
+    kept per host. The ``pool_maxsize`` should be not less than the number
+    of threads sharing the session, otherwise extra connections are
+    discarded after use, or, if ``pool_block`` is set, threads wait for a
+    free connection.
+
+    Retries of all requests sent by the session are limited by the
+    ``retry_budget``, which can be shared by many sessions. Otherwise, the
+    session creates its own :class:`RetryBudget`.
     """
     session = Session()
 
-    retry_strategy = create_retry(max_retries, backoff_factor)
-    adapter = HTTPAdapter(max_retries=retry_strategy)
+    retry_strategy = create_retry(
+        max_retries,
+        backoff_factor,
+        budget=retry_budget or RetryBudget(),
+    )
+    adapter = PoolingAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+        max_retries=retry_strategy,
+    )
 
     session.mount('http://', adapter)
     session.mount('https://', adapter)
 
     return session
+
+
+def pool_stats(session: Session) -> dict:
+    """Return connection usage statistics summed over session adapters.
+
+    >>> stats = pool_stats(factory())
+    >>> stats['open'], stats['idle'], stats['reused'], stats['waits']
+    (0, 0, 0, 0)
+    """
+    adapters = {
+        id(adapter): adapter
+        for adapter in session.adapters.values()
+        if isinstance(adapter, PoolingAdapter)
+    }
+
+    result = {}
+    for adapter in adapters.values():
+        for name, value in adapter.stats().items():
+            result[name] = result.get(name, 0) + value
+
+    return result
@@ -0,0 +1,178 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Request coalescing module for Consumer API example.
+
+This module provides single-flight groups collapsing identical concurrent
+calls into one. The first call of a key is sent, whereas calls of the same
+key made while it is in flight wait for it and share its result, or its
+error. Shared responses carry a :class:`SharedResult`, so that the data is
+deserialized from them only once as well.
+"""
+
+import sys
+import threading
+from typing import Any, Callable, Hashable, Optional
+
+
+def request_key(method: str, url: str, params: Optional[dict] = None,
+                headers: Optional[dict] = None) -> tuple:
+    """Build a key identifying the request.
+
+    Query parameters are normalized, so that their order does not matter.
+    Requests with different headers, e.g. credentials, are never collapsed.
+
+    >>> key = request_key('get', '/v2/products', {'size': 5, 'page': 1})
+    >>> key == request_key('GET', '/v2/products', {'page': 1, 'size': 5})
+    True
+    """
+    return (
+        method.upper(),
+        url,
+        tuple(sorted((k, str(v)) for k, v in (params or {}).items())),
+        tuple(sorted((headers or {}).items())),
+    )
+
+
+class SharedResult:  # pylint: disable=too-few-public-methods
+    """Thread-safe results deserialized from a shared response."""
+
+    def __init__(self):
+        """A :class:`SharedResult` object without results."""
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def load(self, loader: Hashable, func: Callable, *args) -> Any:
+        """Get the result of the loader calling the function only once."""
+        with self._lock:
+            if loader not in self.values:
+                self.values[loader] = func(*args)
+            return self.values[loader]
+
+
+class Call:  # pylint: disable=too-few-public-methods
+    """Define a call in flight."""
+
+    def __init__(self):
+        """A :class:`Call` object not completed yet."""
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Thread-safe group of calls collapsing identical concurrent ones.
+
+    >>> flight = SingleFlight()
+    >>> flight.do('key', lambda: 42)
+    42
+    >>> flight.stats()
+    {'calls': 1, 'collapsed': 0, 'in_flight': 0}
+
+    The group can be shared by many clients.
+    """
+
+    def __init__(self):
+        """A :class:`SingleFlight` object without calls in flight."""
+        self.calls = 0
+        self.collapsed = 0
+
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable, *args) -> Any:
+        """Call the function, or wait for the call of the key in flight."""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Call()
+            else:
+                self.collapsed += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        completed = False
+        try:
+            call.result = func(*args)
+            completed = True
+            return call.result
+        finally:
+            if not completed:
+                call.error = sys.exc_info()[1]
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        """Return coalescing statistics."""
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'collapsed': self.collapsed,
+                'in_flight': len(self._calls),
+            }
+
+
+class AsyncSingleFlight:
+    """Group of coroutine calls collapsing identical concurrent ones.
+
+    The shared call is run as a separate task, so that it is not cancelled
+    along with any of the callers waiting for it.
+    """
+
+    def __init__(self):
+        """A :class:`AsyncSingleFlight` object without calls in flight."""
+        self.calls = 0
+        self.collapsed = 0
+
+        self._tasks = {}
+
+    async def do(self, key: Hashable, func: Callable, *args) -> Any:
+        """Await the coroutine function, or the call of the key in flight."""
+        # Not imported at the top level, not to slow down the client import
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        self.calls += 1
+        task = self._tasks.get(key)
+        if task is not None and not task.done():
+            self.collapsed += 1
+        else:
+            task = asyncio.ensure_future(func(*args))
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        """Return coalescing statistics."""
+        return {
+            'calls': self.calls,
+            'collapsed': self.collapsed,
+            'in_flight': len(self._tasks),
+        }
+
+    def _forget(self, key: Hashable, task):
+        """Remove the completed task of the key."""
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+
+def share(response: Any) -> Any:
+    """Attach a :class:`SharedResult` to the response shared by calls.
+
+    Resources deserialize the data from the shared response only once.
+    Responses served from the client cache are copies made for the call,
+    thus the cached response itself is never shared this way.
+    """
+    response.shared = SharedResult()
+    return response
@@ -0,0 +1,143 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Streaming module for Consumer API example.
+
+This module provides helpers to decode large JSON responses incrementally,
+without holding the whole body in memory.
+"""
+
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator
+
+from requests.models import Response
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def iter_text(response: Response, chunk_size: int = 65536) -> Iterator[str]:
+    """Iterate over the response body decoded to text chunk by chunk."""
+    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')()
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
+class ArrayDecoder:
+    """Incremental decoder of a top-level JSON array.
+
+    Text chunks are fed to the decoder, which returns every array element
+    as soon as it is completely received:
+
+    >>> decoder = ArrayDecoder()
+    >>> decoder.feed('[{"id": 1}, {"i')
+    [{'id': 1}]
+    >>> decoder.feed('d": 2}, 3')
+    [{'id': 2}]
+    >>> decoder.feed('0]', final=True)
+    [30]
+    >>> decoder.close()
+    """
+
+    def __init__(self):
+        """A :class:`ArrayDecoder` object expecting the array start."""
+        self.buffer = ''
+        self.expect = '['
+        self.done = False
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, text: str, final: bool = False) -> list:
+        """Decode array elements available after appending the text chunk.
+
+        The ``final`` flag tells that no more chunks are expected, thus the
+        array should be terminated by now.
+        """
+        self.buffer += text
+        values = []
+
+        pos = WHITESPACE.match(self.buffer).end()
+        while pos < len(self.buffer) and not self.done:
+            char = self.buffer[pos]
+            if self.expect == 'value' or (
+                    self.expect == 'value or ]' and char != ']'):
+                end = self._decode(pos, final, values)
+                if end is None:
+                    break
+                pos = end
+            else:
+                pos = self._delimiter(pos)
+
+            pos = WHITESPACE.match(self.buffer, pos).end()
+
+        self.buffer = self.buffer[pos:]
+
+        return values
+
+    def close(self):
+        """Make sure the array is terminated once all chunks are fed."""
+        if not self.done:
+            raise json.JSONDecodeError('Unterminated array', self.buffer, 0)
+
+    def _decode(self, pos: int, final: bool, values: list):
+        """Decode the element at the position, if completely received."""
+        try:
+            value, end = self._decoder.raw_decode(self.buffer, pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return None
+
+        # Numbers and literals may continue in the next chunk
+        if end == len(self.buffer) and not final:
+            return None
+
+        values.append(value)
+        self.expect = ','
+        return end
+
+    def _delimiter(self, pos: int) -> int:
+        """Consume the array delimiter at the position."""
+        char = self.buffer[pos]
+        if self.expect == '[' and char == '[':
+            self.expect = 'value or ]'
+        elif self.expect in {',', 'value or ]'} and char == ']':
+            self.done = True
+        elif self.expect == ',' and char == ',':
+            self.expect = 'value'
+        else:
+            raise json.JSONDecodeError(
+                f"Expecting '{self.expect}'", self.buffer, pos)
+
+        return pos + 1
+
+
+def iter_array(chunks: Iterable[str]) -> Iterator[Any]:
+    """Iterate over elements of a top-level JSON array.
+
+    The array is parsed incrementally from the text chunks, and every element
+    is yielded as soon as it is completely received.
+
+    >>> list(iter_array(['[{"id": 1}, {"i', 'd": 2}, 3', '0]']))
+    [{'id': 1}, {'id': 2}, 30]
+    >>> list(iter_array([' [ ', ' ] ']))
+    []
+    """
+    decoder = ArrayDecoder()
+    for chunk in chunks:
+        yield from decoder.feed(chunk)
+        if decoder.done:
+            return
+
+    yield from decoder.feed('', final=True)
+    decoder.close()
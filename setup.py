@@ -114,8 +114,8 @@ CLASSIFIERS = [
 INSTALL_REQUIRES = [
     'asdicts>=1.1.0',  # Missed utilities for working with Python dictionaries
     'marshmallow>=3.19.0',  # Complex data (de)serialization
-    'requests>=2.28.2',  # Python HTTP for Humans.
-    'urllib3>=1.26.14',  # HTTP library with thread-safe connection pooling, file post, and more.  # noqa: E501
+    'requests>=2.30.0',  # Python HTTP for Humans.
+    'urllib3>=2.0.0',  # HTTP library with thread-safe connection pooling, file post, and more.  # noqa: E501
 ]
 
 # List additional groups of dependencies here (e.g. testing dependencies).
@@ -131,6 +131,7 @@ EXTRAS_REQUIRE = {
         'flake8-blind-except>=0.2.0',  # Checks for blind except: statements
         'flake8-import-order>=0.18.1',  # Checks the ordering of imports
         'flake8>=6.0.0',  # The modular source code checker
+        'httpx>=0.24.0',  # A next generation HTTP client for Python
         'pact-python>=1.7.0',  # Create and verify consumer driven contracts
         'pylint>=2.6.2',  # Python code static checker
         'pytest>=6.2.4',  # Our tests framework
@@ -138,6 +139,15 @@ EXTRAS_REQUIRE = {
     ],
     'docs': [
     ],
+    # Dependencies that are required to use the asyncio client
+    'async': [
+        'httpx>=0.24.0',  # A next generation HTTP client for Python
+    ],
+    # Dependencies that are required to use brotli and zstd compression
+    'compression': [
+        'brotli>=1.0.9',  # Python bindings for the Brotli compression library
+        'zstandard>=0.18.0',  # Zstandard bindings for Python
+    ],
 }
 
 EXTRAS_REQUIRE['develop'] = \
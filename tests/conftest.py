@@ -7,6 +7,8 @@
 
 import os
 import subprocess
+import threading
+from http.server import ThreadingHTTPServer
 
 import pytest
 
@@ -49,6 +51,24 @@ def client(mock_opts: dict) -> TestClient:
     return TestClient(mock_opts)
 
 
+@pytest.fixture
+def product_data() -> dict:
+    """Get a product representation as returned by the provider."""
+    return {
+        'id': 1,
+        'name': 'Some product name',
+        'description': 'Some product description',
+        'brand_id': 1,
+        'category_id': 2,
+        'price': 442.95,
+        'discount': 0.1,
+        'rating': 4.5,
+        'stock': 123,
+        'created_at': '2023-03-11T21:56:41.123456+00:00',
+        'updated_at': '2023-03-12T11:36:28.654321+00:00',
+    }
+
+
 def git_revision_short_hash() -> str:
     """Get the short Git commit."""
     root_dir = os.path.dirname(
@@ -75,3 +95,22 @@ def app_version() -> str:
 
     git_commit = git_revision_short_hash()
     return f'{__version__}+{git_commit}'
+
+
+@pytest.fixture
+def http_server():
+    """Run local HTTP servers with the handlers and get their base URLs."""
+    servers = []
+
+    def serve(handler) -> str:
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        servers.append(server)
+        return f'http://127.0.0.1:{server.server_port}'
+
+    yield serve
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,300 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Asyncio provider stub replaying pact files.
+
+Serves the interactions of the JSON pacts written to ``tests/pacts``, so
+that clients can be load tested without the pact mock service:
+
+.. code-block:: console
+
+   $ python -m tests.provider --port 1234 \\
+       --state 'there is a product with ID 1' --latency 0.01
+
+Requests are matched by method, path and query string. Interactions given
+a provider state are only served while the state is active; when no states
+are set, the first matching interaction is served.
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+from collections import Counter
+from typing import Iterable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+PACT_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'pacts')
+
+REASONS = {
+    200: 'OK',
+    201: 'Created',
+    204: 'No Content',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    404: 'Not Found',
+    412: 'Precondition Failed',
+    422: 'Unprocessable Entity',
+    428: 'Precondition Required',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+
+def encode_response(status: int, headers: dict, body=None) -> bytes:
+    """Encode the HTTP/1.1 response, so that it can be sent as is.
+
+    >>> encode_response(204, {})
+    b'HTTP/1.1 204 No Content\\r\\nContent-Length: 0\\r\\n\\r\\n'
+    """
+    content = b'' if body is None else json.dumps(body).encode('utf-8')
+    lines = [f'HTTP/1.1 {status} {REASONS.get(status, "Unknown")}']
+    lines += [
+        f'{name}: {value}' for name, value in headers.items()
+        if name.lower() != 'content-length'
+    ]
+    lines += [f'Content-Length: {len(content)}', '', '']
+    return '\r\n'.join(lines).encode('latin-1') + content
+
+
+def error_response(status: int, message: str) -> bytes:
+    """Encode the JSON error response with the status code."""
+    return encode_response(
+        status,
+        {'Content-Type': 'application/json; charset=utf-8'},
+        {'code': status, 'status': REASONS.get(status), 'message': message},
+    )
+
+
+def parse_query(query: str) -> dict:
+    """Parse the query string to a comparable form.
+
+    >>> parse_query('cid=2&q=foo') == parse_query('q=foo&cid=2')
+    True
+    """
+    return {
+        key: sorted(values)
+        for key, values in parse_qs(query, keep_blank_values=True).items()
+    }
+
+
+class Interaction:  # pylint: disable=too-few-public-methods
+    """Define an interaction of a pact along with the encoded response."""
+
+    def __init__(self, interaction: dict):
+        """A :class:`Interaction` object created from its pact definition."""
+        request = interaction['request']
+        response = interaction['response']
+
+        self.description = interaction.get('description')
+        self.state = interaction.get('providerState')
+        self.method = request['method'].upper()
+        self.path = request['path']
+        self.query = parse_query(request.get('query', ''))
+        self.response = encode_response(
+            response.get('status', 200),
+            response.get('headers', {}),
+            response.get('body'),
+        )
+
+
+def load_interactions(pact_dir: str = PACT_DIR) -> list:
+    """Load interactions of all pact files in the directory."""
+    interactions = []
+    for filename in sorted(glob.glob(os.path.join(pact_dir, '*.json'))):
+        with open(filename, encoding='utf-8') as file:
+            pact = json.load(file)
+        interactions += [Interaction(i) for i in pact['interactions']]
+    return interactions
+
+
+class Provider:  # pylint: disable=too-many-instance-attributes
+    """Asyncio HTTP server replaying pact interactions.
+
+    Every response can be delayed by ``latency`` plus a random ``jitter``
+    seconds, and replaced by an ``error_status`` error with the
+    ``error_rate`` probability.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, interactions: Optional[list] = None, *,
+                 states: Iterable[str] = (), latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, seed: Optional[int] = None):
+        """A :class:`Provider` object serving the interactions."""
+        if not 0.0 <= error_rate <= 1.0:
+            raise ValueError('Error rate should be between 0 and 1')
+
+        self.interactions = {}
+        for interaction in (interactions or load_interactions()):
+            key = (interaction.method, interaction.path)
+            self.interactions.setdefault(key, []).append(interaction)
+
+        self.states = set(states)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.stats = Counter()
+
+        self._random = random.Random(seed)
+        self._server = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_exc_info):
+        await self.close()
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0):
+        """Start listening on the host and port."""
+        self._server = await asyncio.start_server(self._serve, host, port)
+
+    async def close(self):
+        """Stop listening and close the server."""
+        self._server.close()
+        await self._server.wait_closed()
+
+    @property
+    def base_url(self) -> str:
+        """Get the base URL of the provider."""
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f'http://{host}:{port}'
+
+    def match(self, method: str, target: str) -> Optional[Interaction]:
+        """Find the interaction matching the request in the active states.
+
+        >>> provider = Provider(states=['there are no products'])
+        >>> provider.match('GET', '/v2/products').state
+        'there are no products'
+        >>> provider.match('GET', '/v2/products?cid=2') is None
+        True
+        """
+        url = urlsplit(target)
+        query = parse_query(url.query)
+
+        for interaction in self.interactions.get((method, url.path), ()):
+            if interaction.query != query:
+                continue
+            if self.states and interaction.state not in self.states:
+                continue
+            return interaction
+
+        return None
+
+    async def respond(self, method: str, target: str) -> bytes:
+        """Get the encoded response to the request."""
+        self.stats['requests'] += 1
+
+        delay = self.latency + self.jitter * self._random.random()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.stats['errors'] += 1
+            return error_response(self.error_status, 'Injected error')
+
+        interaction = self.match(method, target)
+        if interaction is None:
+            self.stats['unmatched'] += 1
+            return error_response(500, f'No interaction for {method} {target}')
+
+        self.stats['matched'] += 1
+        return interaction.response
+
+    async def _serve(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter):
+        """Serve requests of the keep-alive connection."""
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                method, target, headers = self._parse_head(head)
+
+                # Request bodies are not matched, but should be consumed
+                length = int(headers.get('content-length', 0))
+                if length:
+                    await reader.readexactly(length)
+
+                writer.write(await self.respond(method, target))
+                await writer.drain()
+
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _parse_head(head: bytes) -> tuple[str, str, dict]:
+        """Parse the request line and headers.
+
+        >>> Provider._parse_head(b'GET / HTTP/1.1\\r\\nHost: a\\r\\n\\r\\n')
+        ('GET', '/', {'host': 'a'})
+        """
+        request_line, *lines = head.decode('latin-1').split('\r\n')
+        method, target, _version = request_line.split(' ', 2)
+
+        headers = {}
+        for line in lines:
+            if line:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+        return method.upper(), target, headers
+
+
+async def serve(provider: Provider, host: str, port: int):
+    """Run the provider until cancelled."""
+    await provider.start(host, port)
+    print(f'Serving {sum(map(len, provider.interactions.values()))} '
+          f'interactions on {provider.base_url}')
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await provider.close()
+
+
+def main():
+    """Parse command line arguments and run the provider."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=1234)
+    parser.add_argument('--pact-dir', default=PACT_DIR,
+                        help='directory of the JSON pact files')
+    parser.add_argument('--state', action='append', default=[],
+                        help='active provider state, can be repeated')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='delay of every response in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='maximum random delay added to the latency')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='probability of responding with an error')
+    parser.add_argument('--error-status', type=int, default=503,
+                        help='status code of injected errors')
+    args = parser.parse_args()
+
+    provider = Provider(
+        load_interactions(args.pact_dir),
+        states=args.state,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+    )
+
+    try:
+        asyncio.run(serve(provider, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Unit test for asyncio Product service client."""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from consumer import exceptions
+from consumer.aio import AsyncClient, ENCODINGS
+from consumer.client import default_headers
+from consumer.compression import Compression
+from consumer.models import Product
+from consumer.session import create_retry
+
+
+def create_client(handler, **options) -> AsyncClient:
+    """Create an asyncio client dispatching requests to the handler."""
+    session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return AsyncClient(session=session, **options)
+
+
+def test_default_headers():
+    def handler(request: httpx.Request):
+        requests.append(request)
+        return httpx.Response(200, json={})
+
+    async def main():
+        async with create_client(handler) as client:
+            client.headers['key'] = 'value'
+            await client.post('/v2/products', {})
+
+    requests = []
+    asyncio.run(main())
+    headers = requests[0].headers
+
+    assert headers['key'] == 'value'
+    assert headers['User-Agent'] == default_headers()['user-agent']
+    assert headers['Accept'] == 'application/json'
+    assert headers['Content-Type'] == 'application/json; charset=utf-8'
+
+
+def test_accept_encoding(product_data):
+    def handler(request: httpx.Request):
+        requests.append(request)
+        return httpx.Response(200, json=product_data)
+
+    async def main():
+        async with create_client(handler, compression=Compression(
+                accept=['zstd', 'br', 'gzip', 'unknown'])) as client:
+            await client.products.get(1)
+
+    requests = []
+    asyncio.run(main())
+
+    # Only the encodings httpx decodes are offered
+    offered = requests[0].headers['Accept-Encoding'].split(', ')
+    assert set(offered) == {'zstd', 'br', 'gzip'} & ENCODINGS
+
+
+def test_query_options(product_data):
+    def handler(request: httpx.Request):
+        requests.append(request)
+        return httpx.Response(200, json=[product_data])
+
+    async def main():
+        async with create_client(handler) as client:
+            return await client.products.all(cid=2, page=3, foo='bar')
+
+    requests = []
+    rv = asyncio.run(main())
+
+    assert requests[0].url.path == '/v2/products'
+    assert dict(requests[0].url.params) == {
+        'cid': '2',
+        'page': '3',
+        'foo': 'bar',
+    }
+    assert 'Content-Type' not in requests[0].headers
+    assert isinstance(rv[0], Product)
+
+
+def test_concurrent_get(product_data):
+    def handler(request: httpx.Request):
+        product_id = int(request.url.path.rsplit('/', 1)[-1])
+        return httpx.Response(200, json=dict(product_data, id=product_id))
+
+    async def main():
+        async with create_client(handler) as client:
+            return await asyncio.gather(*(
+                client.products.get(i) for i in range(1, 51)
+            ))
+
+    rv = asyncio.run(main())
+
+    assert [p.id for p in rv] == list(range(1, 51))
+
+
+def test_create_product(product_data):
+    def handler(request: httpx.Request):
+        requests.append(request)
+        return httpx.Response(201, json=product_data)
+
+    async def main():
+        async with create_client(handler) as client:
+            return await client.products.create(name='test', price=1.5)
+
+    requests = []
+    rv = asyncio.run(main())
+
+    assert requests[0].method == 'POST'
+    assert json.loads(requests[0].content) == {'name': 'test', 'price': 1.5}
+    assert rv.id == product_data['id']
+
+
+@pytest.mark.parametrize('status,error', [
+    (404, exceptions.NotFoundError),
+    (422, exceptions.UnprocessableEntity),
+    (428, exceptions.PreconditionRequired),
+    (501, exceptions.InternalServerError),
+])
+def test_status_mapping(status, error):
+    def handler(_request: httpx.Request):
+        return httpx.Response(status, json={'code': status})
+
+    async def main():
+        async with create_client(handler) as client:
+            await client.products.delete(7777)
+
+    with pytest.raises(error):
+        asyncio.run(main())
+
+
+def test_retries_exhausted(monkeypatch):
+    def handler(_request: httpx.Request):
+        calls.append(1)
+        return httpx.Response(503, json={'code': 503})
+
+    async def sleep(_delay):
+        pass
+
+    async def main():
+        async with create_client(handler, max_retries=2) as client:
+            await client.get('/v2/products/1')
+
+    calls = []
+    monkeypatch.setattr(asyncio, 'sleep', sleep)
+
+    with pytest.raises(exceptions.RetryApiError) as exc_info:
+        asyncio.run(main())
+
+    assert exc_info.value.code == 503
+    assert len(calls) == 3
+
+
+def test_retry_after_exceeds_retry_time(monkeypatch):
+    def handler(_request: httpx.Request):
+        calls.append(1)
+        return httpx.Response(429, headers={'Retry-After': '3600'},
+                              json={'code': 429})
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    async def main():
+        async with create_client(handler) as client:
+            client.retry = create_retry(max_retry_time=60.0)
+            await client.get('/v2/products/1')
+
+    calls = []
+    delays = []
+    monkeypatch.setattr(asyncio, 'sleep', sleep)
+
+    with pytest.raises(exceptions.RetryApiError) as exc_info:
+        asyncio.run(main())
+
+    assert exc_info.value.code == 429
+    assert len(calls) == 1
+    assert not delays
+
+
+def test_sleep_within_retry_time(monkeypatch):
+    def handler(_request: httpx.Request):
+        calls.append(1)
+        if len(calls) == 1:
+            return httpx.Response(503, headers={'Retry-After': '10'})
+        return httpx.Response(200, json={})
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    async def main():
+        async with create_client(handler) as client:
+            client.retry = create_retry(backoff_max=5.0, max_retry_time=60.0)
+            await client.get('/v2/products/1')
+
+    calls = []
+    delays = []
+    monkeypatch.setattr(asyncio, 'sleep', sleep)
+    asyncio.run(main())
+
+    assert len(calls) == 2
+    assert 10.0 <= delays[0] <= 15.0
+
+
+def test_connection_error():
+    def handler(request: httpx.Request):
+        raise httpx.ConnectError('Connection refused', request=request)
+
+    async def main():
+        async with create_client(handler) as client:
+            await client.get('/v2/products/1')
+
+    with pytest.raises(exceptions.InternalServerError) as exc_info:
+        asyncio.run(main())
+
+    assert exc_info.value.code == 500
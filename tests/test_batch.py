@@ -0,0 +1,122 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Unit test for columnar product batches."""
+
+import dataclasses
+import json
+from datetime import datetime
+from unittest import mock
+
+import pytest
+import responses
+from responses import GET
+
+from consumer.batch import ProductBatch
+from consumer.cache import ResponseCache
+from consumer.client import Client
+from consumer.loaders import get_loader
+from consumer.schemas import ProductSchema
+
+
+@pytest.fixture
+def products(product_data) -> list:
+    """Get a list of products with various prices and ratings."""
+    load = get_loader(ProductSchema)
+    return [
+        load(dict(
+            product_data,
+            id=1,
+            price=100.0,
+            discount=0.5,
+            rating=3.5,
+            created_at='2023-03-11T21:56:41.123456+05:30',
+        )),
+        load(dict(product_data, id=2, price=10.0, discount=0.0, rating=5.0)),
+        load(dict(product_data, id=3, price=50.0, discount=0.1, rating=4.0)),
+    ]
+
+
+def test_lazy_views(products):
+    batch = ProductBatch.from_products(products)
+
+    assert len(batch) == 3
+    assert list(batch) == products
+    assert batch[-1] == products[-1]
+    assert batch[0].created_at.tzinfo == products[0].created_at.tzinfo
+    assert batch.column('stock').typecode == 'q'
+
+
+def test_naive_timestamps(products):
+    naive = datetime(2023, 3, 11, 21, 56, 41, 123456)
+    product = dataclasses.replace(products[0], created_at=naive)
+
+    batch = ProductBatch.from_products([product])
+
+    assert batch[0].created_at == naive
+    assert batch[0].created_at.tzinfo is None
+
+
+def test_effective_prices(products):
+    batch = ProductBatch.from_products(products)
+
+    assert list(batch.effective_prices()) == pytest.approx([50.0, 10.0, 45.0])
+
+
+def test_filter_and_top_rated(products):
+    batch = ProductBatch.from_products(products)
+
+    cheap = batch.filter(p < 48.0 for p in batch.effective_prices())
+    assert list(cheap.column('id')) == [2, 3]
+    assert cheap[1] == products[2]
+
+    top = batch.top_rated(2)
+    assert list(top.column('id')) == [2, 3]
+    assert [p.name for p in top] == [products[1].name, products[2].name]
+
+
+@responses.activate
+def test_products_batch(client, product_data):
+    responses.add(
+        GET,
+        f'{client.base_url}/v2/products',
+        json=[dict(product_data, id=i) for i in range(1, 4)],
+        headers={'X-Pagination': json.dumps({'total_pages': 1})},
+    )
+
+    batch = client.products.all(batch=True)
+    pages = list(client.products.iter_batches())
+
+    assert isinstance(batch, ProductBatch)
+    assert list(batch.column('id')) == [1, 2, 3]
+    assert len(pages) == 1
+    assert list(pages[0]) == list(batch)
+    assert 'batch' not in responses.calls[0].request.url
+
+
+@pytest.mark.parametrize('deserializer', ['schema', 'compiled', 'lazy'])
+@responses.activate
+def test_cached_products_batch(product_data, deserializer):
+    url = 'http://localhost/v2/products'
+    responses.add(GET, url, json=[dict(product_data, id=i) for i in (1, 2)],
+                  headers={'ETag': '"1"'})
+    responses.add(GET, url, status=304)
+
+    client = Client(cache=ResponseCache(), deserializer=deserializer)
+    products = client.products.all()
+
+    # Rows are loaded into columns without creating products
+    with mock.patch.object(ProductSchema, 'make') as make:
+        batch = client.products.all(batch=True)
+        make.assert_not_called()
+    assert isinstance(batch, ProductBatch)
+    assert list(batch) == products
+
+    # The batch loaded from the cached response is reused
+    with mock.patch.object(ProductBatch, 'append_row') as append_row:
+        assert list(client.products.all(batch=True)) == products
+        append_row.assert_not_called()
@@ -0,0 +1,149 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Unit test for the circuit breaker."""
+
+import time
+
+import pytest
+import responses
+from responses import GET
+
+from consumer import exceptions
+from consumer.breaker import CircuitBreaker
+from consumer.client import Client
+from consumer.session import factory
+
+URL = 'http://localhost/v2/products'
+
+
+def fail(breaker, url=f'{URL}/1', error=exceptions.InternalServerError):
+    """Record a failed request to the URL."""
+    with pytest.raises(error):
+        with breaker.guard(url):
+            raise error()
+
+
+def test_opens_on_failure_rate():
+    breaker = CircuitBreaker(failure_threshold=0.5, window=4, min_calls=4)
+
+    with breaker.guard(f'{URL}/1'):
+        pass
+    fail(breaker)
+    with breaker.guard(f'{URL}/2'):
+        pass
+    assert breaker.state(URL + '/1') == 'closed'
+
+    fail(breaker)
+    assert breaker.state(URL + '/1') == 'open'
+
+    # Other endpoints are not affected
+    assert breaker.state(URL) == 'closed'
+
+
+@responses.activate
+def test_client_errors_are_not_failures():
+    responses.add(GET, f'{URL}/1', status=404, json={'code': 404})
+
+    breaker = CircuitBreaker(min_calls=1)
+    with pytest.raises(exceptions.NotFoundError):
+        Client(circuit_breaker=breaker).products.get(1)
+
+    assert breaker.stats()['/v2/products/{id}'] == {
+        'state': 'closed',
+        'calls': 1,
+        'failures': 0,
+        'rejected': 0,
+    }
+
+
+def test_open_circuit_fails_fast():
+    breaker = CircuitBreaker(min_calls=1, reset_timeout=60.0)
+    fail(breaker)
+
+    started = time.perf_counter()
+    with pytest.raises(exceptions.CircuitOpenError) as exc_info:
+        with breaker.guard(f'{URL}/2'):
+            pytest.fail('The request should not be sent')
+
+    assert time.perf_counter() - started < 0.01
+    assert exc_info.value.endpoint == '/v2/products/{id}'
+    assert 59.0 < exc_info.value.retry_after <= 60.0
+    assert breaker.stats()['/v2/products/{id}']['rejected'] == 1
+
+
+def test_half_open_probe_closes():
+    breaker = CircuitBreaker(min_calls=1, reset_timeout=0.05)
+    fail(breaker)
+    time.sleep(0.06)
+
+    with breaker.guard(f'{URL}/1'):
+        assert breaker.state(URL + '/1') == 'half-open'
+
+        # Other requests are rejected while the probe is in flight
+        with pytest.raises(exceptions.CircuitOpenError):
+            with breaker.guard(f'{URL}/2'):
+                pass
+
+    assert breaker.state(URL + '/1') == 'closed'
+    assert breaker.stats()['/v2/products/{id}']['calls'] == 0
+
+
+def test_half_open_probe_not_sent():
+    breaker = CircuitBreaker(min_calls=1, reset_timeout=0.05)
+    fail(breaker)
+    time.sleep(0.06)
+
+    # The probe rejected before it is sent tells nothing about recovery
+    fail(breaker, error=exceptions.RateLimitExceeded)
+    assert breaker.state(URL + '/1') == 'half-open'
+
+    fail(breaker)
+    assert breaker.state(URL + '/1') == 'open'
+
+
+def test_half_open_probe_reopens():
+    breaker = CircuitBreaker(min_calls=1, reset_timeout=0.05)
+    fail(breaker)
+    time.sleep(0.06)
+
+    fail(breaker)
+    assert breaker.state(URL + '/1') == 'open'
+
+
+@responses.activate
+def test_client_outage():
+    responses.add(GET, f'{URL}/1', status=500, json={'code': 500})
+
+    breaker = CircuitBreaker(window=4, min_calls=4, reset_timeout=60.0)
+    client = Client(
+        session=factory(max_retries=0),
+        circuit_breaker=breaker,
+    )
+
+    for _ in range(4):
+        with pytest.raises(exceptions.RetryApiError):
+            client.products.get(1)
+
+    with pytest.raises(exceptions.CircuitOpenError):
+        client.products.get(2)
+
+    assert len(responses.calls) == 4
+    assert breaker.stats()['/v2/products/{id}']['state'] == 'open'
+
+
+def test_get_many_error_policies():
+    breaker = CircuitBreaker(min_calls=1, reset_timeout=60.0)
+    fail(breaker)
+
+    client = Client(circuit_breaker=breaker)
+    rv = client.products.get_many([1, 2], errors='return')
+
+    assert all(isinstance(e, exceptions.CircuitOpenError) for e in rv)
+    assert client.products.get_many([1, 2], errors='skip') == []
+    with pytest.raises(exceptions.ApiError):
+        client.products.get_many([1, 2])
@@ -0,0 +1,447 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Unit test for conditional request cache."""
+
+import json
+import sqlite3
+import time
+from unittest import mock
+
+import pytest
+import responses
+from requests.exceptions import ConnectionError
+from requests.models import Response
+from responses import GET
+
+from consumer import exceptions
+from consumer.cache import (
+    CacheEntry,
+    PersistentCache,
+    ResponseCache,
+    stored_response,
+)
+from consumer.client import Client
+from consumer.schemas import ProductSchema
+
+ETAG = '"abee653e458eb31e7d21ebff89f79232b482c885"'
+LAST_MODIFIED = 'Mon, 12 Feb 2022 11:36:28 GMT'
+
+
+@pytest.fixture
+def cached_client(mock_opts) -> Client:
+    """Create an HTTP client with conditional request cache."""
+    return Client(
+        base_url=f"http://{mock_opts['host_name']}:{mock_opts['port']}",
+        cache=ResponseCache(maxsize=2),
+    )
+
+
+@responses.activate
+def test_not_modified_product(cached_client, product_data):
+    url = f"{cached_client.options['base_url']}/v2/products/1"
+    responses.add(GET, url, json=product_data, headers={
+        'ETag': ETAG,
+        'Last-Modified': LAST_MODIFIED,
+    })
+    responses.add(GET, url, status=304)
+
+    product = cached_client.products.get(1)
+
+    with mock.patch.object(ProductSchema, 'load') as load:
+        assert cached_client.products.get(1) is product
+        load.assert_not_called()
+
+    headers = responses.calls[1].request.headers
+    assert 'If-None-Match' not in responses.calls[0].request.headers
+    assert headers['If-None-Match'] == ETAG
+    assert headers['If-Modified-Since'] == LAST_MODIFIED
+    assert cached_client.cache.stats() == {
+        'size': 1,
+        'maxsize': 2,
+        'hits': 1,
+        'misses': 1,
+        'revalidations': 1,
+        'fresh': 0,
+        'stale': 0,
+        'refresh_errors': 0,
+    }
+
+
+@responses.activate
+def test_modified_products(cached_client, product_data):
+    url = f"{cached_client.options['base_url']}/v2/products"
+    responses.add(GET, url, json=[product_data], headers={'ETag': ETAG})
+    responses.add(GET, url, json=[product_data, product_data], headers={
+        'ETag': '"changed"',
+    })
+    responses.add(GET, url, status=304)
+
+    assert len(cached_client.products.all(cid=2)) == 1
+    assert len(cached_client.products.all(cid=2)) == 2
+    assert len(cached_client.products.all(cid=2)) == 2
+
+    assert responses.calls[1].request.headers['If-None-Match'] == ETAG
+    assert responses.calls[2].request.headers['If-None-Match'] == '"changed"'
+    assert cached_client.cache.stats()['hits'] == 1
+    assert cached_client.cache.stats()['misses'] == 2
+
+
+@responses.activate
+def test_lru_eviction(cached_client, product_data):
+    base_url = cached_client.options['base_url']
+    for product_id in (1, 2, 3):
+        responses.add(
+            GET,
+            f'{base_url}/v2/products/{product_id}',
+            json=dict(product_data, id=product_id),
+            headers={'ETag': ETAG},
+        )
+
+    for product_id in (1, 2, 1, 3):
+        cached_client.products.get(product_id)
+
+    cache = cached_client.cache
+    assert len(cache) == 2
+    assert cache.get(cache.key(f'{base_url}/v2/products/1')) is not None
+    assert cache.get(cache.key(f'{base_url}/v2/products/2')) is None
+
+
+@responses.activate
+def test_evicted_during_revalidation(product_data):
+    cache = ResponseCache(maxsize=1)
+    client = Client(cache=cache)
+    url = 'http://localhost/v2/products'
+
+    def not_modified(_request):
+        # Another response evicts the revalidated one in the meantime
+        cache.set(cache.key(f'{url}/2'), CacheEntry(Response(), ETAG))
+        return 304, {}, ''
+
+    responses.add(GET, f'{url}/1', json=product_data, headers={'ETag': ETAG})
+    responses.add_callback(GET, f'{url}/1', callback=not_modified)
+
+    assert client.products.get(1).id == product_data['id']
+    assert client.products.get(1).id == product_data['id']
+    assert cache.stats()['hits'] == 1
+
+
+@responses.activate
+def test_provided_validators(cached_client, product_data):
+    url = f"{cached_client.options['base_url']}/v2/products/1"
+    responses.add(GET, url, json=product_data, headers={'ETag': ETAG})
+    responses.add(GET, url, status=304)
+
+    def get(etag):
+        return cached_client.get('/v2/products/1', headers={
+            'if-none-match': etag,
+        })
+
+    # Not Modified is passed through unless the cached response matches
+    assert get('"other"').status_code == 200
+    assert get('"other"').status_code == 304
+    assert get(ETAG).json() == product_data
+    assert get('"other"').status_code == 304
+
+    assert len(responses.calls) == 4
+    assert cached_client.cache.stats()['hits'] == 1
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        ResponseCache(maxsize=0)
+
+
+@responses.activate
+def test_persistent_warm_start(tmp_path, product_data):
+    url = 'http://localhost/v2/products'
+    responses.add(GET, url, json=[product_data], headers={
+        'ETag': ETAG,
+        'X-Pagination': '{"total_pages": 1}',
+    })
+    responses.add(GET, url, status=304)
+
+    path = str(tmp_path / 'cache.db')
+    Client(cache=PersistentCache(path)).products.all(cid=2)
+
+    # Restarted process revalidates the stored response
+    cache = PersistentCache(path)
+    products = Client(cache=cache).products.all(cid=2)
+
+    assert len(products) == 1
+    assert responses.calls[1].request.headers['If-None-Match'] == ETAG
+    assert len(responses.calls) == 2
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['loaded'] == 1
+    assert stats['stored'] == 1
+
+    response = cache.get(f'{url}?cid=2').response
+    assert response.headers['X-Pagination'] == '{"total_pages": 1}'
+
+
+@responses.activate
+def test_persistent_size_limit(tmp_path, product_data):
+    for product_id in range(1, 5):
+        responses.add(
+            GET,
+            f'http://localhost/v2/products/{product_id}',
+            json=dict(product_data, id=product_id),
+            headers={'ETag': f'"{product_id}"'},
+        )
+
+    size = len(json.dumps(dict(product_data, id=1)))
+    cache = PersistentCache(str(tmp_path / 'cache.db'), max_bytes=size * 2)
+    client = Client(cache=cache)
+    for product_id in range(1, 5):
+        client.products.get(product_id)
+
+    stats = cache.stats()
+    assert stats['stored'] == 2
+    assert stats['stored_bytes'] <= size * 2
+    assert stats['evicted'] == 2
+
+    # The least recently used entries are evicted
+    assert client.cached_etag('/v2/products/4') == '"4"'
+    cache.clear()
+    assert PersistentCache(cache.path).stats()['stored'] == 0
+
+
+@responses.activate
+def test_fresh_response(product_data):
+    url = 'http://localhost/v2/products/1'
+    responses.add(GET, url, json=product_data, headers={'ETag': ETAG})
+
+    cache = ResponseCache(max_age=60.0)
+    client = Client(cache=cache)
+
+    product = client.products.get(1)
+    assert client.products.get(1) is product
+
+    assert len(responses.calls) == 1
+    assert cache.stats()['fresh'] == 1
+
+
+@responses.activate
+def test_stale_while_revalidate(product_data):
+    url = 'http://localhost/v2/products/1'
+
+    def not_modified(_request):
+        time.sleep(0.05)
+        return 304, {}, ''
+
+    responses.add(GET, url, json=product_data, headers={'ETag': ETAG})
+    responses.add_callback(GET, url, callback=not_modified)
+
+    cache = ResponseCache(stale_while_revalidate=60.0)
+    client = Client(cache=cache)
+    product = client.products.get(1)
+
+    # Stale product is served at once, revalidated once in the background
+    with mock.patch.object(ProductSchema, 'load') as load:
+        for _ in range(3):
+            assert client.products.get(1) is product
+        load.assert_not_called()
+
+    deadline = time.monotonic() + 1.0
+    while cache.stats()['hits'] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert len(responses.calls) == 2
+    assert responses.calls[1].request.headers['If-None-Match'] == ETAG
+
+    stats = cache.stats()
+    assert stats['stale'] == 3
+    assert stats['hits'] == 1
+
+    # Revalidated response is fresh again within the max age
+    cache.max_age = 60.0
+    assert client.products.get(1) is product
+    assert cache.stats()['fresh'] == 1
+
+
+@pytest.mark.parametrize('failure', [
+    {'body': ConnectionError()},
+    {'status': 501, 'json': {'code': 501}},
+])
+@responses.activate
+def test_failed_revalidation(product_data, caplog, failure):
+    url = 'http://localhost/v2/products/1'
+    responses.add(GET, url, json=product_data, headers={'ETag': ETAG})
+    responses.add(GET, url, **failure)
+
+    cache = ResponseCache(stale_while_revalidate=60.0)
+    client = Client(cache=cache)
+    product = client.products.get(1)
+
+    assert client.products.get(1) is product
+
+    deadline = time.monotonic() + 1.0
+    while cache.stats()['refresh_errors'] == 0 and (
+            time.monotonic() < deadline):
+        time.sleep(0.01)
+
+    assert cache.stats()['refresh_errors'] == 1
+    assert f'Revalidation of {url} failed' in caplog.text
+
+    # Stale response is served until it is revalidated
+    assert client.products.get(1) is product
+    cache.close()
+
+
+@responses.activate
+def test_close(tmp_path, product_data):
+    url = 'http://localhost/v2/products/1'
+    responses.add(GET, url, json=product_data, headers={'ETag': ETAG})
+    responses.add(GET, url, status=304)
+
+    cache = PersistentCache(
+        str(tmp_path / 'cache.db'),
+        stale_while_revalidate=60.0,
+    )
+    client = Client(cache=cache)
+    client.products.get(1)
+    connection = cache._connect()  # pylint: disable=protected-access
+
+    cache.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        connection.execute('SELECT 1')
+
+    # Closed cache revalidates stale responses before serving them
+    client.products.get(1)
+    assert len(responses.calls) == 2
+    assert cache.stats()['stale'] == 0
+    cache.close()
+
+
+@responses.activate
+def test_stale_window_expired(product_data):
+    url = 'http://localhost/v2/products/1'
+    responses.add(GET, url, json=product_data, headers={'ETag': ETAG})
+    responses.add(GET, url, status=304)
+
+    cache = ResponseCache(stale_while_revalidate=0.01)
+    client = Client(cache=cache)
+
+    client.products.get(1)
+    time.sleep(0.02)
+    client.products.get(1)
+
+    # Expired response is revalidated before it is served
+    assert len(responses.calls) == 2
+    assert cache.stats()['stale'] == 0
+
+
+@responses.activate
+def test_unsafe_requests_invalidate(product_data):
+    url = 'http://localhost/v2/products'
+    responses.add(GET, f'{url}/1', json=product_data, headers={'ETag': ETAG})
+    responses.add(GET, url, json=[product_data], headers={'ETag': ETAG})
+    responses.add(responses.DELETE, f'{url}/1', status=204)
+
+    cache = ResponseCache(max_age=60.0, stale_while_revalidate=60.0)
+    client = Client(cache=cache)
+
+    client.products.get(1)
+    client.products.all(cid=2)
+    assert len(cache) == 2
+
+    assert client.products.delete(1)
+    assert len(cache) == 0
+
+    client.products.get(1)
+    client.products.all(cid=2)
+    assert len(responses.calls) == 5
+
+
+@responses.activate
+def test_failed_unsafe_request_keeps_cache(product_data):
+    url = 'http://localhost/v2/products/1'
+    responses.add(GET, url, json=product_data, headers={'ETag': ETAG})
+    responses.add(responses.DELETE, url, status=412, json={'code': 412})
+
+    client = Client(cache=ResponseCache(max_age=60.0))
+    client.products.get(1)
+
+    with pytest.raises(exceptions.PreconditionFailed):
+        client.products.delete(1, headers={'If-Match': '"other"'})
+    assert client.cached_etag('/v2/products/1') == ETAG
+
+
+@responses.activate
+def test_persistent_invalidate(tmp_path, product_data):
+    url = 'http://localhost/v2/products'
+    responses.add(GET, url, json=[product_data], headers={'ETag': ETAG})
+    responses.add(responses.POST, url, status=201, json=product_data)
+
+    path = str(tmp_path / 'cache.db')
+    client = Client(cache=PersistentCache(path))
+    client.products.all(cid=2)
+    client.products.create(name='Product')
+
+    assert PersistentCache(path).stats()['stored'] == 0
+
+
+@responses.activate
+def test_persistent_access_time(tmp_path, product_data):
+    url = 'http://localhost/v2/products/1'
+    responses.add(GET, url, json=product_data, headers={'ETag': ETAG})
+
+    path = str(tmp_path / 'cache.db')
+    Client(cache=PersistentCache(path)).products.get(1)
+
+    def accessed():
+        with sqlite3.connect(path) as connection:
+            return connection.execute(
+                'SELECT accessed FROM responses').fetchone()[0]
+
+    stored = accessed()
+
+    # Reads within the interval do not write to the database
+    PersistentCache(path).get(ResponseCache.key(url))
+    assert accessed() == stored
+
+    PersistentCache(path, touch_interval=0.0).get(ResponseCache.key(url))
+    assert accessed() > stored
+
+
+@responses.activate
+def test_persistent_stored_bytes(tmp_path, product_data):
+    url = 'http://localhost/v2/products/1'
+    responses.add(GET, url, json=product_data, headers={'ETag': ETAG})
+    responses.add(GET, url, json=dict(product_data, name='x' * 100),
+                  headers={'ETag': '"changed"'})
+
+    path = str(tmp_path / 'cache.db')
+    cache = PersistentCache(path)
+    client = Client(cache=cache)
+
+    def stored_bytes():
+        with sqlite3.connect(path) as connection:
+            return connection.execute(
+                'SELECT SUM(size) FROM responses').fetchone()[0]
+
+    client.products.get(1)
+    client.products.get(1)
+
+    # Replaced responses are accounted without scanning the table
+    assert cache.stats()['stored'] == 1
+    assert cache.stats()['stored_bytes'] == stored_bytes()
+
+    cache.invalidate(url)
+    assert cache.stats()['stored_bytes'] == 0
+
+
+def test_persistent_load_uncached(tmp_path):
+    cache = PersistentCache(str(tmp_path / 'cache.db'))
+    response = stored_response('http://localhost/v2/products', {}, b'[]')
+
+    # Loaded responses not cached in memory are not looked up in the database
+    with mock.patch.object(cache, '_read') as read:
+        assert cache.load(response, list) == []
+        read.assert_not_called()
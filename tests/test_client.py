@@ -7,9 +7,13 @@
 
 """Unit test for Product service client."""
 
+import subprocess
+import sys
+
 import responses
-from responses import POST
+from responses import GET, matchers, POST
 
+from consumer import exceptions
 from consumer.client import Client, default_headers
 
 
@@ -60,6 +64,26 @@ def test_overriding_headers(client):
     assert headers['key2'] == 'value2'
 
 
+@responses.activate
+def test_get_options(client):
+    client.options['foo'] = 'bar'
+    url = f'{client.base_url}/v2/products'
+
+    responses.add(GET, url, status=200, body='[]', match=[
+        matchers.query_param_matcher({
+            'cid': '2', 'foo': 'baz', 'active': 'true',
+        }),
+    ])
+
+    client.get('/v2/products', {'foo': 'baz', 'active': True}, cid=2,
+               headers={'X-Trace': '1'})
+    headers = responses.calls[0].request.headers
+
+    assert headers['X-Trace'] == '1'
+    assert headers['Accept'] == 'application/json'
+    assert 'Content-Type' not in headers
+
+
 def test_custom_options():
     client = Client()
     assert client.options == {
@@ -79,3 +103,40 @@ def test_custom_options():
         'timeout': 5.0,
         'version': 'v2',
     }
+
+
+def test_lazy_imports():
+    script = (
+        'import sys\n'
+        'from consumer.client import Client\n'
+        'client = Client()\n'
+        'print(sorted(m for m in ("marshmallow", "consumer.schemas", '
+        '"consumer.resources") if m in sys.modules))\n'
+        'client.products\n'
+        'print("consumer.schemas" in sys.modules)\n'
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', script],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+
+    assert output.splitlines() == ['[]', 'True']
+
+
+def test_lazy_session():
+    client = Client()
+    assert client._session is None  # pylint: disable=protected-access
+
+    session = client.session
+    assert session is client.session
+    assert session.adapters['http://'].max_retries.total == 3
+
+
+def test_statuses():
+    client = Client()
+
+    assert client.statuses is exceptions.STATUSES
+    assert client.statuses[404] is exceptions.NotFoundError
+    assert client.statuses[422] is exceptions.UnprocessableEntity
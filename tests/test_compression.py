@@ -0,0 +1,111 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Unit test for compression of request and response bodies."""
+
+import gzip
+import json
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from consumer.client import Client
+from consumer.compression import Compression
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Handler serving gzip compressed products on demand."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    product = {}
+    received = []
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.respond(200, [self.product] * 50)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+
+        self.received.append((self.headers.get('Content-Encoding'), body))
+        self.respond(201, dict(self.product, **json.loads(body)))
+
+    def respond(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def base_url(http_server, product_data):
+    """Run local HTTP server and get its base URL."""
+    Handler.product = product_data
+    Handler.received = []
+    return http_server(Handler)
+
+
+def test_compressed_responses(base_url):
+    compression = Compression()
+    client = Client(base_url=base_url, compression=compression)
+
+    assert len(client.products.all()) == 50
+    assert len(list(client.products.stream_all(chunk_size=64))) == 50
+
+    # Streamed response is not accounted
+    stats = compression.stats()['responses']
+    assert stats['count'] == 1
+    assert stats['ratio'] > 5.0
+
+
+def test_compressed_request_body(base_url):
+    compression = Compression(encoding='gzip', threshold=256)
+    client = Client(base_url=base_url, compression=compression)
+
+    client.products.create(name='x' * 1000)
+    client.products.create(name='small')
+
+    assert [encoding for encoding, _ in Handler.received] == ['gzip', None]
+    assert json.loads(Handler.received[0][1])['name'] == 'x' * 1000
+
+    stats = compression.stats()['requests']
+    assert stats['count'] == 1
+    assert stats['ratio'] > 10.0
+    assert stats['time'] > 0.0
+
+
+def test_request_body_not_compressed_by_default(base_url):
+    client = Client(base_url=base_url, compression=Compression())
+    client.products.create(name='x' * 2000)
+
+    assert [encoding for encoding, _ in Handler.received] == [None]
+    assert client.compression.stats()['requests']['count'] == 0
+
+
+def test_accept_encoding_override(base_url):
+    client = Client(base_url=base_url, compression=Compression())
+    response = client.get('/v2/products', headers={
+        'accept-encoding': 'identity',
+    })
+
+    assert 'Content-Encoding' not in response.headers
+    assert client.compression.stats()['responses']['count'] == 0
+
+
+def test_unsupported_encoding():
+    with pytest.raises(ValueError):
+        Compression(encoding='unknown')
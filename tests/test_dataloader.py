@@ -0,0 +1,121 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Unit test for micro-batching of product lookups."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import responses
+from responses import GET, matchers
+
+from consumer import exceptions
+from consumer.client import Client
+from consumer.dataloader import Batching, DataLoader
+
+URL = 'http://localhost/v2/products'
+
+
+def load_concurrently(load, keys):
+    """Call the load function with every key at once."""
+    with ThreadPoolExecutor(max_workers=len(keys)) as executor:
+        futures = [executor.submit(load, key) for key in keys]
+    return futures
+
+
+def test_concurrent_loads_are_batched():
+    batches = []
+
+    def batch_fn(keys):
+        batches.append(sorted(keys))
+        return {key: key * 2 for key in keys}
+
+    loader = DataLoader(batch_fn, window=0.1, max_size=10)
+    futures = load_concurrently(loader.load, [1, 2, 3, 2])
+
+    assert [future.result() for future in futures] == [2, 4, 6, 4]
+    assert batches == [[1, 2, 3]]
+    assert loader.stats() == {'loads': 4, 'batches': 1}
+
+
+def test_max_size():
+    batches = []
+
+    def batch_fn(keys):
+        batches.append(len(keys))
+        return {key: key for key in keys}
+
+    loader = DataLoader(batch_fn, window=1.0, max_size=2)
+    futures = load_concurrently(loader.load, [1, 2, 3, 4])
+
+    assert [future.result() for future in futures] == [1, 2, 3, 4]
+    assert batches == [2, 2]
+
+
+def test_errors():
+    def batch_fn(keys):
+        if 0 in keys:
+            raise RuntimeError('Batch failed')
+        return {key: KeyError(key) if key > 5 else key for key in keys}
+
+    loader = DataLoader(batch_fn, window=0.05)
+
+    futures = load_concurrently(loader.load, [1, 6])
+    assert futures[0].result() == 1
+    assert isinstance(futures[1].exception(), KeyError)
+
+    futures = load_concurrently(loader.load, [0, 1])
+    for future in futures:
+        assert isinstance(future.exception(), RuntimeError)
+
+
+@responses.activate
+def test_products_get_many(product_data):
+    responses.add(
+        GET,
+        URL,
+        match=[matchers.query_param_matcher({'q': 'id:1,2,3'})],
+        json=[dict(product_data, id=i) for i in (3, 1)],
+    )
+    responses.add(GET, f'{URL}/2', status=404, json={'code': 404})
+
+    client = Client(batching=Batching(window=0.1))
+    rv = client.products.get_many([1, 2, 3], errors='return')
+
+    assert len(responses.calls) == 2
+    assert [rv[0].id, rv[2].id] == [1, 3]
+    assert isinstance(rv[1], exceptions.NotFoundError)
+
+
+@responses.activate
+def test_products_beyond_page(product_data):
+    # The provider returns a single page, ignoring the filter
+    responses.add(GET, URL, json=[dict(product_data, id=1)], headers={
+        'X-Pagination': '{"total": 3, "total_pages": 3, "page": 1}',
+    })
+    for product_id in (2, 3):
+        responses.add(
+            GET, f'{URL}/{product_id}', json=dict(product_data, id=product_id))
+
+    client = Client(batching=Batching(window=0.1))
+    rv = client.products.get_many([1, 2, 3])
+
+    assert [product.id for product in rv] == [1, 2, 3]
+    assert len(responses.calls) == 3
+
+
+@responses.activate
+def test_single_lookup(product_data):
+    responses.add(GET, f'{URL}/1', json=dict(product_data, id=1))
+    responses.add(GET, f'{URL}/2', status=404, json={'code': 404})
+
+    client = Client(batching=Batching(window=0.001))
+
+    assert client.products.get(1).id == 1
+    with pytest.raises(exceptions.NotFoundError):
+        client.products.get('2')
+    assert client.products.batcher.stats() == {'loads': 2, 'batches': 2}
@@ -0,0 +1,139 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Unit test for model loaders."""
+
+from datetime import datetime
+
+import pytest
+import responses
+from marshmallow import ValidationError
+from responses import GET
+
+from consumer.client import Client
+from consumer.loaders import get_loader
+from consumer.schemas import BrandSchema, CategorySchema, ProductSchema
+
+
+def load(schema_cls, data, deserializer, many=False):
+    """Load the data returning either the result or the raised error."""
+    try:
+        return get_loader(schema_cls, deserializer, many)(data)
+    except (TypeError, ValidationError) as exc:
+        return type(exc), str(exc)
+
+
+@pytest.mark.parametrize('changes', [
+    {},
+    {'id': '42', 'stock': 12.0, 'price': 10},
+    {'created_at': '2023-03-11T21:56:41.1Z'},
+    {'created_at': '2023-03-11T21:56:41.123456+0530'},
+    {'created_at': '2023-03-11T21:56:41.123456-09:30'},
+    {'created_at': '2023-3-1T1:5:4.1+00:00'},
+    {'created_at': '2023-02-30T21:56:41.1+00:00'},
+    {'created_at': '\u0662\u0660\u0662\u0663-03-11T21:56:41.1+00:00'},
+    {'created_at': '0000-01-01T00:00:00.0Z'},
+    {'created_at': '2023-03-11 21:56:41'},
+    {'created_at': ''},
+    {'updated_at': None},
+    {'id': True},
+    {'id': 'abc', 'name': 42},
+    {'price': 'nan'},
+    {'rating': float('inf')},
+    {'stock': None},
+    {'unknown': 1},
+])
+def test_compiled_matches_schema(product_data, changes):
+    data = dict(product_data, **changes)
+
+    expected = load(ProductSchema, data, 'schema')
+    assert load(ProductSchema, data, 'compiled') == expected
+
+
+@pytest.mark.parametrize('data', [
+    {'id': 1, 'name': 'Name'},
+    {'id': 1},
+    {'id': 1, 'name': 'Name', 'description': 'Unknown'},
+    ['id', 'name'],
+])
+@pytest.mark.parametrize('schema_cls', [BrandSchema, CategorySchema])
+def test_compiled_nested_schemas(schema_cls, data):
+    expected = load(schema_cls, data, 'schema')
+    assert load(schema_cls, data, 'compiled') == expected
+
+
+def test_compiled_missing_optional_field(product_data):
+    del product_data['description']
+
+    with pytest.raises(TypeError):
+        get_loader(ProductSchema, 'schema')(product_data)
+    with pytest.raises(TypeError):
+        get_loader(ProductSchema, 'compiled')(product_data)
+
+
+def test_compiled_many(product_data):
+    data = [product_data, dict(product_data, id=2, stock='x'), 'foo']
+
+    expected = load(ProductSchema, data, 'schema', many=True)
+    assert load(ProductSchema, data, 'compiled', many=True) == expected
+    assert load(ProductSchema, {}, 'compiled', many=True) == load(
+        ProductSchema, {}, 'schema', many=True)
+
+
+def test_loaders_are_shared():
+    assert get_loader(ProductSchema, 'compiled') is get_loader(
+        ProductSchema, 'compiled')
+
+    with pytest.raises(ValueError):
+        get_loader(ProductSchema, 'fast')
+
+
+@responses.activate
+def test_client_deserializer(product_data):
+    client = Client(deserializer='compiled')
+    responses.add(
+        GET,
+        'http://localhost/v2/products',
+        json=[product_data, dict(product_data, id=2)],
+    )
+
+    rv = client.products.all()
+
+    assert rv == get_loader(ProductSchema, many=True)(
+        [product_data, dict(product_data, id=2)])
+
+    with pytest.raises(ValueError):
+        Client(deserializer='fast')
+
+
+@pytest.mark.parametrize('changes', [
+    {},
+    {'created_at': '2023-03-30T21:56:41.1Z'},
+    {'created_at': '2023-02-30T21:56:41.1+00:00'},
+    {'created_at': '2023-13-11T21:56:41.1+00:00'},
+    {'created_at': '2023-3-1T1:5:4.1+00:00'},
+    {'created_at': '\u0662\u0660\u0662\u0663-03-11T21:56:41.1+00:00'},
+    {'created_at': '0000-01-01T00:00:00.0Z'},
+    {'updated_at': '2023-03-11T21:56:41.123456+0530'},
+    {'updated_at': 42},
+])
+def test_lazy_matches_schema(product_data, changes):
+    data = dict(product_data, **changes)
+
+    expected = load(ProductSchema, data, 'schema')
+    assert load(ProductSchema, data, 'lazy') == expected
+
+
+def test_lazy_timestamps(product_data):
+    product = get_loader(ProductSchema, 'lazy')(product_data)
+    slot = type(product).created_at.slot
+
+    assert slot.__get__(product) == product_data['created_at']
+    assert product.created_at == datetime.fromisoformat(
+        product_data['created_at'])
+    assert isinstance(slot.__get__(product), datetime)
+    assert product.created_at is product.created_at
@@ -0,0 +1,180 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Unit test for request metrics."""
+
+import json
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from consumer import exceptions
+from consumer.cache import ResponseCache
+from consumer.client import Client
+from consumer.metrics import Metrics
+from consumer.session import factory
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Handler serving products, failing the first request to a flaky one.
+
+    Every request to the ``down`` product fails.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    product = {}
+    failures = {}
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        if self.path == '/v2/products':
+            self.respond(200, [self.product])
+        elif self.path == '/v2/products/404':
+            self.respond(404, {'code': 404, 'status': 'Not Found'})
+        elif self.path == '/v2/products/down':
+            self.respond(503, {'code': 503})
+        elif self.path == '/v2/products/503' and not self.failures.get(503):
+            self.failures[503] = True
+            self.respond(503, {'code': 503})
+        else:
+            self.respond(200, self.product)
+
+    def respond(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', '"1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def base_url(http_server, product_data):
+    """Run local HTTP server and get its base URL."""
+    Handler.product = product_data
+    Handler.failures = {}
+    return http_server(Handler)
+
+
+def test_request_phases(base_url):
+    records = []
+    metrics = Metrics(hooks=[records.append])
+    client = Client(base_url=base_url, metrics=metrics)
+
+    client.products.get(1)
+    client.products.get(2)
+
+    first, second = records
+    assert first.endpoint == second.endpoint == '/v2/products/{id}'
+    assert first.method == 'GET'
+    assert first.status == 200
+    assert first.bytes_received > 0
+    assert set(first.timings) == {
+        'total', 'connect', 'wait', 'transfer', 'decode', 'load',
+    }
+
+    # The connection is established once and reused
+    assert first.timings['connect'] > 0.0
+    assert second.timings['connect'] == 0.0
+
+
+def test_retries_and_errors(base_url):
+    records = []
+    client = Client(
+        base_url=base_url,
+        session=factory(backoff_factor=0.01),
+        metrics=Metrics(hooks=[records.append]),
+    )
+
+    client.get('/v2/products/503')
+    with pytest.raises(exceptions.NotFoundError):
+        client.get('/v2/products/404')
+
+    assert records[0].retries == 1
+    assert records[0].status == 200
+    assert records[1].status == 404
+    assert records[1].error == 'NotFoundError'
+
+
+def test_exhausted_retries(base_url):
+    records = []
+    client = Client(
+        base_url=base_url,
+        session=factory(max_retries=2, backoff_factor=0.01),
+        metrics=Metrics(hooks=[records.append]),
+    )
+
+    with pytest.raises(exceptions.RetryApiError):
+        client.get('/v2/products/down')
+
+    assert records[0].retries == 2
+    assert records[0].error == 'RetryApiError'
+
+
+def test_prometheus_export(base_url):
+    metrics = Metrics(buckets=[0.5, 60.0])
+    client = Client(base_url=base_url, metrics=metrics)
+
+    for product_id in range(3):
+        client.products.get(product_id + 1)
+    client.products.all()
+
+    text = metrics.export()
+    labels = 'endpoint="/v2/products/{id}",method="GET"'
+
+    assert '# TYPE consumer_requests_total counter' in text
+    assert f'consumer_requests_total{{{labels},status="200"}} 3' in text
+    assert f'consumer_request_retries_total{{{labels}}} 0' in text
+    assert (
+        'consumer_request_duration_seconds_bucket'
+        f'{{{labels},phase="load",le="60.0"}} 3'
+    ) in text
+    assert (
+        'consumer_request_duration_seconds_count'
+        '{endpoint="/v2/products",method="GET",phase="total"} 1'
+    ) in text
+
+
+def test_cache_hits(base_url):
+    records = []
+    metrics = Metrics(hooks=[records.append])
+    client = Client(
+        base_url=base_url,
+        cache=ResponseCache(max_age=60.0),
+        metrics=metrics,
+    )
+
+    responses = [client.get('/v2/products/1') for _ in range(3)]
+    product = client.products.get(1)
+
+    # Every call is measured on its own response
+    assert len({id(response.metrics) for response in responses}) == 3
+    assert product.id == responses[0].json()['id']
+
+    sent, *hits = records
+    assert not sent.cache_hit
+    assert 'total' in sent.timings
+    assert all(hit.cache_hit and hit.status == 200 for hit in hits)
+    assert all('total' not in hit.timings for hit in hits)
+    assert hits[0].timings['cache'] < sent.timings['total']
+
+    text = metrics.export()
+    labels = 'endpoint="/v2/products/{id}",method="GET"'
+    assert f'consumer_requests_total{{{labels},status="200"}} 1' in text
+    assert f'consumer_cache_hits_total{{{labels}}} 3' in text
+
+
+def test_disabled_by_default(base_url):
+    client = Client(base_url=base_url)
+    response = client.get('/v2/products/1')
+
+    assert client.metrics is None
+    assert not hasattr(response, 'metrics')
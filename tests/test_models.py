@@ -0,0 +1,54 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Unit test for data models."""
+
+import dataclasses
+
+import pytest
+
+from consumer.loaders import get_loader
+from consumer.models import Brand, Category
+from consumer.schemas import ProductSchema
+
+
+@pytest.mark.parametrize('deserializer', ['schema', 'compiled'])
+def test_compact_product(product_data, deserializer):
+    load = get_loader(ProductSchema, deserializer)
+    first = load(dict(product_data, created_at='2023-03-11T21:56:41.1+02:00'))
+    second = load(dict(product_data, created_at='2023-03-11T21:56:41.2+02:00'))
+
+    assert not hasattr(first, '__dict__')
+    assert repr(first) == f"<Product: id={product_data['id']}>"
+    assert first.name is second.name
+    assert first.created_at.tzinfo is second.created_at.tzinfo
+    assert first.created_at.utcoffset().total_seconds() == 7200
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        first.name = 'Changed'
+
+
+@pytest.mark.parametrize('model', [Brand, Category])
+def test_compact_brand_and_category(model):
+    first = model(id=1, name=''.join(['Na', 'me']))
+    second = model(id=2, name=''.join(['Nam', 'e']))
+
+    assert not hasattr(first, '__dict__')
+    assert first.name is second.name
+    assert repr(first) == f'<{model.__name__}: id=1>'
+    assert dataclasses.replace(first, id=2) == dataclasses.replace(second)
+
+
+def test_long_strings_are_not_interned(product_data):
+    load = get_loader(ProductSchema)
+    description = 'x' * 100
+
+    first = load(dict(product_data, description=''.join(description)))
+    second = load(dict(product_data, description=description[:50] * 2))
+
+    assert first.description == second.description
+    assert first.description is not second.description
@@ -0,0 +1,286 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Unit test for Products API resource."""
+
+import json
+from typing import Iterator
+
+import pytest
+import responses
+from responses import DELETE, GET, matchers, POST
+
+from consumer import exceptions
+from consumer.cache import ResponseCache
+from consumer.client import Client
+from consumer.models import Product
+
+
+def add_products(base_url: str, product_data: dict, product_ids):
+    """Register successful responses for the given product IDs."""
+    for product_id in product_ids:
+        responses.add(
+            GET,
+            f'{base_url}/v2/products/{product_id}',
+            json=dict(product_data, id=product_id),
+        )
+
+
+def add_not_found(base_url: str, product_id: int):
+    """Register a not found response for the given product ID."""
+    responses.add(
+        GET,
+        f'{base_url}/v2/products/{product_id}',
+        status=404,
+        json={'code': 404, 'message': 'Product not found'},
+    )
+
+
+@responses.activate
+def test_get_many_preserves_order(client, product_data):
+    product_ids = [5, 3, 9, 1, 7, 2]
+    add_products(client.base_url, product_data, product_ids)
+
+    rv = client.products.get_many(product_ids, max_workers=4)
+
+    assert [p.id for p in rv] == product_ids
+    assert all(isinstance(p, Product) for p in rv)
+
+
+@responses.activate
+def test_get_many_raises_by_default(client, product_data):
+    add_products(client.base_url, product_data, [1, 3])
+    add_not_found(client.base_url, 2)
+
+    with pytest.raises(exceptions.NotFoundError):
+        client.products.get_many([1, 2, 3])
+
+
+@responses.activate
+def test_get_many_skip_errors(client, product_data):
+    add_products(client.base_url, product_data, [1, 3])
+    add_not_found(client.base_url, 2)
+
+    rv = client.products.get_many([1, 2, 3], errors='skip')
+
+    assert [p.id for p in rv] == [1, 3]
+
+
+@responses.activate
+def test_get_many_return_errors(client, product_data):
+    add_products(client.base_url, product_data, [1, 3])
+    add_not_found(client.base_url, 2)
+
+    rv = client.products.get_many([1, 2, 3], errors='return')
+
+    assert rv[0].id == 1
+    assert isinstance(rv[1], exceptions.NotFoundError)
+    assert rv[2].id == 3
+
+
+def test_get_many_unknown_policy(client):
+    with pytest.raises(ValueError):
+        client.products.get_many([1], errors='ignore')
+
+
+def add_create(base_url: str, product_data: dict):
+    """Register a create response echoing the data, failing nameless ones."""
+    def callback(request):
+        data = json.loads(request.body)
+        if not data.get('name'):
+            return 422, {}, json.dumps({
+                'code': 422,
+                'errors': {'name': ['Missing data for required field.']},
+            })
+        return 201, {}, json.dumps(dict(product_data, **data))
+
+    responses.add_callback(POST, f'{base_url}/v2/products', callback=callback)
+
+
+@responses.activate
+def test_create_many(client, product_data):
+    add_create(client.base_url, product_data)
+    consumed = []
+
+    def generate():
+        for i in range(1, 11):
+            consumed.append(i)
+            yield {'id': i, 'name': f'Product {i}'}
+
+    rv = client.products.create_many(generate(), chunk_size=3, concurrency=2)
+
+    # Input is read lazily
+    assert consumed == []
+    assert next(rv).id == 1
+    assert len(consumed) <= 4
+
+    assert [p.id for p in rv] == list(range(2, 11))
+    assert len(responses.calls) == 10
+
+
+@responses.activate
+def test_create_many_return_errors(client, product_data):
+    add_create(client.base_url, product_data)
+
+    rv = list(client.products.create_many(
+        [{'id': 1, 'name': 'First'}, {'id': 2}, {'id': 3, 'name': 'Third'}],
+        errors='return',
+    ))
+
+    assert [rv[0].id, rv[2].id] == [1, 3]
+    assert isinstance(rv[1], exceptions.UnprocessableEntity)
+    assert rv[1].errors == {'name': ['Missing data for required field.']}
+
+
+@responses.activate
+def test_create_many_raises_by_default(client, product_data):
+    add_create(client.base_url, product_data)
+
+    with pytest.raises(exceptions.UnprocessableEntity):
+        list(client.products.create_many([{'id': 1, 'name': 'A'}, {'id': 2}]))
+
+
+def test_create_many_unknown_policy(client):
+    with pytest.raises(ValueError):
+        client.products.create_many([], errors='ignore')
+
+
+def add_delete(base_url: str, product_data: dict, product_id: int,
+               etag: str, status: int = 204):
+    """Register a product with the ETag and its conditional delete."""
+    url = f'{base_url}/v2/products/{product_id}'
+    responses.add(GET, url, json=dict(product_data, id=product_id),
+                  headers={'ETag': etag})
+    responses.add(
+        DELETE,
+        url,
+        status=status,
+        json={'code': status} if status != 204 else None,
+        match=[matchers.header_matcher({'If-Match': etag})],
+    )
+
+
+@responses.activate
+def test_delete_many(client, product_data):
+    add_delete(client.base_url, product_data, 1, '"v1"')
+    add_delete(client.base_url, product_data, 2, '"v2"', status=412)
+    add_not_found(client.base_url, 3)
+
+    rv = client.products.delete_many([3, 2, 1])
+
+    assert rv == {
+        3: 'not_found',
+        2: 'precondition_failed',
+        1: 'deleted',
+    }
+    assert list(rv) == [3, 2, 1]
+
+
+@responses.activate
+def test_delete_many_errors(client, product_data):
+    add_delete(client.base_url, product_data, 1, '"v1"')
+    add_delete(client.base_url, product_data, 2, '"v2"', status=500)
+    add_delete(client.base_url, product_data, 3, '"v3"')
+
+    rv = client.products.delete_many([1, 2, 3])
+
+    # Failed deletes do not hide the outcomes of the other ones
+    assert rv[1] == rv[3] == 'deleted'
+    assert isinstance(rv[2], exceptions.RetryApiError)
+
+
+@responses.activate
+def test_delete_many_reuses_etags(product_data):
+    client = Client(cache=ResponseCache())
+    add_delete('http://localhost', product_data, 1, '"v1"')
+
+    client.products.get(1)
+    assert client.products.delete_many([1]) == {1: 'deleted'}
+
+    methods = [call.request.method for call in responses.calls]
+    assert methods == ['GET', 'DELETE']
+
+
+def add_page(base_url: str, product_data: dict, page: int, product_ids,
+             headers=None):
+    """Register a response for the given page of products."""
+    responses.add(
+        GET,
+        f'{base_url}/v2/products',
+        json=[dict(product_data, id=i) for i in product_ids],
+        headers=headers,
+        match=[matchers.query_param_matcher({'cid': '2', 'page': str(page)})],
+    )
+
+
+@pytest.mark.parametrize('prefetch', [False, True])
+@responses.activate
+def test_iter_all_stops_on_empty_page(client, product_data, prefetch):
+    add_page(client.base_url, product_data, 1, [1, 2])
+    add_page(client.base_url, product_data, 2, [3, 4])
+    add_page(client.base_url, product_data, 3, [])
+
+    rv = client.products.iter_all(cid=2, prefetch=prefetch)
+
+    assert isinstance(rv, Iterator)
+    assert [p.id for p in rv] == [1, 2, 3, 4]
+    assert len(responses.calls) == 3
+
+
+@responses.activate
+def test_iter_all_stops_on_last_page(client, product_data):
+    headers = {'X-Pagination': json.dumps({'total': 3, 'total_pages': 2})}
+    add_page(client.base_url, product_data, 2, [2, 3], headers)
+    add_page(client.base_url, product_data, 3, [4])
+
+    rv = client.products.iter_all(cid=2, page=2)
+
+    assert [p.id for p in rv] == [2, 3]
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_iter_all_is_lazy(client, product_data):
+    add_page(client.base_url, product_data, 1, [1, 2])
+    add_page(client.base_url, product_data, 2, [3])
+
+    rv = client.products.iter_all(cid=2)
+    assert len(responses.calls) == 0
+
+    assert next(rv).id == 1
+    assert next(rv).id == 2
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_stream_all(client, product_data):
+    body = json.dumps([dict(product_data, id=i) for i in range(1, 101)])
+    responses.add(
+        GET,
+        f'{client.base_url}/v2/products',
+        body=body,
+        content_type='application/json',
+        match=[matchers.query_param_matcher({'cid': '2'})],
+    )
+
+    rv = client.products.stream_all(cid=2, chunk_size=7)
+
+    assert isinstance(rv, Iterator)
+    assert [p.id for p in rv] == list(range(1, 101))
+    assert responses.calls[0].request.req_kwargs['stream'] is True
+
+
+@responses.activate
+def test_stream_all_malformed_body(client, product_data):
+    body = json.dumps([product_data])[:-1]
+    responses.add(GET, f'{client.base_url}/v2/products', body=body)
+
+    rv = client.products.stream_all()
+
+    assert next(rv).id == product_data['id']
+    with pytest.raises(json.JSONDecodeError):
+        next(rv)
@@ -16,6 +16,7 @@ from pact import Consumer, EachLike, Provider
 
 from consumer import exceptions
 from consumer.client import Client
+from consumer.dataloader import Batching
 from consumer.models import Product
 from .factories import (
     Format,
@@ -235,6 +236,38 @@ def test_products_in_category_response(mock_service, client: Client):
         mock_service.verify()
 
 
+def test_products_by_ids_response(mock_service, mock_opts):
+    expected = [ProductFactory(id=1), ProductFactory(id=2)]
+    headers = HeadersFactory.create()  # type: dict
+    headers.update({'X-Pagination': json.dumps({
+        'total': 2,
+        'total_pages': 1,
+        'first_page': 1,
+        'last_page': 1,
+        'page': 1,
+    })})
+
+    (mock_service
+     .given('there are products with ID 1 and 2')
+     .upon_receiving('a request to get products by IDs')
+     .with_request('get', '/v2/products', query={'q': 'id:1,2'})
+     .will_respond_with(200, body=expected, headers=headers))
+
+    client = Client(
+        base_url=f"http://{mock_opts['host_name']}:{mock_opts['port']}",
+        batching=Batching(window=0.1),
+    )
+
+    with mock_service:
+        # Concurrent lookups are combined into a single filtered request
+        rv = client.products.get_many([1, 2])
+
+        assert [product.id for product in rv] == [1, 2]
+
+        # Make sure that all interactions defined occurred
+        mock_service.verify()
+
+
 def test_create_product(mock_service, client: Client):
     headers = HeadersFactory.create()  # type: dict
     location = Format().url(
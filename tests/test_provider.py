@@ -0,0 +1,121 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Unit test for the provider stub replaying pact files."""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from consumer import exceptions
+from consumer.aio import AsyncClient
+from consumer.client import Client
+from consumer.dataloader import Batching
+from tests.provider import Provider
+
+
+def run(provider: Provider, func):
+    """Run the coroutine function with a client of the running provider."""
+    async def main():
+        async with provider:
+            async with AsyncClient(base_url=provider.base_url) as client:
+                return await func(client)
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize('state,size', [
+    ('there are no products', 0),
+    ('there are few products', 3),
+])
+def test_given_states(state, size):
+    provider = Provider(states=[state])
+    products = run(provider, lambda client: client.products.all())
+
+    assert len(products) == size
+    assert provider.stats['matched'] == 1
+
+
+def test_query_matching():
+    provider = Provider(states=['there are few products in category #2'])
+    products = run(provider, lambda client: client.products.all(cid=2))
+
+    assert {product.category_id for product in products} == {2}
+
+
+def test_error_responses():
+    provider = Provider(states=['there is no product with ID 7777'])
+
+    with pytest.raises(exceptions.NotFoundError):
+        run(provider, lambda client: client.products.get(7777))
+
+
+def test_unmatched_request():
+    async def main():
+        async with provider:
+            async with httpx.AsyncClient() as session:
+                return await session.get(f'{provider.base_url}/v2/brands')
+
+    provider = Provider()
+    response = asyncio.run(main())
+
+    assert response.status_code == 500
+    assert provider.stats['unmatched'] == 1
+
+
+def test_error_injection():
+    provider = Provider(error_rate=1.0, error_status=422)
+
+    with pytest.raises(exceptions.UnprocessableEntity):
+        run(provider, lambda client: client.products.get(1))
+
+    assert provider.stats['errors'] == 1
+
+
+def test_latency():
+    provider = Provider(latency=0.05)
+
+    started = time.monotonic()
+    run(provider, lambda client: client.products.get(1))
+
+    assert time.monotonic() - started >= 0.05
+
+
+def test_blocking_client():
+    async def main():
+        async with provider:
+            client = Client(base_url=provider.base_url)
+            loop = asyncio.get_running_loop()
+            return await asyncio.gather(*(
+                loop.run_in_executor(None, client.products.get, 1)
+                for _ in range(20)
+            ))
+
+    provider = Provider(states=['there is a product with ID 1'])
+    products = asyncio.run(main())
+
+    assert {product.id for product in products} == {1}
+    assert provider.stats['requests'] == 20
+
+
+def test_batched_lookups():
+    async def main():
+        async with provider:
+            client = Client(
+                base_url=provider.base_url,
+                batching=Batching(window=0.1),
+            )
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                None, client.products.get_many, [2, 1])
+
+    provider = Provider(states=['there are products with ID 1 and 2'])
+    products = asyncio.run(main())
+
+    assert [product.id for product in products] == [2, 1]
+    assert provider.stats['matched'] == 1
@@ -0,0 +1,157 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Unit test for client-side rate limiting."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+
+import pytest
+import responses
+from requests.models import Response
+from responses import GET
+
+from consumer import exceptions
+from consumer.client import Client
+from consumer.ratelimit import parse_rate_limit, RateLimiter, TokenBucket
+
+URL = 'http://localhost/v2/products'
+
+
+def test_bucket_pacing():
+    bucket = TokenBucket(rate=50.0, burst=2.0)
+    waits = [bucket.reserve() for _ in range(4)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(0.02, abs=0.005)
+    assert waits[3] == pytest.approx(0.04, abs=0.005)
+
+
+def test_bucket_learns_limits():
+    bucket = TokenBucket()
+    assert bucket.reserve() == 0.0
+
+    bucket.learn(remaining=10.0, reset=1.0)
+    assert bucket.rate == 10.0
+
+    bucket.learn(remaining=0.0, reset=0.5)
+    assert bucket.reserve() == pytest.approx(0.5, abs=0.01)
+
+
+def test_configured_rate_is_not_exceeded():
+    bucket = TokenBucket(rate=5.0)
+    bucket.learn(remaining=100.0, reset=1.0)
+
+    assert bucket.rate == 5.0
+
+
+def test_shared_between_threads():
+    limiter = RateLimiter(rate=100.0, burst=1.0)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(
+            lambda _: limiter.acquire('GET', f'{URL}/1'),
+            range(8),
+        ))
+
+    # 7 of 8 requests wait for their turn
+    assert time.monotonic() - started >= 0.07
+    assert limiter.stats()['waits'] == 7
+
+
+def test_endpoint_groups():
+    limiter = RateLimiter(rate=1.0, burst=1.0, limits={
+        '/v2/products': (1000.0, 10.0),
+    })
+
+    waits = [limiter.acquire('GET', URL) for _ in range(5)]
+    waits.append(limiter.acquire('GET', f'{URL}/1'))
+
+    assert waits == [0.0] * 6
+    assert limiter.stats()['groups'] == 2
+
+
+def test_max_wait():
+    limiter = RateLimiter(rate=1.0, burst=1.0, max_wait=0.1)
+    limiter.acquire('GET', URL)
+
+    with pytest.raises(exceptions.RateLimitExceeded):
+        limiter.acquire('GET', URL)
+
+    assert limiter.stats()['rejected'] == 1
+
+
+@responses.activate
+def test_client_learns_from_headers():
+    responses.add(GET, URL, json=[], headers={
+        'X-RateLimit-Remaining': '0',
+        'X-RateLimit-Reset': '0.2',
+    })
+
+    limiter = RateLimiter()
+    first = Client(rate_limiter=limiter)
+    second = Client(rate_limiter=limiter)
+
+    first.get('/v2/products')
+    started = time.monotonic()
+    second.get('/v2/products')
+
+    assert time.monotonic() - started >= 0.15
+    assert limiter.stats()['waits'] == 1
+
+
+@responses.activate
+def test_client_learns_from_retried_responses():
+    responses.add(GET, URL, status=429, json={'code': 429}, headers={
+        'Retry-After': '0',
+        'X-RateLimit-Remaining': '0',
+        'X-RateLimit-Reset': '30',
+    })
+
+    limiter = RateLimiter(max_wait=1.0)
+    client = Client(rate_limiter=limiter, max_retries=0)
+
+    with pytest.raises(exceptions.RetryApiError):
+        client.get('/v2/products')
+
+    bucket = limiter.bucket('GET', URL)
+    assert bucket.blocked_until - time.monotonic() > 20.0
+
+    with pytest.raises(exceptions.RateLimitExceeded):
+        client.get('/v2/products')
+    assert len(responses.calls) == 1
+
+
+def rate_limited(headers: dict) -> Response:
+    """Create a 429 (Too Many Requests) response with the headers."""
+    response = Response()
+    response.status_code = 429
+    response.headers.update(headers)
+    return response
+
+
+def test_malformed_headers_are_skipped():
+    response = rate_limited({
+        'RateLimit-Remaining': 'nan',
+        'X-RateLimit-Remaining': '2',
+        'RateLimit-Reset': 'soon',
+        'X-RateLimit-Reset': '30',
+        'Retry-After': 'soon',
+    })
+
+    assert parse_rate_limit(response) == (2.0, 30.0, None)
+
+
+def test_retry_after_date():
+    response = rate_limited({
+        'Retry-After': formatdate(time.time() + 30.0, usegmt=True),
+    })
+
+    retry_after = parse_rate_limit(response)[2]
+    assert 28.0 < retry_after <= 30.0
@@ -0,0 +1,168 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Unit test for HTTP sessions and connection pooling."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+from urllib3.exceptions import MaxRetryError
+from urllib3.response import HTTPResponse
+
+from consumer import exceptions
+from consumer.client import Client
+from consumer.session import create_retry, factory, RetryBudget
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Handler responding to every GET request with an empty JSON object.
+
+    Requests to ``/v2/throttled`` are always rate limited.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    delay = 0.0
+    throttled = 0
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        time.sleep(self.delay)
+        if self.path == '/v2/throttled':
+            Handler.throttled += 1
+            self.send_response(429)
+            self.send_header('Retry-After', '0')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def base_url(http_server):
+    """Run local HTTP server and get its base URL."""
+    return http_server(Handler)
+
+
+def test_reused_connections(base_url):
+    client = Client(base_url=base_url)
+    for _ in range(3):
+        client.get('/v2/products')
+
+    stats = client.pool_stats()
+
+    assert stats['created'] == 1
+    assert stats['reused'] == 2
+    assert stats['open'] == stats['idle'] == 1
+    assert stats['in_use'] == 0
+    assert stats['waits'] == 0
+
+
+def test_shared_session(base_url):
+    session = factory(pool_maxsize=4)
+    first = Client(base_url=base_url, session=session)
+    second = Client(base_url=base_url, session=session)
+
+    first.get('/v2/products')
+    second.get('/v2/products')
+
+    assert first.session is second.session
+    assert first.pool_stats() == second.pool_stats()
+    assert second.pool_stats()['reused'] == 1
+
+
+def test_session_options_are_not_query(base_url):
+    client = Client(base_url=base_url, pool_maxsize=2, pool_block=True)
+
+    response = client.get('/v2/products')
+    adapter = client.session.get_adapter(base_url)
+
+    assert response.request.url == f'{base_url}/v2/products'
+    assert adapter.poolmanager.connection_pool_kw['maxsize'] == 2
+    assert adapter.poolmanager.connection_pool_kw['block'] is True
+
+
+@pytest.mark.parametrize('pool_block,waits,discarded', [
+    (True, 1, 0),
+    (False, 0, 1),
+])
+def test_exhausted_pool(base_url, monkeypatch, pool_block, waits, discarded):
+    monkeypatch.setattr(Handler, 'delay', 0.2)
+    client = Client(base_url=base_url, pool_maxsize=1, pool_block=pool_block)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(lambda _: client.get('/v2/products'), range(2)))
+
+    stats = client.pool_stats()
+
+    assert stats['waits'] == waits
+    assert stats['discarded'] == discarded
+    assert stats['in_use'] == 0
+
+
+def throttled(retry_after: str = '0') -> HTTPResponse:
+    """Create a rate limited response."""
+    return HTTPResponse(status=429, headers={'Retry-After': retry_after})
+
+
+def test_decorrelated_jitter():
+    retry = create_retry(max_retries=10, backoff_factor=1.0, backoff_max=5.0)
+
+    previous = 1.0
+    for _ in range(10):
+        retry = retry.increment('GET', '/', response=HTTPResponse(status=503))
+        assert 1.0 <= retry.get_backoff_time() <= min(5.0, previous * 3)
+        previous = retry.get_backoff_time()
+
+
+def test_retry_after():
+    retry = create_retry(backoff_factor=0.1)
+    retry = retry.increment('GET', '/', response=throttled('2'))
+
+    assert 2.1 <= retry.get_sleep_time(throttled('2')) <= 2.3
+
+
+def test_max_retry_time():
+    retry = create_retry(max_retries=10, max_retry_time=1.0)
+
+    with pytest.raises(MaxRetryError):
+        retry.increment('GET', '/', response=throttled('5'))
+
+
+def test_retry_budget():
+    budget = RetryBudget(ratio=0.5, min_per_second=0.0, capacity=1.0)
+    retry = create_retry(max_retries=10, backoff_factor=0.01, budget=budget)
+
+    retry = retry.increment('GET', '/', response=throttled())
+    with pytest.raises(MaxRetryError):
+        retry.increment('GET', '/', response=throttled())
+
+    assert budget.exhausted == 1
+
+
+@pytest.mark.parametrize('budget,requests', [
+    (None, 40),
+    (RetryBudget(ratio=0.25, min_per_second=0.0, capacity=1.0), 13),
+])
+def test_throttling_storm(base_url, monkeypatch, budget, requests):
+    monkeypatch.setattr(Handler, 'throttled', 0)
+    session = factory(backoff_factor=0.001, retry_budget=budget)
+    if budget is None:
+        session.get_adapter(base_url).max_retries.budget = None
+
+    client = Client(base_url=base_url, session=session)
+    for _ in range(10):
+        with pytest.raises(exceptions.RetryApiError):
+            client.get('/v2/throttled')
+
+    # Every request is retried 3 times unless the budget runs out
+    assert Handler.throttled == requests
@@ -0,0 +1,149 @@
+# This file is part of the Consumer API example.
+#
+# Copyright (C) 2023 Serghei Iakovlev <egrep@protonmail.ch>
+#
+# For the full copyright and license information, please view
+# the LICENSE file that was distributed with this source code.
+
+"""Unit test for coalescing of identical concurrent requests."""
+
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+import responses
+from responses import GET
+
+from consumer import exceptions
+from consumer.aio import AsyncClient
+from consumer.cache import ResponseCache
+from consumer.client import Client
+from consumer.singleflight import AsyncSingleFlight, SingleFlight
+
+URL = 'http://localhost/v2/products'
+
+
+def slow_callback(status, body):
+    """Create a callback responding slowly, so that requests overlap."""
+    def callback(_request):
+        time.sleep(0.1)
+        return status, {}, json.dumps(body)
+    return callback
+
+
+@responses.activate
+def test_concurrent_get(product_data):
+    responses.add_callback(
+        GET, f'{URL}/42', callback=slow_callback(200, product_data))
+
+    flight = SingleFlight()
+    client = Client(single_flight=flight)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        products = list(executor.map(
+            lambda _: client.products.get(42),
+            range(8),
+        ))
+
+    assert len(responses.calls) == 1
+    assert flight.stats() == {'calls': 8, 'collapsed': 7, 'in_flight': 0}
+
+    # The product is deserialized once and shared
+    assert all(product is products[0] for product in products)
+
+
+@responses.activate
+def test_errors_are_shared():
+    responses.add_callback(
+        GET, f'{URL}/42', callback=slow_callback(404, {'code': 404}))
+
+    client = Client(single_flight=SingleFlight())
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(client.products.get, 42) for _ in range(4)]
+
+    for future in futures:
+        assert isinstance(future.exception(), exceptions.NotFoundError)
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_different_queries(product_data):
+    responses.add(GET, URL, json=[product_data])
+
+    flight = SingleFlight()
+    client = Client(single_flight=flight)
+
+    client.products.all(page=1, size=5)
+    client.products.all(size=5, page=1)
+    client.products.all(page=2, size=5)
+
+    # Sequential requests are never collapsed
+    assert len(responses.calls) == 3
+    assert flight.collapsed == 0
+
+
+@responses.activate
+def test_cached_responses(product_data):
+    responses.add(GET, f'{URL}/42', json=product_data, headers={'ETag': '"1"'})
+
+    client = Client(
+        cache=ResponseCache(max_age=60.0),
+        single_flight=SingleFlight(),
+    )
+
+    # Calls served from the cache do not share the cached response
+    first = client.get('/v2/products/42')
+    second = client.get('/v2/products/42')
+    assert first is not second
+    assert first.shared is not second.shared
+    assert client.products.get(42) is client.products.get(42)
+
+
+def test_async_concurrent_get(product_data):
+    async def handler(request: httpx.Request):
+        requests.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json=product_data)
+
+    async def main():
+        session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with AsyncClient(session=session,
+                               single_flight=flight) as client:
+            return await asyncio.gather(
+                *(client.products.get(42) for _ in range(10)),
+                client.products.get(43),
+            )
+
+    requests = []
+    flight = AsyncSingleFlight()
+    products = asyncio.run(main())
+
+    assert len(requests) == 2
+    assert flight.stats() == {'calls': 11, 'collapsed': 9, 'in_flight': 0}
+    assert all(product is products[0] for product in products[:10])
+    assert products[10] is not products[0]
+
+
+def test_async_cancelled_caller(product_data):
+    async def handler(_request: httpx.Request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json=product_data)
+
+    async def main():
+        session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with AsyncClient(session=session,
+                               single_flight=AsyncSingleFlight()) as client:
+            first = asyncio.ensure_future(client.products.get(42))
+            second = asyncio.ensure_future(client.products.get(42))
+            await asyncio.sleep(0.01)
+            first.cancel()
+
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return await second
+
+    assert asyncio.run(main()).id == product_data['id']